@@ -9,81 +9,62 @@ spaces from the header line and format it to be in the
 
 The difference is this operation avoids using the BioPython module and sticks to
 Python's FileIO operations to identify the important components of the FASTA
-file; this is done primarily through regular expressions rather than
-BioPython's SeqIO data structures.
+file; this is done by splitting header fields, falling back to the regular
+expression for unusual headers, rather than through BioPython's SeqIO data
+structures.
 
-This version is generally faster since it performs operations line-by-line
-rather reading in the entirety of a single sequence unit e.g. header,
-description, and sequence text into a data structure before processing.  The
-primary problem is text retrieved via BioPython's SeqRecord comes unformatted
-requiring the main program to reformat it back to its original form.  More
-specifically, the length of the line ends up exceeding the 120 character
-recommended limit for FASTA format.  This makes the Big-O analysis a function
-of the number of letters in each sequence rather than of the lines in the file.
+This version is generally faster since it streams the file rather than
+reading in the entirety of a single sequence unit e.g. header, description,
+and sequence text into a data structure before processing.  The streaming
+module reads the file in large blocks cut at the last complete line,
+dispatches on the first byte of each line so only header lines are parsed,
+validates each sequence body with a single lookup-table pass and writes the
+output of each block at once.  See the streaming module for details.  The
+primary problem of the BioPython version is that text retrieved via
+BioPython's SeqRecord comes unformatted, requiring the main program to
+reformat it back to its original form; otherwise its lines would exceed the
+120 character recommended limit for FASTA format.
 
-This process runs in O(n) versus the BioPython version of O(m^2) where n is the
-number of lines in the file and m is the total number of sequence characters
-in the file with the assumption, m > n.
+The renaming itself lives in the renamer module; this script only holds the
+configuration below.  See the renamer module for the command line interface
+and for calling the renamer from other Python code.
+
+This process runs in O(n) where n is the number of bytes in the file, in
+memory bounded by the block size.  The BioPython version used to run in
+O(m^2), where m is the total number of sequence characters in the file,
+because of the way it wrapped sequences; see the wrapping module.
 '''
 
-from sys import stdout
-import re
+from renamer import run
 
 # Configuration
-# TODO Query user for Input and Output paths
+# Paths can also be given on the command line; see the renamer module.
 input_path = "data/BegomoSDTseqsmissing.fasta"
 output_path = "data/BegomoSDTseqsmissing_OUTPUT.fasta"
-name_pattern = "^>.+\|.+\|.+\|(.+)[.0-9]\|(.*[vV]irus).*"
-alpha = "^[NATCG\-\n]+$"
+name_pattern = r"^>.+\|.+\|.+\|(.+)[.0-9]\|(.*[vV]irus).*"
+# Sequence alphabet: strict (ACGTN-), dna, rna or protein.  All but strict
+# are IUPAC alphabets that also accept lower case.
+alphabet = "strict"
 replace_target = " "
 replace_char = "_"
+# Processes renaming shards of the input in parallel; 1 renames serially.
+# Compressed input is always renamed serially.  Output paths ending in .gz
+# are written as BGZF.
+processes = 1
+# Path to write a .fai index of the output to; None skips indexing.
+index_path = None
+# Seconds between progress updates and path of the JSON metrics summary.
+progress_interval = 1.0
+summary_path = None
+# Path of a tab-separated file every rejected line is written to with its
+# line number, byte offset and reason, and the number of rejected lines kept
+# in memory and printed; None keeps them all.
+error_path = None
+error_sample = None
 
-input_handle = open(input_path, "rU")
-output_handle = open(output_path, "w")
-name_prog = re.compile(name_pattern)
-alpha_prog = re.compile(alpha)
-virus_errors = []
-
-print("\n=========================================")
-print("FASTA Renamer BioPython")
-print("=========================================")
-
-ctr = 0
-err = 0
-valid = False
-for line in input_handle:
-    stdout.write("Number of Viruses Processed: {0}, Number of Errors: {1}\r"
-        .format(ctr, err))
-    stdout.flush()
-    nameMatch = re.match(name_prog, line)
-    seqMatch = re.match(alpha_prog, line)
-    if seqMatch and valid:
-        output_handle.write(line)
-    elif nameMatch:
-        ctr = ctr + 1
-        valid = True
-        groups = nameMatch.group(1, 2)
-        virusAccession2 = groups[0].replace(replace_target, replace_char)
-        virusName = groups[1].replace(replace_target, replace_char)
-        output_handle.write(">" + virusAccession2 + virusName + "\n")
-    elif not seqMatch:
-        err = err + 1
-        valid = False
-        virus_errors.append(line.rstrip())
-
-output_handle.close()
-input_handle.close()
-
-# Print Virus Sequences that had errors.
-print("\n\n=========================================")
-if virus_errors:
-    print("Error extracting information for viruses:")
-    for virusErr in virus_errors:
-        print(virusErr)
-else:
-    print("\nAll sequences successfully processed!")
-print("=========================================")
-
-# Departure information
-print("Output written to: " + output_path)
-print("\nGoodbye! The Momo loves you!")
+if __name__ == "__main__":
+    run(input_path, output_path, "python", progress_interval, summary_path,
+        error_path, error_sample, name_pattern = name_pattern,
+        alphabet = alphabet, replace_target = replace_target,
+        replace_char = replace_char, processes = processes,
+        index_path = index_path)
@@ -0,0 +1,315 @@
+'''Batch Renaming of Many FASTA Files
+
+Renames every file listed in a manifest or matched by glob patterns with a
+bounded process pool, one file per task:
+
+    python batch.py --glob "samples/*.fasta" --output-directory renamed
+    python batch.py --manifest manifest.tsv --processes 8 --report errors.tsv
+
+A manifest holds one input path per line, optionally followed by a tab and
+the output path.  Blank lines and lines starting with '#' are ignored.  Inputs
+without an output path are written to the output directory, or next to the
+input, with OUTPUT_SUFFIX added before the extension as the renamer scripts
+do, e.g. "sample.fasta.gz" becomes "sample_OUTPUT.fasta.gz".
+
+Outputs are written to a temporary path and moved into place once renamed,
+so an output that exists is always complete.  Missing output directories are
+created, and a batch in which two files would be renamed to the same output
+is refused before any file is renamed.  An output is up to date, and its
+input skipped, when it is at least as new as its input and is not empty
+unless the input is.
+
+Files are handed to the pool largest first so a large file picked up last
+does not leave the other processes idle.  The errors of every file are
+streamed into one report as soon as the file is done, so only the counts and
+a sample of error lines per file are kept in memory.
+'''
+
+from argparse import ArgumentParser
+from multiprocessing import Pool
+import csv
+import glob
+import os
+import sys
+
+from rejects import ErrorSink
+from renamer import BACKENDS, rename_file
+from validation import ALPHABETS
+
+OUTPUT_SUFFIX = "_OUTPUT"
+COMPRESSED_EXTENSIONS = (".gz", ".bgz", ".bgzf")
+ERROR_SAMPLE = 100
+REPORT_COLUMNS = ("input", "kind", "error")
+
+def read_manifest(manifest_path):
+    """Reads the (input path, output path) pairs of a manifest.
+
+    Relative paths are taken relative to the manifest's directory.
+
+    :returns: List of pairs; the output path is None if not given.
+    """
+    directory = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    with open(manifest_path) as handle:
+        for line in handle:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields = [field.strip() for field in line.split("\t")]
+            inputPath = os.path.join(directory, fields[0])
+            outputPath = None
+            if len(fields) > 1 and fields[1]:
+                outputPath = os.path.join(directory, fields[1])
+            jobs.append((inputPath, outputPath))
+    return jobs
+
+def expand_globs(patterns):
+    """Returns the sorted, de-duplicated files matched by glob patterns.
+
+    Files named like outputs, i.e. ending in OUTPUT_SUFFIX before their
+    extension, are left out so a rerun does not rename its own outputs.
+    """
+    paths = set()
+    for pattern in patterns:
+        paths.update(path for path in glob.glob(pattern, recursive = True)
+            if os.path.isfile(path) and not _isOutputName(path))
+    return [(path, None) for path in sorted(paths)]
+
+def output_path_for(input_path, output_directory = None,
+    suffix = OUTPUT_SUFFIX):
+    """Derives the output path of an input path.
+
+    :param output_directory: Directory of the output.  Defaults to the
+                             directory of the input.
+    :param suffix:           Text added before the file's extension.
+    """
+    directory, name = os.path.split(input_path)
+    compression = ""
+    root, extension = os.path.splitext(name)
+    if extension.lower() in COMPRESSED_EXTENSIONS:
+        compression = extension
+        root, extension = os.path.splitext(root)
+    return os.path.join(output_directory or directory,
+        root + suffix + extension + compression)
+
+def is_up_to_date(input_path, output_path):
+    """Returns True if the output exists and need not be renamed again."""
+    try:
+        inputStat = os.stat(input_path)
+        outputStat = os.stat(output_path)
+    except FileNotFoundError:
+        return False
+    if outputStat.st_mtime_ns < inputStat.st_mtime_ns:
+        return False
+    return outputStat.st_size > 0 or inputStat.st_size == 0
+
+class ErrorReport:
+
+    """Tab-separated report of the errors of every file of a batch.
+
+    Each row holds the input path, the kind of error ("record" for a
+    rejected header or sequence line, "failure" for a file that could not
+    be renamed) and the error line or message.  Fields holding a tab, a
+    line break or a quote are quoted the way the csv module does.
+    """
+
+    def __init__(self, report_path):
+        """Creates the report and writes its header row."""
+        self.handle = open(report_path, "w", newline = "")
+        self.writer = csv.writer(self.handle, delimiter = "\t",
+            lineterminator = "\n")
+        self.writer.writerow(REPORT_COLUMNS)
+
+    def add(self, result, errors_path = None):
+        """Writes the errors of a finished file.
+
+        :param result:      Result dictionary of the file.
+        :param errors_path: Optional side file of the file's ErrorSink
+                            with every rejected line; it is removed once
+                            copied.
+        """
+        if result["failure"] is not None:
+            self.writer.writerow((result["input"], "failure",
+                result["failure"]))
+        if errors_path is None or not os.path.exists(errors_path):
+            return
+        with open(errors_path) as handle:
+            next(handle, None)
+            for row in handle:
+                self.writer.writerow((result["input"], "record",
+                    row.rstrip("\n").split("\t", 3)[3]))
+        os.remove(errors_path)
+
+    def close(self):
+        self.handle.close()
+
+def rename_batch(jobs, output_directory = None, processes = None,
+    force = False, report = None, error_report = None,
+    error_sample = ERROR_SAMPLE, **options):
+    """Renames many files with a bounded process pool.
+
+    :param jobs:             List of (input path, output path) pairs as
+                             returned by read_manifest or expand_globs.
+    :param output_directory: Directory of outputs not given by the jobs.
+    :param processes:        Size of the process pool.  Defaults to the
+                             number of CPUs.
+    :param force:            Renames files even if their output is up to
+                             date.
+    :param report:           Optional callable called with each result as
+                             soon as its file is done.
+    :param error_report:     Optional path of an ErrorReport every error
+                             of every file is written to as soon as the
+                             file is done.
+    :param error_sample:     Number of error lines kept per file in the
+                             results.  None keeps them all.
+    :param options:          Keyword arguments for rename_file.
+    :returns:                List of result dictionaries in job order with
+                             the input, output, status ("renamed",
+                             "skipped" or "failed"), records, errors,
+                             a sample of the error_lines and failure
+                             message.
+    :raises ValueError:      If jobs share an output path.
+    """
+    jobs = [(inputPath, outputPath or output_path_for(inputPath,
+        output_directory)) for inputPath, outputPath in jobs]
+    claimed = dict()
+    collisions = []
+    for inputPath, outputPath in jobs:
+        key = os.path.normcase(os.path.abspath(outputPath))
+        if key in claimed:
+            collisions.append("{0} and {1} -> {2}".format(claimed[key],
+                inputPath, outputPath))
+        else:
+            claimed[key] = inputPath
+    if collisions:
+        raise ValueError("Files would be renamed to the same output: "
+            + "; ".join(collisions))
+
+    results = []
+    tasks = []
+    for index, (inputPath, outputPath) in enumerate(jobs):
+        result = {"input": inputPath, "output": outputPath,
+            "status": "skipped", "records": 0, "errors": 0,
+            "error_lines": [], "failure": None}
+        results.append(result)
+        if not force and is_up_to_date(inputPath, outputPath):
+            if report is not None:
+                report(result)
+            continue
+        size = os.path.getsize(inputPath) if os.path.exists(inputPath) else 0
+        tasks.append((size, index, inputPath, outputPath,
+            error_report is not None, error_sample, options))
+
+    # Largest first, so the pool is not left waiting on a late large file.
+    tasks.sort(key = lambda task: (-task[0], task[1]))
+    errorReport = ErrorReport(error_report) if error_report else None
+    try:
+        if tasks:
+            processes = min(processes or os.cpu_count() or 1, len(tasks))
+            with Pool(processes) as pool:
+                for index, update, errorsPath in pool.imap_unordered(
+                    _renameJob, [task[1:] for task in tasks]):
+                    results[index].update(update)
+                    if errorReport is not None:
+                        errorReport.add(results[index], errorsPath)
+                    if report is not None:
+                        report(results[index])
+    finally:
+        if errorReport is not None:
+            errorReport.close()
+    return results
+
+def main(argv = None):
+    parser = ArgumentParser(description = "Renames the FASTA headers of "
+        "many files in parallel.")
+    parser.add_argument("--manifest", help = "File listing one input path "
+        "per line, optionally followed by a tab and the output path.")
+    parser.add_argument("--glob", action = "append", default = [],
+        help = "Glob pattern of input files; may be repeated.")
+    parser.add_argument("--output-directory",
+        help = "Directory of outputs not named by the manifest.  Defaults "
+        "to the directory of each input.")
+    parser.add_argument("--processes", type = int,
+        help = "Files renamed in parallel.  Defaults to the CPU count.")
+    parser.add_argument("--force", action = "store_true",
+        help = "Rename files even if their output is up to date.")
+    parser.add_argument("--report", help = "Path of the aggregated "
+        "tab-separated error report.")
+    parser.add_argument("--backend", choices = BACKENDS, default = "python",
+        help = "Renamer backend.")
+    parser.add_argument("--pattern", help = "Header regular expression.  "
+        "Defaults to the backend's pattern.")
+    parser.add_argument("--alphabet", choices = sorted(ALPHABETS),
+        help = "Sequence alphabet.")
+    parser.add_argument("--line-width", type = int, default = 80,
+        help = "Sequence characters per line of the biopython backend.")
+    args = parser.parse_args(argv)
+    if not args.manifest and not args.glob:
+        parser.error("give a --manifest or at least one --glob")
+
+    jobs = read_manifest(args.manifest) if args.manifest else []
+    jobs.extend(expand_globs(args.glob))
+    if args.output_directory:
+        os.makedirs(args.output_directory, exist_ok = True)
+
+    progress = {"done": 0}
+    def report(result):
+        progress["done"] = progress["done"] + 1
+        print("[{0}/{1}] {2} {3}: {4} renamed, {5} errors".format(
+            progress["done"], len(jobs), result["status"], result["input"],
+            result["records"], result["errors"]))
+
+    try:
+        results = rename_batch(jobs, args.output_directory, args.processes,
+            args.force, report, args.report, backend = args.backend,
+            name_pattern = args.pattern, alphabet = args.alphabet,
+            line_width = args.line_width)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    counts = dict((status, 0) for status in ("renamed", "skipped", "failed"))
+    for result in results:
+        counts[result["status"]] = counts[result["status"]] + 1
+    print("{0} renamed, {1} skipped, {2} failed, {3} errors".format(
+        counts["renamed"], counts["skipped"], counts["failed"],
+        sum(result["errors"] for result in results)))
+    return 1 if counts["failed"] else 0
+
+def _isOutputName(path):
+    root, extension = os.path.splitext(os.path.basename(path))
+    if extension.lower() in COMPRESSED_EXTENSIONS:
+        root = os.path.splitext(root)[0]
+    return root.endswith(OUTPUT_SUFFIX)
+
+def _renameJob(task):
+    """Renames one file to a temporary path and moves it into place.
+
+    :returns: Tuple of the job's index, the update of its result and the
+              side file of its rejected lines, if any.
+    """
+    index, inputPath, outputPath, collectErrors, errorSample, options = task
+    directory, name = os.path.split(outputPath)
+    # Keep the suffix, which decides whether the output is compressed.
+    temporaryPath = os.path.join(directory, ".{0}.{1}".format(os.getpid(),
+        name))
+    errorSink = ErrorSink(temporaryPath + ".errors" if collectErrors
+        else None, errorSample)
+    try:
+        if directory:
+            os.makedirs(directory, exist_ok = True)
+        ctr, err, virus_errors = rename_file(inputPath, temporaryPath,
+            error_sink = errorSink, **options)
+        errorSink.close()
+        os.replace(temporaryPath, outputPath)
+    except Exception as exc:
+        errorSink.close()
+        for path in (temporaryPath, errorSink.path):
+            if path is not None and os.path.exists(path):
+                os.remove(path)
+        return index, {"status": "failed",
+            "failure": "{0}: {1}".format(type(exc).__name__, exc)}, None
+    return index, {"status": "renamed", "records": ctr, "errors": err,
+        "error_lines": virus_errors}, errorSink.path
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+'''Benchmarks for the FASTA Renamers
+
+Generates synthetic FASTA files with NCBI-style pipe-delimited headers, runs
+both renamer backends on them and reports wall time, peak resident memory and
+throughput side by side:
+
+    python benchmarks.py --records 1000 10000 --length 1000 10000
+
+Each renamer runs through the renamer command line in its own process so its
+peak memory can be measured in isolation.  Results can be saved as JSON and
+compared against a saved baseline to catch performance regressions:
+
+    python benchmarks.py --save baseline.json
+    python benchmarks.py --baseline baseline.json --tolerance 0.2
+
+Synthetic files are reproducible: the same seed, record count, sequence length
+and error rate always produce the same file.  A share of the records given by
+the error rate is made invalid, half of them with a header the renamers cannot
+parse and half with a sequence line outside the nucleotide alphabet.
+
+Every renamer validates sequences against the same alphabet, strict unless
+--alphabet is given, so the invalid sequence lines are left out by all of
+them and the timings cover the same work.
+'''
+
+from argparse import ArgumentParser
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from validation import ALPHABETS
+
+SCRIPT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+RENAMER_SCRIPT = os.path.join(SCRIPT_DIRECTORY, "renamer.py")
+# Backends of the renamer module.
+RENAMERS = ("python", "biopython")
+# Sequence alphabet every renamer validates against, whatever its default.
+ALPHABET = "strict"
+VIRUS_NAMES = [
+    "Tomato yellow leaf curl virus",
+    "Bean golden mosaic virus",
+    "African cassava mosaic virus",
+    "Cotton leaf curl Multan virus",
+    "Maize streak Virus",
+]
+
+def generate_fasta(path, records, sequence_length, error_rate = 0.0,
+    line_width = 70, seed = 0):
+    """Writes a synthetic FASTA file with NCBI-style headers.
+
+    :param path:            Path of the file to write.
+    :param records:         Number of records.
+    :param sequence_length: Number of bases per record.
+    :param error_rate:      Share of records made invalid, from 0 to 1.
+    :param line_width:      Number of bases per sequence line.
+    :param seed:            Seed of the random number generator.
+    :returns:               Number of invalid records written.
+    """
+    generator = random.Random(seed)
+    # Sequences are cut from one random pool so generation stays cheap.
+    pool = "".join(generator.choices("ACGT", k = 2 * sequence_length + 1))
+    invalid = 0
+    with open(path, "w") as handle:
+        for index in range(records):
+            start = generator.randrange(sequence_length + 1)
+            sequence = pool[start:start + sequence_length]
+            header = "gi|{0}|gb|AB{0:06d}.{1}|{2} isolate {0}, complete " \
+                "genome".format(index, generator.randint(1, 9),
+                generator.choice(VIRUS_NAMES))
+            if generator.random() < error_rate:
+                invalid = invalid + 1
+                if invalid % 2:
+                    header = "gi|{0}|gb|AB{0:06d}.1|unnamed isolate {0}" \
+                        .format(index)
+                else:
+                    sequence = sequence[:-1] + "x"
+            handle.write(">" + header + "\n")
+            for lineStart in range(0, len(sequence), line_width):
+                handle.write(sequence[lineStart:lineStart + line_width]
+                    + "\n")
+    return invalid
+
+def run_renamer(renamer, input_path, work_directory, alphabet = ALPHABET):
+    """Runs a renamer backend on a file in a separate process.
+
+    :param renamer:        One of the RENAMERS.
+    :param input_path:     Path of the FASTA file to rename.
+    :param work_directory: Directory the output is written to.
+    :param alphabet:       Sequence alphabet the renamer validates against.
+    :returns:              Tuple of the wall time in seconds and the peak
+                           resident memory in bytes.
+    :raises RuntimeError:  If the renamer fails.
+    """
+    outputPath = os.path.join(work_directory, "output.fasta")
+    command = [sys.executable, RENAMER_SCRIPT, input_path, outputPath,
+        "--backend", renamer, "--alphabet", alphabet]
+
+    # Errors go to a file rather than a pipe: a child filling the pipe
+    # would block while this process waits for it to exit.
+    with tempfile.TemporaryFile() as errorHandle:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, cwd = work_directory,
+            stdout = subprocess.DEVNULL, stderr = errorHandle)
+        # wait4 gives the resource usage of this child alone.
+        pid, status, usage = os.wait4(process.pid, 0)
+        wallTime = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        errorHandle.seek(0)
+        errors = errorHandle.read().decode("utf-8", "replace")
+    if os.path.exists(outputPath):
+        os.remove(outputPath)
+    if process.returncode != 0:
+        raise RuntimeError("{0} renamer failed:\n{1}".format(renamer,
+            errors))
+
+    peakMemory = usage.ru_maxrss
+    if sys.platform != "darwin":
+        peakMemory = peakMemory * 1024
+    return wallTime, peakMemory
+
+def run_benchmarks(record_counts, sequence_lengths, error_rate = 0.01,
+    renamers = None, repeat = 1, seed = 0, alphabet = ALPHABET):
+    """Benchmarks the renamers on every record count/length combination.
+
+    The best wall time out of the repeated runs is kept, together with
+    the highest peak memory.  Every renamer validates against the same
+    alphabet, so all of them leave out the same invalid records.
+
+    :returns: List of result dictionaries, one per renamer and file.
+    """
+    renamers = renamers or RENAMERS
+    results = []
+    workDirectory = tempfile.mkdtemp(prefix = "renamer_benchmarks_")
+    try:
+        for records in record_counts:
+            for length in sequence_lengths:
+                inputPath = os.path.join(workDirectory,
+                    "synthetic_{0}_{1}.fasta".format(records, length))
+                generate_fasta(inputPath, records, length, error_rate,
+                    seed = seed)
+                size = os.path.getsize(inputPath)
+                for renamer in renamers:
+                    runs = [run_renamer(renamer, inputPath, workDirectory,
+                        alphabet) for run in range(repeat)]
+                    wallTime = min(run[0] for run in runs)
+                    results.append({
+                        "renamer": renamer,
+                        "records": records,
+                        "sequence_length": length,
+                        "error_rate": error_rate,
+                        "alphabet": alphabet,
+                        "bytes": size,
+                        "wall_seconds": wallTime,
+                        "peak_rss_bytes": max(run[1] for run in runs),
+                        "bytes_per_second": size / wallTime,
+                        "records_per_second": records / wallTime,
+                    })
+                os.remove(inputPath)
+    finally:
+        shutil.rmtree(workDirectory)
+    return results
+
+def format_results(results):
+    """Formats benchmark results as a plain text table."""
+    header = ("Renamer", "Records", "Length", "MB", "Wall s", "Peak MB",
+        "MB/s", "Records/s")
+    rows = [header]
+    for result in results:
+        rows.append((result["renamer"], str(result["records"]),
+            str(result["sequence_length"]),
+            "{0:.1f}".format(result["bytes"] / 1e6),
+            "{0:.3f}".format(result["wall_seconds"]),
+            "{0:.1f}".format(result["peak_rss_bytes"] / 1e6),
+            "{0:.1f}".format(result["bytes_per_second"] / 1e6),
+            "{0:.0f}".format(result["records_per_second"])))
+    widths = [max(len(row[column]) for row in rows)
+        for column in range(len(header))]
+    lines = []
+    for index, row in enumerate(rows):
+        lines.append("  ".join(cell.ljust(width) if column == 0
+            else cell.rjust(width)
+            for column, (cell, width) in enumerate(zip(row, widths))))
+        if index == 0:
+            lines.append("  ".join("-" * width for width in widths))
+    return "\n".join(lines)
+
+def find_regressions(results, baseline, tolerance = 0.2):
+    """Compares results against a baseline from an earlier run.
+
+    :param results:   Results of this run.
+    :param baseline:  Results of the baseline run.
+    :param tolerance: Allowed relative slowdown, e.g. 0.2 for 20%.
+    :returns:         List of messages, one per regression found.
+    """
+    def key(result):
+        return (result["renamer"], result["records"],
+            result["sequence_length"], result["error_rate"],
+            result.get("alphabet", ALPHABET))
+
+    baselineResults = dict((key(result), result) for result in baseline)
+    regressions = []
+    for result in results:
+        previous = baselineResults.get(key(result))
+        if previous is None:
+            continue
+        slowdown = result["wall_seconds"] / previous["wall_seconds"] - 1
+        if slowdown > tolerance:
+            regressions.append("{0} renamer, {1} records of length {2}: "
+                "{3:.3f}s vs {4:.3f}s ({5:+.0%})".format(result["renamer"],
+                result["records"], result["sequence_length"],
+                result["wall_seconds"], previous["wall_seconds"], slowdown))
+    return regressions
+
+def main(argv = None):
+    parser = ArgumentParser(description = "Benchmarks the FASTA renamers "
+        "on synthetic NCBI-style FASTA files.")
+    parser.add_argument("--records", type = int, nargs = "+",
+        default = [1000, 10000], help = "Record counts to generate.")
+    parser.add_argument("--length", type = int, nargs = "+",
+        default = [1000], help = "Sequence lengths to generate.")
+    parser.add_argument("--error-rate", type = float, default = 0.01,
+        help = "Share of invalid records.")
+    parser.add_argument("--renamer", choices = RENAMERS,
+        action = "append", help = "Renamer to run; defaults to all.")
+    parser.add_argument("--alphabet", choices = sorted(ALPHABETS),
+        default = ALPHABET, help = "Sequence alphabet every renamer "
+        "validates against.")
+    parser.add_argument("--repeat", type = int, default = 1,
+        help = "Runs per renamer and file; the best time is kept.")
+    parser.add_argument("--seed", type = int, default = 0,
+        help = "Seed of the synthetic files.")
+    parser.add_argument("--save", help = "Path to save results as JSON.")
+    parser.add_argument("--baseline",
+        help = "JSON results to check for regressions against.")
+    parser.add_argument("--tolerance", type = float, default = 0.2,
+        help = "Allowed relative slowdown against the baseline.")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.records, args.length, args.error_rate,
+        args.renamer, args.repeat, args.seed, args.alphabet)
+    print(format_results(results))
+
+    if args.save:
+        with open(args.save, "w") as handle:
+            json.dump(results, handle, indent = 2)
+            handle.write("\n")
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as handle:
+            regressions = find_regressions(results, json.load(handle),
+                args.tolerance)
+        if regressions:
+            print("\nRegressions against " + args.baseline + ":")
+            for regression in regressions:
+                print(regression)
+            status = 1
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
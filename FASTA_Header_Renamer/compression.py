@@ -0,0 +1,237 @@
+'''Transparent gzip/BGZF Input and Output for the FASTA Renamers
+
+Input files are sniffed for the gzip magic number instead of trusting their
+extension.  Compressed input is decompressed by a background thread that stays
+a few blocks ahead of the reader, so decompression overlaps with renaming.
+Multi-member files, BGZF included, are read like any other gzip file.
+
+Output paths ending in .gz, .bgz or .bgzf are written as BGZF: a series of
+independent gzip members holding at most 0xff00 bytes each, as produced by
+samtools' bgzip.  Members are compressed by a pool of threads and written in
+order, so compression runs on several cores at once and the result can be
+read by gzip, zcat and htslib alike.
+'''
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue, Empty
+import gzip
+import io
+import os
+import struct
+import threading
+import zlib
+
+GZIP_MAGIC = b"\x1f\x8b"
+COMPRESSED_SUFFIXES = (".gz", ".bgz", ".bgzf")
+BLOCK_SIZE = 8 * 1024 * 1024
+BGZF_BLOCK_SIZE = 0xff00
+BGZF_EOF = bytes.fromhex(
+    "1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+def is_compressed(path):
+    """Returns True if the file at path starts with the gzip magic."""
+    with open(path, "rb") as handle:
+        return handle.read(2) == GZIP_MAGIC
+
+def open_input(path, block_size = BLOCK_SIZE, prefetch = 4):
+    """Opens a plain or gzip compressed file for binary reading.
+
+    Either way the returned file object has a raw attribute whose tell
+    method gives the position in the file on disk.
+
+    :param path:       Path of the file.
+    :param block_size: Size of the blocks decompressed ahead of time.
+    :param prefetch:   Number of blocks decompressed ahead of time.
+    """
+    raw = open(path, "rb")
+    if raw.peek(2)[:2] == GZIP_MAGIC:
+        return PrefetchReader(gzip.GzipFile(fileobj = raw), raw, block_size,
+            prefetch)
+    return raw
+
+def open_output(path, threads = None, level = 6):
+    """Opens a file for binary writing, as BGZF if its suffix says so.
+
+    :param path:    Path of the file.
+    :param threads: Number of compression threads.  Defaults to the
+                    number of CPUs.
+    :param level:   zlib compression level.
+    """
+    raw = open(path, "wb")
+    if path.endswith(COMPRESSED_SUFFIXES):
+        return BgzfWriter(raw, threads, level)
+    return raw
+
+def compress_block(data, level = 6):
+    """Compresses data into a single BGZF member.
+
+    :param data:  At most BGZF_BLOCK_SIZE bytes.
+    :param level: zlib compression level.
+    :returns:     Bytes of the gzip member including the BC extra field.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    compressed = compressor.compress(data) + compressor.flush()
+    # BSIZE is the size of the whole member minus one.
+    header = struct.pack("<4BI2BH2BHH", 31, 139, 8, 4, 0, 0, 255, 6,
+        66, 67, 2, len(compressed) + 25)
+    trailer = struct.pack("<II", zlib.crc32(data), len(data))
+    return header + compressed + trailer
+
+class PrefetchReader(io.BufferedIOBase):
+
+    """Reads a file object ahead of time in a background thread.
+
+    Blocks are handed over through a bounded queue, so no more than
+    `prefetch` blocks are held in memory at once.
+    """
+
+    def __init__(self, source, raw, block_size = BLOCK_SIZE, prefetch = 4):
+        """Starts reading the source.
+
+        :param source:     File object to read ahead, e.g. a GzipFile.
+        :param raw:        File object of the file on disk.
+        :param block_size: Number of bytes per read of the source.
+        :param prefetch:   Number of blocks read ahead.
+        """
+        super().__init__()
+        self.source = source
+        self.raw = raw
+        self.block_size = block_size
+        self.queue = Queue(prefetch)
+        self.pending = b""
+        self.eof = False
+        self.stopping = False
+        self.thread = threading.Thread(target = self._fill, daemon = True)
+        self.thread.start()
+
+    def readable(self):
+        return True
+
+    def read(self, size = -1):
+        """Reads size bytes, or everything left if size is negative."""
+        if size is None:
+            size = -1
+        chunks = [self.pending]
+        have = len(self.pending)
+        while (size < 0 or have < size) and not self.eof:
+            block = self._nextBlock()
+            chunks.append(block)
+            have = have + len(block)
+        data = b"".join(chunks)
+        self.pending = b""
+        if 0 <= size < len(data):
+            self.pending = data[size:]
+            data = data[:size]
+        return data
+
+    def read1(self, size = -1):
+        """Reads at most size bytes from at most one prefetched block."""
+        if size is None:
+            size = -1
+        if not self.pending and not self.eof:
+            self.pending = self._nextBlock()
+        data = self.pending
+        self.pending = b""
+        if 0 <= size < len(data):
+            self.pending = data[size:]
+            data = data[:size]
+        return data
+
+    def close(self):
+        """Stops the background thread and closes both file objects."""
+        if not self.closed:
+            self.stopping = True
+            while self.thread.is_alive():
+                try:
+                    self.queue.get(timeout = 0.1)
+                except Empty:
+                    pass
+            self.source.close()
+            self.raw.close()
+        super().close()
+
+    def _fill(self):
+        """Reads the source block by block into the queue."""
+        try:
+            while not self.stopping:
+                block = self.source.read(self.block_size)
+                self.queue.put(block)
+                if not block:
+                    break
+        except Exception as exc:
+            self.queue.put(exc)
+
+    def _nextBlock(self):
+        """Takes the next block from the queue."""
+        block = self.queue.get()
+        if isinstance(block, Exception):
+            self.eof = True
+            raise block
+        if not block:
+            self.eof = True
+        return block
+
+class BgzfWriter(io.BufferedIOBase):
+
+    """Writes BGZF, compressing blocks on a pool of threads.
+
+    zlib releases the interpreter lock while it compresses, so blocks
+    submitted to the pool are compressed in parallel.  At most twice as
+    many blocks as there are threads are in flight at any time.
+    """
+
+    def __init__(self, raw, threads = None, level = 6):
+        """Wraps a file object opened for binary writing.
+
+        :param raw:     File object the BGZF members are written to.
+        :param threads: Number of compression threads.  Defaults to the
+                        number of CPUs.
+        :param level:   zlib compression level.
+        """
+        super().__init__()
+        threads = threads or os.cpu_count() or 1
+        self.raw = raw
+        self.level = level
+        self.executor = ThreadPoolExecutor(threads)
+        self.inFlight = deque()
+        self.maxInFlight = 2 * threads
+        self.buffer = b""
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        """Buffers data and compresses every full block."""
+        size = len(data)
+        if self.buffer:
+            data = self.buffer + data
+        end = len(data) - len(data) % BGZF_BLOCK_SIZE
+        for start in range(0, end, BGZF_BLOCK_SIZE):
+            self._submit(data[start:start + BGZF_BLOCK_SIZE])
+        self.buffer = data[end:]
+        return size
+
+    def flush(self):
+        """Does nothing; partial blocks are only written on close."""
+        pass
+
+    def close(self):
+        """Writes the remaining data and the EOF marker, then closes."""
+        if not self.closed:
+            if self.buffer:
+                self._submit(self.buffer)
+                self.buffer = b""
+            while self.inFlight:
+                self.raw.write(self.inFlight.popleft().result())
+            self.raw.write(BGZF_EOF)
+            self.executor.shutdown()
+            self.raw.close()
+        super().close()
+
+    def _submit(self, block):
+        """Queues a block for compression and writes finished ones."""
+        self.inFlight.append(self.executor.submit(compress_block, block,
+            self.level))
+        while len(self.inFlight) > self.maxInFlight:
+            self.raw.write(self.inFlight.popleft().result())
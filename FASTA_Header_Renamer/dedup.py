@@ -0,0 +1,230 @@
+'''Streaming Duplicate Accession and Sequence Detection
+
+Merged NCBI downloads often hold the same accession or the same sequence more
+than once.  The Deduplicator spots them while renaming without holding on to
+any sequence: every accession and every sequence is reduced to a fixed-size
+BLAKE2b digest, and only the digests are kept.
+
+Two kinds of digest stores are available:
+ * DigestSet:   An exact set of digests.  16-byte digests make a collision,
+                and so a record wrongly taken for a duplicate, practically
+                impossible; memory grows with the number of distinct records.
+ * BloomFilter: A fixed-size bit array sized for an expected number of
+                records and a false positive rate.  Memory stays constant no
+                matter how large the input is, at the price of that share of
+                unique records being taken for duplicates.
+
+The accession of a header is the fourth '|' separated field without its
+version, e.g. AB123 for gi|1|gb|AB123.1|..., or the first word of the header
+if it has fewer fields.  Sequences are compared by the sequence text without
+line breaks, so the same sequence wrapped differently is still a duplicate.
+
+Duplicates are either dropped or only reported.  In both cases they are
+counted in the deduplicator's duplicate_count attribute, and a sample of at
+most sample_size of them is listed in its duplicates attribute, so memory
+stays bounded however many duplicates there are.
+'''
+
+from hashlib import blake2b
+import math
+
+KEYS = ("accession", "sequence")
+DIGEST_SIZE = 16
+DUPLICATE_SAMPLE = 100
+
+def accession_key(header):
+    """Returns the accession of a header line or description as bytes."""
+    header = header.lstrip(b">")
+    fields = header.split(b"|", 4)
+    if len(fields) >= 4:
+        return fields[3].split(b".", 1)[0].strip()
+    words = header.split(None, 1)
+    return words[0] if words else b""
+
+class DigestSet:
+
+    """Exact set of fixed-size digests."""
+
+    def __init__(self):
+        self.digests = set()
+
+    def __len__(self):
+        return len(self.digests)
+
+    def add(self, digest):
+        """Adds a digest.
+
+        :returns: True if the digest was already in the set.
+        """
+        if digest in self.digests:
+            return True
+        self.digests.add(digest)
+        return False
+
+class BloomFilter:
+
+    """Fixed-size probabilistic set of digests.
+
+    Each digest sets `hash_count` bits derived from it by double hashing,
+    so digests must be at least 16 bytes long.
+    """
+
+    def __init__(self, capacity, error_rate = 0.001):
+        """Sizes the bit array.
+
+        :param capacity:    Number of distinct digests expected.
+        :param error_rate:  Wanted false positive rate once capacity
+                            digests have been added.
+        :raises ValueError: If capacity or error_rate is out of range.
+        """
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError("Bloom filter needs a positive capacity and "
+                "an error rate between 0 and 1.")
+        self.bit_count = max(8, int(math.ceil(-capacity * math.log(error_rate)
+            / math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.bit_count / capacity
+            * math.log(2))))
+        self.bits = bytearray((self.bit_count + 7) // 8)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, digest):
+        """Adds a digest.
+
+        :returns: True if the digest may already have been added, False if
+                  it certainly was not.
+        """
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:16], "little") | 1
+        bits = self.bits
+        present = True
+        for index in range(self.hash_count):
+            bit = (first + index * second) % self.bit_count
+            mask = 1 << (bit & 7)
+            if not bits[bit >> 3] & mask:
+                present = False
+                bits[bit >> 3] = bits[bit >> 3] | mask
+        if not present:
+            self.count = self.count + 1
+        return present
+
+class Deduplicator:
+
+    """Tracks the accessions and sequences seen so far.
+
+    Renamers call check_accession once a header is renamed and
+    check_sequence once its record's sequence is complete.
+    """
+
+    def __init__(self, keys = KEYS, drop = True, capacity = None,
+        error_rate = 0.001, digest_size = DIGEST_SIZE,
+        sample_size = DUPLICATE_SAMPLE):
+        """Creates empty digest stores.
+
+        :param keys:        Which of the KEYS make a record a duplicate.
+        :param drop:        Drops duplicates if True; only reports them if
+                            False.
+        :param capacity:    Expected number of records.  If given, Bloom
+                            filters of that capacity are used instead of
+                            exact digest sets.
+        :param error_rate:  False positive rate of the Bloom filters.
+        :param digest_size: Bytes per digest, at least 16 for Bloom filters.
+        :param sample_size: Number of duplicates listed in duplicates.
+                            None lists every duplicate.
+        :raises ValueError: If a key is unknown or the digests are too
+                            short for a Bloom filter.
+        """
+        if capacity is not None and digest_size < 16:
+            raise ValueError("Bloom filters need digests of 16 bytes or "
+                "more.")
+        for key in keys:
+            if key not in KEYS:
+                raise ValueError("Unknown duplicate key: {0}.  Choose from: "
+                    "{1}".format(key, ", ".join(KEYS)))
+        self.keys = tuple(keys)
+        self.drop = drop
+        self.digest_size = digest_size
+        self.accessions = self._newStore(capacity, error_rate)
+        self.sequences = self._newStore(capacity, error_rate)
+        self.sample_size = sample_size
+        self.duplicate_count = 0
+        self.duplicates = []
+
+    def sequence_hasher(self):
+        """Returns a new hash object to feed a sequence into, or None if
+        sequences are not compared."""
+        if "sequence" not in self.keys:
+            return None
+        return blake2b(digest_size = self.digest_size)
+
+    def check_accession(self, header):
+        """Checks the accession of a header line.
+
+        :param header: Header line or description as bytes.
+        :returns:      True if the accession was seen before.
+        """
+        if "accession" not in self.keys:
+            return False
+        digest = blake2b(accession_key(header),
+            digest_size = self.digest_size).digest()
+        if self.accessions.add(digest):
+            self._recordDuplicate(header, "accession")
+            return True
+        return False
+
+    def check_sequence(self, header, hasher):
+        """Checks a complete sequence.
+
+        :param header: Header line or description of the record as bytes.
+        :param hasher: Hash object from sequence_hasher, fed with the
+                       sequence without line breaks.
+        :returns:      True if the sequence was seen before.
+        """
+        if hasher is None:
+            return False
+        if self.sequences.add(hasher.digest()):
+            self._recordDuplicate(header, "sequence")
+            return True
+        return False
+
+    def check_record(self, description, sequence):
+        """Checks a whole record held as strings.
+
+        :returns: True if the record is a duplicate.
+        """
+        header = description.encode("utf-8")
+        if self.check_accession(header):
+            return True
+        hasher = self.sequence_hasher()
+        if hasher is None:
+            return False
+        hasher.update(sequence.encode("utf-8"))
+        return self.check_sequence(header, hasher)
+
+    def _newStore(self, capacity, error_rate):
+        if capacity is None:
+            return DigestSet()
+        return BloomFilter(capacity, error_rate)
+
+    def _recordDuplicate(self, header, key):
+        self.duplicate_count = self.duplicate_count + 1
+        if self.sample_size is not None \
+            and len(self.duplicates) >= self.sample_size:
+            return
+        self.duplicates.append((header.decode("utf-8", "replace").strip()
+            .lstrip(">"), key))
+
+def deduplicate_records(records, deduplicator):
+    """Passes on (description, sequence) pairs, dropping duplicates.
+
+    A pipeline stage for the record generators of the renamer module.
+    Duplicates are only reported in the deduplicator if it does not drop
+    them.
+    """
+    for description, sequence in records:
+        if deduplicator.check_record(description, sequence) \
+            and deduplicator.drop:
+            continue
+        yield description, sequence
@@ -0,0 +1,83 @@
+'''Non-Backtracking Parser for Pipe-Delimited NCBI Headers
+
+The renamer's header pattern,
+
+    ^>.+\\|.+\\|.+\\|(.+)[.0-9]\\|(.*[vV]irus).*
+
+starts with three greedy '.+' groups, so the regex engine first runs each of
+them to the end of the line and then backs off one character at a time looking
+for the pipes.  On long description lines that is a lot of wasted work.
+
+Standard NCBI headers have exactly four pipes:
+
+    >gi|{number}|gb|{accession}.{version}|{description}
+
+For such headers there is only one way the pattern can match, so the parser
+splits the line on '|' once and checks the fields directly:
+
+ * the first three fields must not be empty, the '>' aside;
+ * the fourth field must be at least two characters long and end in '.' or a
+   digit; the accession is that field without its last character, e.g.
+   "AB123." for "AB123.1", just like the pattern's first group;
+ * the virus name runs from the start of the fifth field to the end of the
+   last "virus" or "Virus" in it, just like the pattern's greedy second group.
+
+That takes one pass over the line plus two reverse searches of the last
+field, however long the line is.  Headers with any other number of pipes fall
+back to the regular expression, which may be a custom one.
+'''
+
+import re
+
+NAME_PATTERN = rb"^>.+\|.+\|.+\|(.+)[.0-9]\|(.*[vV]irus).*"
+
+class HeaderParser:
+
+    """Extracts the accession and virus name of a header line."""
+
+    def __init__(self, name_pattern = NAME_PATTERN, fast_path = None):
+        """Compiles the fallback pattern.
+
+        :param name_pattern: Regular expression, as bytes or str, whose two
+                             groups are the accession and the virus name.
+                             Lines are parsed as the same type.
+        :param fast_path:    Parses four-pipe headers by splitting them.
+                             None does so only if name_pattern is the
+                             default pattern, whose results it matches.
+        """
+        if fast_path is None:
+            fast_path = name_pattern in (NAME_PATTERN,
+                NAME_PATTERN.decode("ascii"))
+        self.name_prog = re.compile(name_pattern)
+        self.fast_path = fast_path
+        if isinstance(name_pattern, bytes):
+            self.gt, self.pipe, self.versions = b">", b"|", b".0123456789"
+            self.lower, self.upper = b"virus", b"Virus"
+        else:
+            self.gt, self.pipe, self.versions = ">", "|", ".0123456789"
+            self.lower, self.upper = "virus", "Virus"
+
+    def parse(self, line):
+        """Parses a header line.
+
+        :param line: Header line including its '>'; a trailing newline is
+                     ignored.
+        :returns:    Tuple of the accession and the virus name, or None if
+                     the line is not a valid header.
+        """
+        if self.fast_path:
+            fields = line.split(self.pipe)
+            if len(fields) == 5:
+                first, second, third, accession, description = fields
+                if len(first) > 1 and second and third \
+                    and len(accession) > 1 \
+                    and accession[-1:] in self.versions \
+                    and first[:1] == self.gt:
+                    end = max(description.rfind(self.lower),
+                        description.rfind(self.upper))
+                    if end != -1:
+                        return accession[:-1], description[:end + 5]
+        nameMatch = self.name_prog.match(line)
+        if nameMatch is None:
+            return None
+        return nameMatch.group(1, 2)
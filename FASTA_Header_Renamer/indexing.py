@@ -0,0 +1,206 @@
+'''FASTA Index Writing and Memory-Mapped Record Lookup
+
+Writes a samtools-style .fai index while the renamed FASTA file is being
+written.  Every line of the index describes one record:
+
+NAME<TAB>LENGTH<TAB>OFFSET<TAB>LINEBASES<TAB>LINEWIDTH
+
+ * NAME is the header line without the leading '>'; for renamed files this is
+   the {accession}_{virus} header.
+ * LENGTH is the number of sequence characters in the record.
+ * OFFSET is the byte offset of the first sequence character.
+ * LINEBASES and LINEWIDTH are the number of sequence characters and the
+   number of bytes, newline included, of the record's first sequence line.
+
+The index is read back by FastaIndex, which memory-maps the FASTA file and
+slices a record out of it without reading anything else.
+'''
+
+import mmap
+
+class IndexingWriter:
+
+    """Writes to a FASTA output handle and indexes what is written.
+
+    Writes may be split anywhere, not only at line boundaries, so this
+    can wrap the output of the streaming renamer as well as a plain
+    copy of an already renamed file.  Index lines are written as soon
+    as a record is complete, so memory use does not grow with the
+    number of records.
+    """
+
+    def __init__(self, output_handle, index_handle):
+        """Wraps the output handle.
+
+        :param output_handle: FASTA file object opened in binary mode.
+        :param index_handle:  Index file object opened in text mode.
+        """
+        self.output_handle = output_handle
+        self.index_handle = index_handle
+        self.offset = 0
+        self.atLineStart = True
+        self.header = None
+        self.record = None
+
+    def write(self, data):
+        """Writes data to the output and indexes any records in it."""
+        self.output_handle.write(data)
+        base = self.offset
+        find = data.find
+        pos = 0
+        size = len(data)
+        while pos < size:
+            if self.header is not None:
+                end = find(b"\n", pos)
+                if end == -1:
+                    self.header.append(data[pos:])
+                    break
+                self.header.append(data[pos:end])
+                self._startRecord(b"".join(self.header), base + end + 1)
+                self.header = None
+                self.atLineStart = True
+                pos = end + 1
+            elif self.atLineStart and data[pos] == 0x3E: # '>'
+                self._finishRecord()
+                self.header = []
+                pos = pos + 1
+            else:
+                end = find(b"\n>", pos) + 1 or size
+                self._addSequence(data[pos:end])
+                self.atLineStart = data[end - 1] == 0x0A # '\n'
+                pos = end
+        self.offset = base + size
+
+    def finish(self):
+        """Writes the index line of the last record."""
+        if self.header is not None:
+            self._startRecord(b"".join(self.header), self.offset)
+            self.header = None
+        self._finishRecord()
+
+    def close(self):
+        """Finishes the index and closes both handles."""
+        self.finish()
+        self.output_handle.close()
+        self.index_handle.close()
+
+    def _startRecord(self, name, offset):
+        """Opens the record whose sequence starts at offset."""
+        # [name, length, offset, line bases, bases seen on the first line]
+        self.record = [name, 0, offset, None, 0]
+
+    def _addSequence(self, sequence):
+        """Adds a piece of sequence text to the open record."""
+        record = self.record
+        if record is None:
+            return
+        newlines = sequence.count(b"\n")
+        record[1] = record[1] + len(sequence) - newlines
+        if record[3] is None:
+            if newlines:
+                record[3] = record[4] + sequence.find(b"\n")
+            else:
+                record[4] = record[4] + len(sequence)
+
+    def _finishRecord(self):
+        """Writes the index line of the open record, if any."""
+        record = self.record
+        if record is None:
+            return
+        name, length, offset, lineBases, partial = record
+        if lineBases is None:
+            lineBases = partial
+        self.index_handle.write("{0}\t{1}\t{2}\t{3}\t{4}\n".format(
+            name.decode("utf-8", "replace"), length, offset, lineBases,
+            lineBases + 1))
+        self.record = None
+
+class FastaIndex:
+
+    """Random access to the records of an indexed FASTA file.
+
+    The FASTA file is memory-mapped, so fetching a record only touches
+    the pages holding that record.
+    """
+
+    def __init__(self, fasta_path, index_path = None):
+        """Loads the index and maps the FASTA file.
+
+        :param fasta_path: Path of the FASTA file.
+        :param index_path: Path of its index.  Defaults to the FASTA
+                           path with '.fai' appended.
+        """
+        self.entries = dict()
+        offsets = []
+        with open(index_path or fasta_path + ".fai", "r") as index_handle:
+            for line in index_handle:
+                name, length, offset, lineBases, lineWidth = \
+                    line.rstrip("\n").split("\t")[:5]
+                offset = int(offset)
+                offsets.append(offset)
+                if name not in self.entries:
+                    self.entries[name] = (int(length), offset,
+                        int(lineBases), int(lineWidth))
+        offsets.sort()
+        self.nextOffsets = dict(zip(offsets, offsets[1:]))
+
+        self.fasta_handle = open(fasta_path, "rb")
+        self.mmap = None
+        self.size = self.fasta_handle.seek(0, 2)
+        if self.size:
+            self.mmap = mmap.mmap(self.fasta_handle.fileno(), 0,
+                access = mmap.ACCESS_READ)
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def fetch(self, name):
+        """Returns the bytes of a record, header line included.
+
+        :param name: Header of the record without the leading '>'.
+        :returns:    Bytes of the record as they appear in the file.
+        :raises KeyError: If the name is not in the index.
+        """
+        offset = self.entries[name][1]
+        nextOffset = self.nextOffsets.get(offset)
+        end = self.size
+        if nextOffset is not None:
+            end = self._headerStart(nextOffset)
+        return self.mmap[self._headerStart(offset):end]
+
+    def fetch_sequence(self, name):
+        """Returns the sequence of a record without line breaks.
+
+        Like samtools, this assumes every sequence line but the last
+        holds LINEBASES characters.
+
+        :param name: Header of the record without the leading '>'.
+        :raises KeyError: If the name is not in the index.
+        """
+        length, offset, lineBases, lineWidth = self.entries[name]
+        if lineBases == 0:
+            return b""
+        lines = (length + lineBases - 1) // lineBases
+        end = offset + (lines - 1) * lineWidth + length \
+            - (lines - 1) * lineBases
+        return self.mmap[offset:end].replace(b"\n", b"")
+
+    def close(self):
+        """Unmaps and closes the FASTA file."""
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+        self.fasta_handle.close()
+
+    def _headerStart(self, offset):
+        """Finds the start of the header line ending right before offset."""
+        return self.mmap.rfind(b"\n", 0, offset - 1) + 1
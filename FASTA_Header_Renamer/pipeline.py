@@ -0,0 +1,219 @@
+'''Pipelined Renaming with Overlapping Read, Rename and Write Stages
+
+The rename loop used to read a block, rename it and write the output one
+after the other, so on a network filesystem the read latency and the write
+latency added up.  The pipelined mode splits the loop into three stages
+running at the same time:
+
+ * a reader thread producing batches, i.e. blocks of complete lines for the
+   streaming engine or lists of records for the biopython backend;
+ * the rename stage in the calling thread;
+ * a writer thread writing the renamed output.
+
+The stages are connected by bounded queues.  A stage that runs ahead blocks
+once its queue is full, so no more than queue_size batches wait between two
+stages and memory stays bounded.  File reads and writes release the GIL, so
+the I/O waits of the reader and writer overlap with renaming.
+
+Exceptions raised in the reader or writer thread are re-raised in the
+calling thread.
+'''
+
+from queue import Full, Queue
+import io
+import threading
+
+from streaming import read_chunks
+
+QUEUE_SIZE = 4
+WRITE_SIZE = 1024 * 1024
+RECORD_BATCH_SIZE = 1000
+# Seconds a blocked stage waits before checking whether it was stopped.
+POLL_INTERVAL = 0.1
+
+_DONE = object()
+
+def read_ahead(batches, queue_size = QUEUE_SIZE):
+    """Iterates an iterable in a reader thread.
+
+    :param batches:    Iterable to produce in the background, e.g.
+                       read_chunks of an input handle.
+    :param queue_size: Number of items produced ahead of the consumer.
+    :returns:          Generator of the iterable's items.
+    """
+    queue = Queue(queue_size)
+    stopping = threading.Event()
+
+    def produce():
+        try:
+            for batch in batches:
+                if not _put(queue, batch, stopping):
+                    return
+            _put(queue, _DONE, stopping)
+        except Exception as exc:
+            _put(queue, exc, stopping)
+
+    thread = threading.Thread(target = produce, daemon = True)
+    thread.start()
+    try:
+        while True:
+            batch = queue.get()
+            if batch is _DONE:
+                break
+            if isinstance(batch, Exception):
+                raise batch
+            yield batch
+    finally:
+        stopping.set()
+        thread.join()
+
+def batched(records, batch_size = RECORD_BATCH_SIZE):
+    """Groups the items of an iterable into lists of batch_size items."""
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def read_records_ahead(records, queue_size = QUEUE_SIZE,
+    batch_size = RECORD_BATCH_SIZE):
+    """Parses records in a reader thread, handing them over in batches.
+
+    :returns: Generator of the records, one at a time.
+    """
+    for batch in read_ahead(batched(records, batch_size), queue_size):
+        for record in batch:
+            yield record
+
+class WriteBehind(io.BufferedIOBase):
+
+    """Writes to a file object in a background thread.
+
+    Writes are collected into batches of at least write_size bytes and
+    handed over through a bounded queue, so no more than queue_size
+    batches are held in memory at once.
+    """
+
+    def __init__(self, handle, queue_size = QUEUE_SIZE,
+        write_size = WRITE_SIZE):
+        """Starts the writer thread.
+
+        :param handle:     Binary file object written to.
+        :param queue_size: Number of batches waiting to be written.
+        :param write_size: Number of bytes collected per batch.
+        """
+        super().__init__()
+        self.handle = handle
+        self.write_size = write_size
+        self.queue = Queue(queue_size)
+        self.pending = []
+        self.pendingSize = 0
+        self.error = None
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target = self._drain, daemon = True)
+        self.thread.start()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        """Queues data to be written; blocks while the queue is full."""
+        self._checkError()
+        self.pending.append(bytes(data))
+        self.pendingSize = self.pendingSize + len(data)
+        if self.pendingSize >= self.write_size:
+            self._handOver()
+        return len(data)
+
+    def flush(self):
+        """Hands over what was written so far without waiting for it."""
+        if self.pending:
+            self._handOver()
+
+    def finish(self):
+        """Writes everything queued and stops the writer thread."""
+        if self.thread.is_alive():
+            self.flush()
+            self._put(_DONE)
+            self.thread.join()
+        self._checkError()
+
+    def detach(self):
+        """Writes everything queued and returns the underlying file object,
+        leaving it open."""
+        try:
+            self.finish()
+        finally:
+            super().close()
+        return self.handle
+
+    def close(self):
+        """Writes everything queued and closes the underlying file object."""
+        if not self.closed:
+            try:
+                self.finish()
+            finally:
+                self.handle.close()
+        super().close()
+
+    def _handOver(self):
+        self._put(b"".join(self.pending))
+        self.pending = []
+        self.pendingSize = 0
+
+    def _put(self, item):
+        while not _put(self.queue, item, self.stopping):
+            self._checkError()
+
+    def _drain(self):
+        """Writes batches from the queue until told to stop."""
+        try:
+            while True:
+                data = self.queue.get()
+                if data is _DONE:
+                    break
+                self.handle.write(data)
+        except Exception as exc:
+            self.error = exc
+            self.stopping.set()
+
+    def _checkError(self):
+        if self.error is not None:
+            raise self.error
+
+def rename_pipelined(renamer, input_handle, output_handle, meter = None,
+    queue_size = QUEUE_SIZE):
+    """Renames a file with a StreamingRenamer in three pipelined stages.
+
+    Produces the same output as renamer.rename.
+
+    :param renamer:       StreamingRenamer doing the rename stage.
+    :param input_handle:  File object opened in binary read mode.
+    :param output_handle: File object opened in binary write mode.  It is
+                          left open.
+    :param meter:         Optional ProgressMeter whose counters are
+                          incremented after each block.
+    :param queue_size:    Number of blocks queued between two stages.
+    """
+    writer = WriteBehind(output_handle, queue_size)
+    try:
+        renamer.rename_chunks(read_ahead(read_chunks(input_handle,
+            renamer.block_size), queue_size), writer, meter)
+    finally:
+        writer.detach()
+
+def _put(queue, item, stopping):
+    """Puts an item, giving up once stopping is set.
+
+    :returns: True if the item was put.
+    """
+    while not stopping.is_set():
+        try:
+            queue.put(item, timeout = POLL_INTERVAL)
+            return True
+        except Full:
+            pass
+    return False
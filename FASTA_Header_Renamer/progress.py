@@ -0,0 +1,153 @@
+'''Rate-Limited Progress and Throughput Metrics for the FASTA Renamers
+
+The renamers used to format and flush a progress line for every line or
+record they processed.  The ProgressMeter moves all of that out of the rename
+loop: the loop only increments the meter's counters, and a background thread
+samples them once per interval to print the progress line.
+
+Besides the counts, the progress line shows records/sec, bytes/sec and, when
+the size of the input is known, an estimate of the time remaining.  A final
+summary can be written as JSON for other tools to pick up.
+'''
+
+from sys import stdout
+import json
+import threading
+import time
+
+class ProgressMeter:
+
+    """Counts records, bytes and errors, and reports them periodically.
+
+    The rename loop increments the records, errors and bytes attributes
+    directly.  Nothing else happens in the loop.
+    """
+
+    def __init__(self, total_bytes = None, interval = 1.0,
+        stream = stdout, position = None):
+        """Creates a stopped meter with all counters at zero.
+
+        :param total_bytes: Size of the input used for the ETA.  None
+                            leaves the ETA out.
+        :param interval:    Seconds between two progress lines.
+        :param stream:      Stream the progress line is written to.
+                            None keeps the meter silent.
+        :param position:    Optional callable returning how far into the
+                            input the renamer is.  It is sampled instead
+                            of the bytes counter.
+        """
+        self.records = 0
+        self.errors = 0
+        self.bytes = 0
+        self.total_bytes = total_bytes
+        self.interval = interval
+        self.stream = stream
+        self.position = position
+        self.startTime = None
+        self.stopTime = None
+        self.stopEvent = threading.Event()
+        self.thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """Starts the clock and the reporting thread."""
+        self.startTime = time.monotonic()
+        self.stopTime = None
+        self.stopEvent.clear()
+        if self.stream is not None:
+            self.thread = threading.Thread(target = self._report,
+                daemon = True)
+            self.thread.start()
+
+    def stop(self):
+        """Stops the clock and writes the final progress line.
+
+        The position callable is sampled one last time, so the meter
+        must be stopped before the input is closed.
+        """
+        self.stopTime = time.monotonic()
+        self.stopEvent.set()
+        if self.thread is not None:
+            self.thread.join()
+        if self.position is not None:
+            self.bytes = self._processedBytes()
+            self.position = None
+        if self.thread is not None:
+            self.thread = None
+            self._writeLine()
+
+    def summary(self):
+        """Returns the current metrics as a dictionary.
+
+        :returns: Dictionary with the record, error and byte counts, the
+                  elapsed seconds, the rates and the ETA in seconds.
+        """
+        end = self.stopTime
+        if end is None:
+            end = time.monotonic()
+        elapsed = end - (self.startTime or end)
+        processed = self._processedBytes()
+        recordRate = 0.0
+        byteRate = 0.0
+        eta = None
+        if elapsed > 0:
+            recordRate = self.records / elapsed
+            byteRate = processed / elapsed
+        if self.total_bytes is not None and byteRate > 0:
+            eta = max(self.total_bytes - processed, 0) / byteRate
+        return {
+            "records": self.records,
+            "errors": self.errors,
+            "bytes": processed,
+            "total_bytes": self.total_bytes,
+            "elapsed_seconds": elapsed,
+            "records_per_second": recordRate,
+            "bytes_per_second": byteRate,
+            "eta_seconds": eta,
+        }
+
+    def write_summary(self, path):
+        """Writes the summary as JSON to the given path."""
+        with open(path, "w") as handle:
+            json.dump(self.summary(), handle, indent = 2, sort_keys = True)
+            handle.write("\n")
+
+    def format(self):
+        """Formats the progress line for the current metrics."""
+        summary = self.summary()
+        eta = summary["eta_seconds"]
+        etaText = "--:--:--"
+        if eta is not None:
+            eta = int(eta)
+            etaText = "{0:02d}:{1:02d}:{2:02d}".format(eta // 3600,
+                eta // 60 % 60, eta % 60)
+        return ("Number of Viruses Processed: {0}, Number of Errors: {1}, "
+            "{2:.0f} records/s, {3:.1f} MB/s, ETA {4}").format(
+            summary["records"], summary["errors"],
+            summary["records_per_second"],
+            summary["bytes_per_second"] / 1e6, etaText)
+
+    def _processedBytes(self):
+        """Returns the sampled position or the bytes counter."""
+        if self.position is not None:
+            try:
+                return self.position()
+            except (OSError, ValueError):
+                pass
+        return self.bytes
+
+    def _report(self):
+        """Writes a progress line every interval until stopped."""
+        while not self.stopEvent.wait(self.interval):
+            self._writeLine()
+
+    def _writeLine(self):
+        """Overwrites the progress line on the stream."""
+        self.stream.write(self.format() + "\r")
+        self.stream.flush()
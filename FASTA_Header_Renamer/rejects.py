@@ -0,0 +1,128 @@
+'''Bounded Reporting of Rejected Lines
+
+The renamers used to keep every rejected header and sequence line in a list
+and print all of them at the end.  On a badly formatted input that list grows
+without bound and floods the terminal.
+
+An ErrorSink keeps the number of rejected lines, a count per reason and a
+sample of at most sample_size lines in memory.  Every rejected line is also
+streamed to a tab-separated file with one row per line:
+
+    line    offset  reason              text
+    12      734     invalid header      >no pipes here
+    15      811     invalid sequence    ACGTxx
+
+Line numbers count from 1 and offsets are byte offsets of the line in the
+input after line endings are normalized, which for '\\n' files are the offsets
+in the file itself.  Both are left empty where they are not known, e.g. for
+records parsed by BioPython.
+
+Without a path and a sample size a sink keeps every line in memory, which is
+what the renamers have always done.
+'''
+
+import os
+
+COLUMNS = ("line", "offset", "reason", "text")
+
+class ErrorSink:
+
+    """Counts rejected lines and streams them to a side file."""
+
+    def __init__(self, path = None, sample_size = None):
+        """Creates an empty sink.
+
+        :param path:        Optional path of the tab-separated file every
+                            rejected line is written to.  It is created
+                            on the first line or when the sink is closed.
+        :param sample_size: Number of rejected lines kept in memory.  None
+                            keeps every line.
+        """
+        self.path = path
+        self.sample_size = sample_size
+        self.count = 0
+        self.reasons = {}
+        self.sample = []
+        # Lines and bytes of input covered; used to merge shard sinks.
+        self.lines = 0
+        self.bytes = 0
+        self.handle = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["handle"] = None
+        return state
+
+    def add(self, text, line_number = None, offset = None,
+        reason = "invalid record"):
+        """Records a rejected line.
+
+        :param text:        Rejected line without its line ending.
+        :param line_number: Line number of the line in the input.
+        :param offset:      Byte offset of the line in the input.
+        :param reason:      Short description of why it was rejected.
+        """
+        self.count = self.count + 1
+        self.reasons[reason] = self.reasons.get(reason, 0) + 1
+        if self.sample_size is None or len(self.sample) < self.sample_size:
+            self.sample.append(text)
+        if self.path is not None:
+            self._write(line_number, offset, reason, text)
+
+    def append(self, text):
+        """Records a rejected line of unknown position, like list.append."""
+        self.add(text)
+
+    def merge(self, other):
+        """Appends the lines of a sink that covered the input after this one.
+
+        Line numbers and offsets of the other sink are shifted by the
+        lines and bytes this sink covered.  The other sink must be closed;
+        its file is removed once merged.
+        """
+        self.count = self.count + other.count
+        for reason, count in other.reasons.items():
+            self.reasons[reason] = self.reasons.get(reason, 0) + count
+        room = len(other.sample) if self.sample_size is None \
+            else max(0, self.sample_size - len(self.sample))
+        self.sample.extend(other.sample[:room])
+        if other.path is not None and os.path.exists(other.path):
+            if self.path is not None:
+                with open(other.path) as handle:
+                    next(handle, None)
+                    for row in handle:
+                        line_number, offset, reason, text = \
+                            row.rstrip("\n").split("\t", 3)
+                        self._write(self._shift(line_number, self.lines),
+                            self._shift(offset, self.bytes), reason, text)
+            os.remove(other.path)
+        self.lines = self.lines + other.lines
+        self.bytes = self.bytes + other.bytes
+
+    def close(self):
+        """Closes the side file, creating it if nothing was rejected."""
+        if self.path is not None and self.handle is None:
+            self._open()
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+    def summary(self):
+        """Returns a one-line summary of the counts per reason."""
+        return ", ".join("{0} {1}".format(count, reason)
+            for reason, count in sorted(self.reasons.items()))
+
+    def _open(self):
+        self.handle = open(self.path, "w")
+        self.handle.write("\t".join(COLUMNS) + "\n")
+
+    def _write(self, line_number, offset, reason, text):
+        if self.handle is None:
+            self._open()
+        self.handle.write("{0}\t{1}\t{2}\t{3}\n".format(
+            "" if line_number is None else line_number,
+            "" if offset is None else offset, reason,
+            text.replace("\t", " ").replace("\n", " ")))
+
+    def _shift(self, value, base):
+        return int(value) + base if value else None
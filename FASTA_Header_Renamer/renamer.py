@@ -0,0 +1,464 @@
+'''FASTA Renamer Library and Command Line Interface
+
+Renames FASTA headers to the {accession number}{name of virus} form without
+running either renamer script, so other Python code can call it directly:
+
+    from renamer import read_records, rename_records, write_records
+
+    errors = []
+    with open("in.fasta", "rb") as input_handle, \
+        open("out.fasta", "w") as output_handle:
+        records = read_records(input_handle)
+        write_records(rename_records(records, errors = errors),
+            output_handle)
+
+read_records, rename_records and write_records are generators/consumers of
+(header, sequence) string pairs and can be combined with any other stage
+working on such pairs.  rename_file renames a whole file the way the renamer
+scripts do, including sharding, compression and indexing, and the same is
+available from the command line:
+
+    python renamer.py in.fasta out.fasta --backend biopython --processes 4
+
+Two backends are available:
+ * python:    Header pattern with the accession and the virus name as its two
+              groups, e.g. ">AB123.Tomato_leaf_curl_virus".  Whole files are
+              renamed by the streaming engine, byte-identical to the
+              FASTA_Header_Renamer_Python script.
+ * biopython: Accession taken from the fourth field of the record id and
+              the virus name from the single group of the pattern, e.g.
+              ">AB123Tomato_leaf_curl_virus", as the
+              FASTA_Header_Renamer_BioPython script does.  BioPython is only
+              imported when this backend reads a file.
+'''
+
+from argparse import ArgumentParser
+import io
+import os
+import re
+import sys
+
+from compression import COMPRESSED_SUFFIXES, is_compressed, open_input
+from dedup import KEYS, Deduplicator
+from headers import HeaderParser
+from pipeline import WriteBehind, read_records_ahead
+from progress import ProgressMeter
+from rejects import ErrorSink
+from sharding import atomic_output, rename_sharded, rename_streaming_shard
+from streaming import NAME_PATTERN, read_chunks
+from validation import ALPHABETS, SequenceValidator
+from wrapping import FastaRecordWriter
+
+BACKENDS = ("python", "biopython")
+NAME_PATTERNS = {
+    "python": NAME_PATTERN.decode("ascii"),
+    "biopython": r"^.+\|.+\|.+\|.+\|(.*[vV]irus).*",
+}
+# Sequence alphabet each backend validates against when none is given.
+DEFAULT_ALPHABETS = {
+    "python": "strict",
+    "biopython": None,
+}
+TITLES = {
+    "python": "FASTA Renamer Python",
+    "biopython": "FASTA Renamer BioPython",
+}
+
+def read_records(input_handle, backend = "python"):
+    """Yields the (description, sequence) pairs of a FASTA file.
+
+    The description is the header line without the '>' and the sequence
+    is the concatenation of the record's sequence lines.  Lines before
+    the first header are skipped.
+
+    :param input_handle: File object opened in binary mode.
+    :param backend:      "python" parses the file itself; "biopython"
+                         parses it with Bio.SeqIO.
+    """
+    if backend == "biopython":
+        return _readBioPythonRecords(input_handle)
+    return _readPythonRecords(input_handle)
+
+def rename_records(records, backend = "python", name_pattern = None,
+    alphabet = None, replace_target = " ", replace_char = "_",
+    errors = None, meter = None, deduplicator = None, fast_path = None):
+    """Renames the headers of (description, sequence) pairs.
+
+    Records whose description does not match the pattern, or whose
+    sequence has a character outside the alphabet, are left out and
+    their descriptions appended to errors.  Unlike the streaming engine,
+    which keeps the lines before an invalid sequence line, a record with
+    an invalid sequence is always left out as a whole.
+
+    :param records:        Iterable of (description, sequence) pairs.
+    :param backend:        One of the BACKENDS; decides how the pattern's
+                           groups make up the new header.
+    :param name_pattern:   Header pattern.  Defaults to the backend's
+                           pattern in NAME_PATTERNS.
+    :param alphabet:       Name of the sequence alphabet.  Defaults to
+                           the backend's alphabet in DEFAULT_ALPHABETS;
+                           None skips validation.
+    :param replace_target: Text in the header replaced by replace_char.
+    :param replace_char:   Replacement of replace_target.
+    :param errors:         Optional list the rejected descriptions are
+                           appended to.
+    :param meter:          Optional ProgressMeter counting the renamed
+                           records and the errors.
+    :param deduplicator:   Optional Deduplicator checking every renamed
+                           record; see the dedup module.
+    :param fast_path:      Whether the python backend parses standard
+                           headers without the pattern; see the headers
+                           module.  None does so only for the default
+                           pattern.
+    :returns:              Generator of (header, sequence) pairs, the
+                           header without its '>'.
+    :raises ValueError:    If the backend or alphabet is unknown.
+    """
+    renameHeader = _headerRenamer(backend, name_pattern, replace_target,
+        replace_char, fast_path)
+    if alphabet is None:
+        alphabet = DEFAULT_ALPHABETS[backend]
+    validator = SequenceValidator(alphabet) if alphabet else None
+    return _renameRecords(records, renameHeader, validator, errors, meter,
+        deduplicator)
+
+def write_records(records, output_handle, line_width = 80):
+    """Writes (header, sequence) pairs to a text handle.
+
+    :param line_width: Number of sequence characters per line.  None or
+                       0 writes each sequence on one line.
+    :returns:          Number of records written.
+    """
+    return FastaRecordWriter(output_handle, line_width).write_records(records)
+
+def rename_biopython_shard(input_handle, output_handle, options,
+    meter = None):
+    """Renames a file or shard with the biopython backend.
+
+    Passed to rename_sharded as its rename_shard function.
+
+    :param input_handle:  Binary file object holding the records.
+    :param output_handle: Binary file object the output is written to.
+    :param options:       Keyword arguments for rename_records, plus the
+                          line_width of the output, an optional
+                          error_sink for the rejected descriptions and
+                          pipelined to parse and write in threads.
+    :param meter:         Optional ProgressMeter counting the records.
+    :returns:             Tuple of the number of renamed records, the
+                          number of errors and the list of error lines
+                          kept in memory.
+    """
+    options = dict(options)
+    line_width = options.pop("line_width", 80)
+    errors = options.pop("error_sink", None)
+    if errors is None:
+        errors = ErrorSink()
+    pipelined = options.pop("pipelined", False)
+    records = read_records(input_handle, "biopython")
+    if pipelined:
+        records = read_records_ahead(records)
+        output_handle = WriteBehind(output_handle)
+    records = rename_records(records, "biopython", errors = errors,
+        meter = meter, **options)
+    text = io.TextIOWrapper(output_handle, encoding = "utf-8")
+    try:
+        ctr = write_records(records, text, line_width)
+        text.flush()
+    finally:
+        # Leave the caller's handle open.
+        text.detach()
+        if pipelined:
+            output_handle.detach()
+    return ctr, errors.count, errors.sample
+
+def rename_file(input_path, output_path, backend = "python",
+    name_pattern = None, alphabet = None, replace_target = " ",
+    replace_char = "_", processes = 1, index_path = None, line_width = 80,
+    meter = None, deduplicator = None, fast_path = None, error_sink = None,
+    pipelined = False):
+    """Renames a FASTA file the way the renamer scripts do.
+
+    Input and output may be compressed; uncompressed input is renamed in
+    shards when more than one process is requested.  Input is always
+    renamed serially with a deduplicator, which has to see every record.
+    The output and index only replace existing files once renaming
+    succeeds; see :func: `sharding.atomic_output`.
+
+    :param processes:   Processes renaming shards in parallel.
+    :param index_path:  Optional path to write a .fai index of the output
+                        to.  Only the python backend can write one, and
+                        only for uncompressed output.
+    :param line_width:  Sequence characters per line of the biopython
+                        backend's output; the python backend keeps the
+                        input's lines.
+    :param meter:       Optional ProgressMeter, started and stopped by
+                        this call.
+    :param error_sink:  Optional ErrorSink the rejected lines are sent to;
+                        see the rejects module.  It is not closed.
+    :param pipelined:   Reads, renames and writes in overlapping threads;
+                        see the pipeline module.
+    :returns:           Tuple of the number of renamed records, the number
+                        of errors and the list of error lines kept in
+                        memory.
+    :raises ValueError: If the backend is unknown or an index is requested
+                        from the biopython backend or for compressed
+                        output.
+
+    See :func: `rename_records` for the other parameters.
+    """
+    if backend not in BACKENDS:
+        raise ValueError("Unknown backend: {0}.  Choose from: {1}"
+            .format(backend, ", ".join(BACKENDS)))
+    if backend == "biopython" and index_path is not None:
+        raise ValueError("The biopython backend cannot write an index.")
+    if index_path is not None and output_path.endswith(COMPRESSED_SUFFIXES):
+        raise ValueError("Cannot index compressed output: " + output_path)
+    meter = meter or ProgressMeter(stream = None)
+    name_pattern = name_pattern or NAME_PATTERNS[backend]
+    if alphabet is None:
+        alphabet = DEFAULT_ALPHABETS[backend]
+    if backend == "python":
+        rename_shard = rename_streaming_shard
+        options = dict(name_pattern = name_pattern.encode("utf-8"),
+            alphabet = alphabet,
+            replace_target = replace_target.encode("utf-8"),
+            replace_char = replace_char.encode("utf-8"),
+            fast_path = fast_path)
+    else:
+        rename_shard = rename_biopython_shard
+        options = dict(name_pattern = name_pattern, alphabet = alphabet,
+            replace_target = replace_target, replace_char = replace_char,
+            line_width = line_width)
+    options["pipelined"] = pipelined
+
+    if deduplicator is not None:
+        options["deduplicator"] = deduplicator
+    elif processes > 1 and not is_compressed(input_path):
+        with meter:
+            return rename_sharded(input_path, output_path, processes,
+                rename_shard, options = options, index_path = index_path,
+                meter = meter, error_sink = error_sink)
+
+    if error_sink is not None:
+        options["error_sink"] = error_sink
+    with open_input(input_path) as input_handle, \
+        atomic_output(output_path, index_path) as output_handle:
+        # Sampled by the meter's thread, never by the rename loop.
+        meter.position = input_handle.raw.tell
+        with meter:
+            result = rename_shard(input_handle, output_handle, options,
+                meter)
+    return result
+
+def run(input_path, output_path, backend = "python", progress_interval = 1.0,
+    summary_path = None, error_path = None, error_sample = None, **options):
+    """Renames a file and prints the progress and the error report.
+
+    :param progress_interval: Seconds between two progress lines.
+    :param summary_path:      Optional path to write the JSON metrics
+                              summary to.
+    :param error_path:        Optional path of the tab-separated file
+                              every rejected line is written to.
+    :param error_sample:      Number of rejected lines kept in memory and
+                              printed.  None keeps and prints them all.
+    :param options:           Keyword arguments for rename_file.
+    :returns:                 List of error lines kept in memory.
+    """
+    print("\n=========================================")
+    print(TITLES.get(backend, "FASTA Renamer"))
+    print("=========================================")
+
+    meter = ProgressMeter(os.path.getsize(input_path), progress_interval)
+    error_sink = ErrorSink(error_path, error_sample)
+    try:
+        ctr, err, virus_errors = rename_file(input_path, output_path,
+            backend, meter = meter, error_sink = error_sink, **options)
+    finally:
+        error_sink.close()
+    if summary_path is not None:
+        meter.write_summary(summary_path)
+
+    # Print Virus Sequences that had errors.
+    print("\n\n=========================================")
+    if virus_errors:
+        print("Error extracting information for viruses:")
+        for virusErr in virus_errors:
+            print(virusErr)
+        if err > len(virus_errors):
+            print("...and {0} more.".format(err - len(virus_errors)))
+        print("Errors: " + error_sink.summary())
+        if error_path is not None:
+            print("All rejected lines written to: " + error_path)
+    else:
+        print("\nAll sequences successfully processed!")
+    print("=========================================")
+
+    deduplicator = options.get("deduplicator")
+    if deduplicator is not None and deduplicator.duplicate_count:
+        print("{0} {1} duplicates:".format("Dropped" if deduplicator.drop
+            else "Found", deduplicator.duplicate_count))
+        for description, key in deduplicator.duplicates:
+            print("{0} ({1})".format(description, key))
+        if deduplicator.duplicate_count > len(deduplicator.duplicates):
+            print("...and {0} more.".format(deduplicator.duplicate_count
+                - len(deduplicator.duplicates)))
+        print("=========================================")
+
+    # Departure information
+    print("Output written to: " + output_path)
+    print("\nGoodbye! The Momo loves you!")
+    return virus_errors
+
+def main(argv = None):
+    parser = ArgumentParser(description = "Renames FASTA headers to the "
+        "{accession number}{name of virus} form.")
+    parser.add_argument("input", help = "FASTA file to rename; may be "
+        "gzip or BGZF compressed.")
+    parser.add_argument("output", help = "Path of the renamed FASTA file; "
+        "written as BGZF if it ends in .gz.")
+    parser.add_argument("--backend", choices = BACKENDS, default = "python",
+        help = "Renamer backend.")
+    parser.add_argument("--pattern", help = "Header regular expression.  "
+        "Defaults to the backend's pattern.")
+    parser.add_argument("--fast-path", action = "store_true", default = None,
+        help = "Parse standard four-pipe headers by splitting them even "
+        "with a custom --pattern, which then only sees the other headers.  "
+        "Always on for the default pattern of the python backend.")
+    parser.add_argument("--alphabet", choices = sorted(ALPHABETS),
+        help = "Sequence alphabet.  Defaults to strict for the python "
+        "backend; the biopython backend does not validate by default.")
+    parser.add_argument("--processes", type = int, default = 1,
+        help = "Processes renaming shards of the input in parallel.")
+    parser.add_argument("--index", help = "Path to write a .fai index of "
+        "the output to; python backend only.")
+    parser.add_argument("--line-width", type = int, default = 80,
+        help = "Sequence characters per line of the biopython backend.")
+    parser.add_argument("--progress-interval", type = float, default = 1.0,
+        help = "Seconds between progress updates.")
+    parser.add_argument("--summary",
+        help = "Path to write the JSON metrics summary to.")
+    parser.add_argument("--errors", help = "Path of the tab-separated file "
+        "every rejected line is written to with its line number, byte "
+        "offset and reason.")
+    parser.add_argument("--error-sample", type = int,
+        help = "Number of rejected lines kept in memory and printed.  "
+        "Defaults to 100 with --errors and to all of them without.")
+    parser.add_argument("--dedup", choices = ("drop", "report"),
+        help = "Drop or only report records with an accession or sequence "
+        "seen before.")
+    parser.add_argument("--dedup-key", choices = KEYS, action = "append",
+        help = "What makes a record a duplicate; defaults to both.")
+    parser.add_argument("--bloom-capacity", type = int,
+        help = "Expected number of records.  Tracks duplicates in Bloom "
+        "filters of this capacity instead of exact digest sets.")
+    parser.add_argument("--bloom-error-rate", type = float, default = 0.001,
+        help = "False positive rate of the Bloom filters.")
+    parser.add_argument("--pipelined", action = "store_true",
+        help = "Read, rename and write in overlapping threads, which helps "
+        "on slow or network filesystems.")
+    args = parser.parse_args(argv)
+    if args.index is not None and args.backend != "python":
+        parser.error("--index requires the python backend")
+    if args.index is not None and args.output.endswith(COMPRESSED_SUFFIXES):
+        parser.error("--index requires uncompressed output")
+
+    deduplicator = None
+    if args.dedup is not None:
+        deduplicator = Deduplicator(args.dedup_key or KEYS,
+            args.dedup == "drop", args.bloom_capacity, args.bloom_error_rate)
+    error_sample = args.error_sample
+    if error_sample is None and args.errors is not None:
+        error_sample = 100
+    run(args.input, args.output, args.backend, args.progress_interval,
+        args.summary, args.errors, error_sample,
+        name_pattern = args.pattern, alphabet = args.alphabet,
+        processes = args.processes, index_path = args.index,
+        line_width = args.line_width, deduplicator = deduplicator,
+        fast_path = args.fast_path, pipelined = args.pipelined)
+    return 0
+
+def _readPythonRecords(input_handle):
+    description = None
+    sequence = []
+    for chunk in read_chunks(input_handle):
+        pos = 0
+        size = len(chunk)
+        while pos < size:
+            if chunk[pos] == 0x3E:
+                if description is not None:
+                    yield _record(description, sequence)
+                lineEnd = chunk.find(b"\n", pos) + 1 or size
+                description = chunk[pos + 1:lineEnd]
+                sequence = []
+            else:
+                lineEnd = chunk.find(b"\n>", pos) + 1 or size
+                if description is not None:
+                    sequence.append(chunk[pos:lineEnd])
+            pos = lineEnd
+    if description is not None:
+        yield _record(description, sequence)
+
+def _record(description, sequence):
+    return (description.decode("utf-8", "replace").strip(),
+        b"".join(sequence).replace(b"\n", b"").decode("utf-8", "replace"))
+
+def _readBioPythonRecords(input_handle):
+    from Bio import SeqIO
+
+    text = io.TextIOWrapper(input_handle, encoding = "utf-8")
+    try:
+        for record in SeqIO.parse(text, "fasta"):
+            yield record.description, str(record.seq)
+    finally:
+        # Leave the caller's handle open.
+        text.detach()
+
+def _headerRenamer(backend, name_pattern, replace_target, replace_char,
+    fast_path):
+    """Returns a function mapping a description to a header or None."""
+    if backend not in BACKENDS:
+        raise ValueError("Unknown backend: {0}.  Choose from: {1}"
+            .format(backend, ", ".join(BACKENDS)))
+    name_pattern = name_pattern or NAME_PATTERNS[backend]
+
+    if backend == "python":
+        parse = HeaderParser(name_pattern, fast_path).parse
+        def renameHeader(description):
+            fields = parse(">" + description)
+            if fields is None:
+                return None
+            return (fields[0].replace(replace_target, replace_char)
+                + fields[1].replace(replace_target, replace_char))
+    else:
+        name_prog = re.compile(name_pattern)
+        def renameHeader(description):
+            fields = description.split(None, 1)[0].split("|") \
+                if description else []
+            nameMatch = name_prog.match(description)
+            if nameMatch is None or len(fields) < 4:
+                return None
+            # {...accession #2...}.1|
+            return fields[3].split(".")[0] \
+                + nameMatch.group(1).replace(replace_target, replace_char)
+    return renameHeader
+
+def _renameRecords(records, renameHeader, validator, errors, meter,
+    deduplicator):
+    for description, sequence in records:
+        header = renameHeader(description)
+        if header is None or (validator is not None and sequence
+            and not validator.is_valid(sequence.encode("utf-8"))):
+            if errors is not None:
+                errors.append(description)
+            if meter is not None:
+                meter.errors = meter.errors + 1
+            continue
+        if deduplicator is not None and deduplicator.check_record(
+            description, sequence) and deduplicator.drop:
+            continue
+        if meter is not None:
+            meter.records = meter.records + 1
+        yield header, sequence
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+'''Sharded FASTA Renaming Across a Process Pool
+
+Splits the input into byte ranges whose boundaries are snapped forward to the
+next record, i.e. the next '>' found at the start of a line.  Every range holds
+whole records, so each one can be renamed by a separate process without
+knowing anything about its neighbours.
+
+Each shard is written to its own part file next to the output.  Once all
+shards are done, the part files are concatenated in their original order and
+the per-shard errors are joined in that same order, giving the same output
+and the same error report as a serial run.
+'''
+
+from contextlib import contextmanager
+from multiprocessing import Pool
+import io
+import os
+import shutil
+
+from compression import COMPRESSED_SUFFIXES, is_compressed, open_output
+from indexing import IndexingWriter
+from pipeline import rename_pipelined
+from rejects import ErrorSink
+from streaming import StreamingRenamer
+
+SCAN_SIZE = 64 * 1024
+
+class ShardReader(io.BufferedIOBase):
+
+    """Exposes the byte range [start, end) of a file as a file object."""
+
+    def __init__(self, handle, start, end):
+        self.handle = handle
+        self.remaining = end - start
+        handle.seek(start)
+
+    def readable(self):
+        return True
+
+    def read(self, size = -1):
+        """Reads at most size bytes without crossing the end offset."""
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.handle.read(size)
+        self.remaining = self.remaining - len(data)
+        return data
+
+    read1 = read
+
+def find_record_start(handle, offset):
+    """Finds the first record starting at or after the offset.
+
+    :param handle: File object opened in binary mode.
+    :param offset: Byte offset to start searching from.
+    :returns:      Offset of the '>' opening the record or the size of
+                   the file if there is none.
+    """
+    if offset == 0:
+        return 0
+    # Keep the byte before the offset to tell if a '>' starts a line.
+    position = offset - 1
+    handle.seek(position)
+    window = handle.read(SCAN_SIZE)
+    while window:
+        index = window.find(b">", 1)
+        while index != -1:
+            if window[index - 1] in b"\r\n":
+                return position + index
+            index = window.find(b">", index + 1)
+        position = position + len(window) - 1
+        window = window[-1:] + handle.read(SCAN_SIZE)
+        if len(window) == 1:
+            break
+    return handle.seek(0, os.SEEK_END)
+
+def find_shard_ranges(input_path, shard_count):
+    """Splits a FASTA file into record-aligned byte ranges.
+
+    :param input_path:  Path of the FASTA file.
+    :param shard_count: Number of ranges wanted.  Fewer are returned if
+                        the file has fewer records than that.
+    :returns:           List of (start, end) offsets covering the file.
+    """
+    size = os.path.getsize(input_path)
+    starts = [0]
+    with open(input_path, "rb") as handle:
+        for shard in range(1, shard_count):
+            offset = find_record_start(handle, size * shard // shard_count)
+            if starts[-1] < offset < size:
+                starts.append(offset)
+    return list(zip(starts, starts[1:] + [size]))
+
+def rename_streaming_shard(input_handle, output_handle, options,
+    meter = None):
+    """Renames one shard with the streaming engine.
+
+    :param input_handle:  Binary file object holding the shard.
+    :param output_handle: Binary file object of the shard's part file.
+    :param options:       Keyword arguments for the StreamingRenamer,
+                          plus pipelined to overlap reading, renaming
+                          and writing; see the pipeline module.
+    :param meter:         Optional ProgressMeter; only used when the
+                          function renames a whole file serially.
+    :returns:             Tuple of the number of renamed records, the
+                          number of errors and the list of error lines.
+    """
+    options = dict(options)
+    pipelined = options.pop("pipelined", False)
+    renamer = StreamingRenamer(**options)
+    if pipelined:
+        rename_pipelined(renamer, input_handle, output_handle, meter)
+    else:
+        renamer.rename(input_handle, output_handle, meter)
+    return renamer.ctr, renamer.err, renamer.virus_errors
+
+@contextmanager
+def atomic_output(output_path, index_path = None):
+    """Opens an output, and optionally an IndexingWriter around it, that
+    only replaces output_path and index_path once the block completes.
+
+    Both are written to temporary paths next to them and moved into place
+    on success.  If the block raises, the handles are closed and the
+    temporary files removed, so no truncated output is left behind.
+
+    :param output_path: Path of the output; compressed if its suffix says
+                        so.
+    :param index_path:  Optional path of a .fai index of the output.
+    :returns:           Context manager giving the handle to write to.
+    """
+    paths = [(_temporaryPath(output_path), output_path)]
+    if index_path is not None:
+        paths.append((_temporaryPath(index_path), index_path))
+    handles = []
+    try:
+        output_handle = open_output(paths[0][0])
+        handles.append(output_handle)
+        if index_path is not None:
+            index_handle = open(paths[1][0], "w")
+            handles.append(index_handle)
+            output_handle = IndexingWriter(output_handle, index_handle)
+        yield output_handle
+        output_handle.close()
+        for temporaryPath, path in paths:
+            os.replace(temporaryPath, path)
+    except BaseException:
+        for handle in handles:
+            try:
+                handle.close()
+            except Exception:
+                pass
+        for temporaryPath, path in paths:
+            if os.path.exists(temporaryPath):
+                os.remove(temporaryPath)
+        raise
+
+def rename_sharded(input_path, output_path, processes = None,
+    rename_shard = rename_streaming_shard, shard_count = None,
+    options = None, index_path = None, meter = None, error_sink = None):
+    """Renames a FASTA file with one process per shard.
+
+    Shards are concatenated in order as soon as they and every shard
+    before them are done, so copying overlaps with renaming.  The input
+    must not be compressed since byte ranges of a compressed file cannot
+    be renamed on their own; the output is compressed if its suffix says
+    so.
+
+    :param input_path:   Path of the FASTA file to rename.
+    :param output_path:  Path the renamed FASTA file is written to.
+    :param processes:    Size of the process pool.  Defaults to the
+                         number of CPUs.
+    :param rename_shard: Module-level function renaming one shard from an
+                         input handle to an output handle; see
+                         :func: `rename_streaming_shard`.
+    :param shard_count:  Number of shards.  Defaults to the pool size.
+    :param options:      Dictionary passed on to every rename_shard call.
+    :param index_path:   Optional path to write a .fai index of the
+                         output to while the shards are concatenated.
+                         The output must not be compressed.
+    :param meter:        Optional ProgressMeter whose counters are
+                         incremented as each shard is concatenated.
+    :param error_sink:   Optional ErrorSink the rejected lines of every
+                         shard are merged into in input order.  Each
+                         shard gets a sink of its own, passed to
+                         rename_shard as the error_sink option.
+    :returns:            Tuple of the number of renamed records, the
+                         number of errors and the list of error lines
+                         kept in memory, in input order.
+    :raises ValueError:  If the input is compressed, or an index is
+                         requested for compressed output.
+    """
+    if is_compressed(input_path):
+        raise ValueError("Cannot shard compressed input: " + input_path)
+    if index_path is not None and output_path.endswith(COMPRESSED_SUFFIXES):
+        raise ValueError("Cannot index compressed output: " + output_path)
+    processes = processes or os.cpu_count() or 1
+    ranges = find_shard_ranges(input_path, shard_count or processes)
+    options = options or {}
+    if error_sink is None:
+        error_sink = ErrorSink()
+    tasks = []
+    for index, (start, end) in enumerate(ranges):
+        partPath = "{0}.part{1}".format(output_path, index)
+        shardSink = ErrorSink(partPath + ".errors" if error_sink.path
+            else None, error_sink.sample_size)
+        tasks.append((rename_shard, input_path, start, end, partPath,
+            options, shardSink))
+
+    ctr = 0
+    err = 0
+    try:
+        with atomic_output(output_path, index_path) as output_handle, \
+            Pool(min(processes, len(tasks))) as pool:
+            results = pool.imap(_run_shard, tasks)
+            for task, (shardCtr, shardErr, shardSink) in zip(tasks, results):
+                with open(task[4], "rb") as part_handle:
+                    shutil.copyfileobj(part_handle, output_handle,
+                        SCAN_SIZE * 16)
+                os.remove(task[4])
+                ctr = ctr + shardCtr
+                err = err + shardErr
+                error_sink.merge(shardSink)
+                if meter is not None:
+                    meter.records = meter.records + shardCtr
+                    meter.errors = meter.errors + shardErr
+                    meter.bytes = meter.bytes + task[3] - task[2]
+    finally:
+        for task in tasks:
+            for path in (task[4], task[6].path):
+                if path is not None and os.path.exists(path):
+                    os.remove(path)
+    return ctr, err, error_sink.sample
+
+def _run_shard(task):
+    """Opens the task's shard and part file and renames the shard.
+
+    :returns: Tuple of the number of renamed records, the number of
+              errors and the shard's closed ErrorSink.
+    """
+    rename_shard, input_path, start, end, part_path, options, error_sink = \
+        task
+    with open(input_path, "rb") as input_handle, \
+        open(part_path, "wb") as output_handle:
+        ctr, err, virus_errors = rename_shard(ShardReader(input_handle,
+            start, end), output_handle, dict(options,
+            error_sink = error_sink))
+    error_sink.close()
+    return ctr, err, error_sink
+
+def _temporaryPath(path):
+    """Returns a hidden path next to path that keeps its suffix."""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, ".{0}.{1}".format(os.getpid(), name))
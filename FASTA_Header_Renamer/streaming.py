@@ -0,0 +1,319 @@
+'''Block-Buffered Streaming Engine for the FASTA Renamer
+
+Performs the same header rewrite as the FASTA_Header_Renamer_Python module but
+works on large byte blocks instead of individual lines:
+
+ * Input is read in blocks of `block_size` bytes and cut at the last complete
+   line.  Anything after it is carried over into the next block.
+ * Each block is split into headers and sequence bodies with a first-byte '>'
+   dispatch so only header lines are ever parsed.  Standard headers are
+   parsed without the regular expression; see the headers module.
+ * A whole sequence body, i.e. every line between two headers, is validated by
+   a single lookup-table pass of the validation module.  Bodies containing an
+   invalid byte are cut at the offending lines instead of being split into
+   lines.
+ * Output for a block is joined and written with a single write call.
+
+With a Deduplicator from the dedup module, each record's output is held back
+until the record ends, so a record whose sequence turns out to be a duplicate
+can still be dropped.  Only the current record is held.
+
+The output is byte-identical to the line-by-line version, including the
+universal newline translation performed by its "rU" file mode.
+'''
+
+from headers import NAME_PATTERN, HeaderParser
+from rejects import ErrorSink
+from validation import SequenceValidator
+
+BLOCK_SIZE = 8 * 1024 * 1024
+
+def read_chunks(input_handle, block_size = BLOCK_SIZE):
+    """Yields blocks of complete lines read from a binary handle.
+
+    Line endings are normalized to '\\n' the way universal newlines
+    would, and every chunk except possibly the last ends with '\\n'.
+
+    :param input_handle: File object opened in binary mode.
+    :param block_size:   Number of bytes requested per read.
+    """
+    carry = b""
+    while True:
+        block = input_handle.read(block_size)
+        if not block:
+            break
+        buffer = carry + block if carry else block
+        pendingCr = b""
+        if b"\r" in buffer:
+            # A trailing '\r' may be the first half of a '\r\n' pair.
+            if buffer.endswith(b"\r"):
+                buffer, pendingCr = buffer[:-1], b"\r"
+            buffer = buffer.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+        lineEnd = buffer.rfind(b"\n") + 1
+        carry = buffer[lineEnd:] + pendingCr
+        if lineEnd:
+            yield buffer[:lineEnd]
+    if carry:
+        yield carry.replace(b"\r", b"\n")
+
+class StreamingRenamer:
+
+    """Renames FASTA headers block-by-block.
+
+    Keeps the same state the line-by-line renamer keeps: the number of
+    renamed records, the number of errors, the lines that failed and
+    whether the current record is still valid.
+    """
+
+    def __init__(self, name_pattern = NAME_PATTERN, alphabet = "strict",
+        replace_target = b" ", replace_char = b"_", block_size = BLOCK_SIZE,
+        deduplicator = None, fast_path = None, error_sink = None):
+        """Sets up the renamer.
+
+        :param name_pattern:   Header regular expression whose two groups
+                               are the accession and the virus name.
+        :param alphabet:       Name of the validation alphabet sequence
+                               lines must be written in.
+        :param replace_target: Bytes replaced in the accession and name.
+        :param replace_char:   Replacement for the replace_target.
+        :param block_size:     Number of bytes read at a time.
+        :param deduplicator:   Optional Deduplicator dropping or reporting
+                               duplicate accessions and sequences.
+        :param fast_path:      Whether standard headers are parsed without
+                               the regular expression; see HeaderParser.
+        :param error_sink:     ErrorSink the rejected lines go to.  Defaults
+                               to one keeping every line in memory.
+        """
+        self.parser = HeaderParser(name_pattern, fast_path)
+        self.validator = SequenceValidator(alphabet)
+        self.replace_target = replace_target
+        self.replace_char = replace_char
+        self.block_size = block_size
+        self.ctr = 0
+        self.err = 0
+        self.valid = False
+        self.error_sink = error_sink if error_sink is not None \
+            else ErrorSink()
+        # Lines and bytes before the current chunk, and how far into it
+        # lines have been counted, to locate rejected lines.
+        self.lines = 0
+        self.bytes = 0
+        self.chunk = b""
+        self.cursor = 0
+        self.cursorLines = 0
+        self.deduplicator = deduplicator
+        self.pending = []
+        self.pendingHeader = None
+        self.hasher = None
+
+    def rename(self, input_handle, output_handle, meter = None):
+        """Renames every record read from input and writes to output.
+
+        :param input_handle:  File object opened in binary read mode.
+        :param output_handle: File object opened in binary write mode.
+        :param meter:         Optional ProgressMeter whose counters are
+                              incremented after each block.
+        """
+        self.rename_chunks(read_chunks(input_handle, self.block_size),
+            output_handle, meter)
+
+    def rename_chunks(self, chunks, output_handle, meter = None):
+        """Renames chunks of complete lines and writes to output.
+
+        :param chunks:        Iterable of chunks as yielded by read_chunks.
+        :param output_handle: File object opened in binary write mode.
+        :param meter:         Optional ProgressMeter whose counters are
+                              incremented after each chunk.
+        """
+        for chunk in chunks:
+            ctr = self.ctr
+            err = self.err
+            output_handle.write(self.rename_chunk(chunk))
+            if meter is not None:
+                meter.records = meter.records + self.ctr - ctr
+                meter.errors = meter.errors + self.err - err
+                meter.bytes = meter.bytes + len(chunk)
+        ctr = self.ctr
+        output_handle.write(self.finish())
+        if meter is not None:
+            meter.records = meter.records + self.ctr - ctr
+
+    @property
+    def virus_errors(self):
+        """Rejected lines kept in memory by the error sink."""
+        return self.error_sink.sample
+
+    def finish(self):
+        """Returns the output of the record held back by the deduplicator.
+
+        Must be called once the last chunk has been renamed; returns
+        nothing without a deduplicator.  Also records how much input the
+        error sink covered.
+        """
+        self.error_sink.lines = self.lines
+        self.error_sink.bytes = self.bytes
+        return self._flushRecord()
+
+    def rename_chunk(self, chunk):
+        """Renames a chunk of complete lines and returns the output.
+
+        The chunk must start at the beginning of a line.  The valid
+        state carries over between calls so a record's sequence may
+        span several chunks.
+
+        :param chunk: Bytes containing complete lines.
+        :returns:     Bytes to be written to the output.
+        """
+        self.chunk = chunk
+        self.cursor = 0
+        self.cursorLines = self.lines
+        if self.deduplicator is not None:
+            output = self._renameChunkDeduplicated(chunk)
+        else:
+            output = self._renameChunk(chunk)
+        self.lines = self.cursorLines + chunk.count(b"\n", self.cursor)
+        self.bytes = self.bytes + len(chunk)
+        return output
+
+    def _renameChunk(self, chunk):
+        """Renames a chunk, writing each record as soon as it is read."""
+        output = []
+        append = output.append
+        find = chunk.find
+        is_valid = self.validator.is_valid
+        pos = 0
+        size = len(chunk)
+        while pos < size:
+            if chunk[pos] == 0x3E: # '>'
+                end = find(b"\n", pos) + 1 or size
+                header = self._renameHeader(chunk[pos:end], pos)
+                if header is not None:
+                    append(header)
+            else:
+                end = find(b"\n>", pos) + 1 or size
+                body = chunk[pos:end]
+                if is_valid(body):
+                    if self.valid:
+                        append(body)
+                else:
+                    self._renameInvalidBody(body, append, pos)
+            pos = end
+        return b"".join(output)
+
+    def _renameChunkDeduplicated(self, chunk):
+        """Renames a chunk, holding each record back until it ends."""
+        output = []
+        pending = self.pending
+        is_valid = self.validator.is_valid
+        pos = 0
+        size = len(chunk)
+        while pos < size:
+            if chunk[pos] == 0x3E: # '>'
+                end = chunk.find(b"\n", pos) + 1 or size
+                output.append(self._flushRecord())
+                pending = self.pending
+                line = chunk[pos:end]
+                header = self._renameHeader(line, pos)
+                if header is not None:
+                    duplicate = self.deduplicator.check_accession(line)
+                    if duplicate and self.deduplicator.drop:
+                        self.ctr = self.ctr - 1
+                        self.valid = False
+                    else:
+                        pending.append(header)
+                        self.pendingHeader = line
+                        # A record is reported as a duplicate only once.
+                        self.hasher = None if duplicate \
+                            else self.deduplicator.sequence_hasher()
+            else:
+                end = chunk.find(b"\n>", pos) + 1 or size
+                body = chunk[pos:end]
+                kept = []
+                if is_valid(body):
+                    if self.valid:
+                        kept.append(body)
+                else:
+                    self._renameInvalidBody(body, kept.append, pos)
+                pending.extend(kept)
+                if self.hasher is not None:
+                    for piece in kept:
+                        self.hasher.update(piece.replace(b"\n", b""))
+            pos = end
+        return b"".join(output)
+
+    def _flushRecord(self):
+        """Returns the held back record unless it is a dropped duplicate."""
+        if self.pendingHeader is None:
+            return b""
+        output = self.pending
+        if self.deduplicator.check_sequence(self.pendingHeader, self.hasher) \
+            and self.deduplicator.drop:
+            self.ctr = self.ctr - 1
+            output = []
+        self.pending = []
+        self.pendingHeader = None
+        self.hasher = None
+        return b"".join(output)
+
+    def _renameHeader(self, line, pos):
+        """Rewrites a header line or records it as an error.
+
+        :param pos: Offset of the line in the current chunk.
+
+        :returns: Renamed header line or None if it did not match.
+        """
+        result = None
+        fields = self.parser.parse(line)
+        if fields is not None:
+            self.ctr = self.ctr + 1
+            self.valid = True
+            target = self.replace_target
+            char = self.replace_char
+            virusAccession2, virusName = fields
+            result = b">" + virusAccession2.replace(target, char) \
+                + virusName.replace(target, char) + b"\n"
+        else:
+            self._recordError(line, pos, "invalid header")
+        return result
+
+    def _renameInvalidBody(self, body, append, base):
+        """Processes a sequence body containing an invalid byte.
+
+        Every line holding an offending byte is recorded as an error.
+        Lines before the first of them are kept if the record is valid;
+        everything after it is dropped, just like the line-by-line
+        renamer does.
+
+        :param base: Offset of the body in the current chunk.
+        """
+        marks = self.validator.mark(body)
+        size = len(body)
+        pos = 0
+        while pos < size:
+            invalid = marks.find(b"\x01", pos)
+            if invalid == -1:
+                if self.valid:
+                    append(body[pos:])
+                break
+            lineStart = max(body.rfind(b"\n", pos, invalid) + 1, pos)
+            lineEnd = body.find(b"\n", invalid) + 1 or size
+            if self.valid and lineStart > pos:
+                append(body[pos:lineStart])
+            self._recordError(body[lineStart:lineEnd], base + lineStart,
+                "invalid sequence")
+            pos = lineEnd
+
+    def _recordError(self, line, pos, reason):
+        """Records a line that failed and invalidates the record.
+
+        :param pos: Offset of the line in the current chunk.  Lines are
+                    counted up to it from where the last count stopped,
+                    so every byte of a chunk is counted once.
+        """
+        self.err = self.err + 1
+        self.valid = False
+        self.cursorLines = self.cursorLines \
+            + self.chunk.count(b"\n", self.cursor, pos)
+        self.cursor = pos
+        self.error_sink.add(line.decode("utf-8", "replace").rstrip(),
+            self.cursorLines + 1, self.bytes + pos, reason)
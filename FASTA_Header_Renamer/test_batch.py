@@ -0,0 +1,123 @@
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+import csv
+import gzip
+import os
+
+from batch import (expand_globs, is_up_to_date, output_path_for,
+    read_manifest, rename_batch)
+
+class TestBatch(TestCase):
+
+    testInput = b">gi|1|gb|AB123.1|Tomato leaf curl virus\nACGT\n" \
+        + b">no pipes here\nACGT\n"
+
+    def setUp(self):
+        self.tempDir = TemporaryDirectory()
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tempDir.name, name)
+
+    def write(self, name, data):
+        with open(self.path(name), "wb") as handle:
+            handle.write(data)
+        return self.path(name)
+
+    def testOutputPathFor(self):
+        self.assertEqual(output_path_for("in/sample.fasta"),
+            os.path.join("in", "sample_OUTPUT.fasta"),
+            "Suffix must go before the extension.")
+        self.assertEqual(output_path_for("in/sample.fasta.gz", "out"),
+            os.path.join("out", "sample_OUTPUT.fasta.gz"),
+            "Suffix must go before the compressed extension.")
+
+    def testReadManifestAndGlobs(self):
+        manifestPath = self.write("manifest.tsv",
+            b"# samples\na.fasta\tout/a.fasta\n\nb.fasta\n")
+        self.write("a.fasta", self.testInput)
+        self.write("a_OUTPUT.fasta", b"")
+
+        self.assertEqual(read_manifest(manifestPath),
+            [(self.path("a.fasta"), self.path("out/a.fasta")),
+            (self.path("b.fasta"), None)],
+            "Paths must be read relative to the manifest.")
+        self.assertEqual(expand_globs([self.path("*.fasta")]),
+            [(self.path("a.fasta"), None)],
+            "Globs must leave out outputs.")
+
+    def testRenameBatch(self):
+        firstPath = self.write("first.fasta", self.testInput)
+        secondPath = self.write("second.fasta.gz",
+            gzip.compress(self.testInput * 2))
+        jobs = [(firstPath, None), (secondPath, None),
+            (self.path("missing.fasta"), None)]
+        reportPath = self.path("errors.tsv")
+        results = rename_batch(jobs, processes = 2, error_report = reportPath,
+            error_sample = 1)
+
+        self.assertEqual([result["status"] for result in results],
+            ["renamed", "renamed", "failed"],
+            "Results must be returned in job order.")
+        self.assertEqual([result["errors"] for result in results[:2]],
+            [1, 2], "Errors must be counted per file.")
+        self.assertEqual(len(results[1]["error_lines"]), 1,
+            "Only a sample of the error lines must be kept.")
+        with gzip.open(self.path("second_OUTPUT.fasta.gz")) as handle:
+            self.assertEqual(handle.read(),
+                b">AB123.Tomato_leaf_curl_virus\nACGT\n" * 2,
+                "Compressed input must be renamed to compressed output.")
+        self.assertTrue(is_up_to_date(firstPath, results[0]["output"]),
+            "Renamed output must be up to date.")
+        self.assertEqual(os.listdir(self.tempDir.name).count(
+            ".first_OUTPUT.fasta"), 0, "Temporary files must be gone.")
+
+        rerun = rename_batch(jobs[:2], processes = 2)
+        self.assertEqual([result["status"] for result in rerun],
+            ["skipped", "skipped"], "Up to date outputs must be skipped.")
+        os.utime(firstPath, ns = (os.stat(firstPath).st_atime_ns,
+            os.stat(results[0]["output"]).st_mtime_ns + 10 ** 9))
+        rerun = rename_batch(jobs[:2], processes = 2)
+        self.assertEqual([result["status"] for result in rerun],
+            ["renamed", "skipped"], "Changed inputs must be renamed.")
+
+        with open(reportPath, newline = "") as handle:
+            rows = list(csv.reader(handle, delimiter = "\t"))
+        self.assertEqual(rows[0], ["input", "kind", "error"],
+            "The report must start with its header.")
+        self.assertEqual(sorted(rows[1:]), sorted([[firstPath, "record",
+            ">no pipes here"]] + [[secondPath, "record", ">no pipes here"]]
+            * 2 + [[self.path("missing.fasta"), "failure",
+            results[2]["failure"]]]), "Every error of every file must be "
+            "reported, not only the sample.")
+        self.assertEqual([name for name in os.listdir(self.tempDir.name)
+            if name.endswith(".errors")], [], "Error files must be gone.")
+
+    def testReportQuotesFields(self):
+        inputPath = self.write("tab\tname.fasta",
+            b">no\tpipes here\nACGT\n")
+        reportPath = self.path("errors.tsv")
+        rename_batch([(inputPath, None)], processes = 1,
+            error_report = reportPath)
+
+        with open(reportPath, newline = "") as handle:
+            rows = list(csv.reader(handle, delimiter = "\t"))
+        self.assertEqual(rows[1], [inputPath, "record", ">no pipes here"],
+            "Tabs must not split the report's columns.")
+
+    def testOutputDirectoriesAndCollisions(self):
+        inputPath = self.write("sample.fasta", self.testInput)
+        results = rename_batch([(inputPath, self.path("out/a/sample.fasta"))],
+            processes = 1)
+
+        self.assertEqual(results[0]["status"], "renamed",
+            "Missing output directories must be created.")
+        with self.assertRaises(ValueError):
+            rename_batch([(inputPath, self.path("same.fasta")),
+                (self.path("other.fasta"), self.path("same.fasta"))])
+        with self.assertRaises(ValueError):
+            rename_batch([(inputPath, None), (inputPath, None)])
+        self.assertFalse(os.path.exists(self.path("same.fasta")),
+            "Colliding batches must not be renamed.")
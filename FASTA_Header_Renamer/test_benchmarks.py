@@ -0,0 +1,60 @@
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+import os
+
+from benchmarks import (ALPHABET, RENAMERS, find_regressions,
+    format_results, generate_fasta)
+from renamer import rename_file
+
+class TestBenchmarks(TestCase):
+
+    def testGenerateFasta(self):
+        with TemporaryDirectory() as tempDir:
+            path = os.path.join(tempDir, "synthetic.fasta")
+            invalid = generate_fasta(path, 200, 150, 0.25, seed = 3)
+            with open(path) as handle:
+                text = handle.read()
+            generate_fasta(path, 200, 150, 0.25, seed = 3)
+            with open(path) as handle:
+                self.assertEqual(handle.read(), text,
+                    "Same seed must generate the same file.")
+
+        headers = [line for line in text.splitlines()
+            if line.startswith(">")]
+        self.assertEqual(len(headers), 200, "Every record must be written.")
+        self.assertTrue(0 < invalid < 200,
+            "Some but not all records must be invalid.")
+        for header in headers:
+            self.assertEqual(header.count("|"), 4,
+                "Headers must have four pipes.")
+
+    def testRenamersRejectTheSameRecords(self):
+        with TemporaryDirectory() as tempDir:
+            path = os.path.join(tempDir, "synthetic.fasta")
+            generate_fasta(path, 200, 150, 0.25, seed = 3)
+            errors = [rename_file(path, os.path.join(tempDir, renamer
+                + ".fasta"), backend = renamer, alphabet = ALPHABET)[1]
+                for renamer in RENAMERS]
+
+        self.assertEqual(len(set(errors)), 1, "Every renamer must reject "
+            "the same records, invalid sequences included.")
+
+    def testFindRegressions(self):
+        baseline = [{"renamer": "python", "records": 10,
+            "sequence_length": 5, "error_rate": 0.0, "wall_seconds": 1.0}]
+        results = [dict(baseline[0], wall_seconds = 1.5)]
+
+        self.assertEqual(len(find_regressions(results, baseline, 0.2)), 1,
+            "50% slowdown must be a regression.")
+        self.assertEqual(find_regressions(results, baseline, 0.6), [],
+            "50% slowdown must be within a 60% tolerance.")
+
+    def testFormatResults(self):
+        table = format_results([{"renamer": "python", "records": 10,
+            "sequence_length": 5, "bytes": 2e6, "wall_seconds": 0.5,
+            "peak_rss_bytes": 3e7, "bytes_per_second": 4e6,
+            "records_per_second": 20}])
+
+        self.assertEqual(len(table.splitlines()), 3,
+            "Table must have a header, a rule and one row.")
+        self.assertIn("python", table, "Row must name the renamer.")
@@ -0,0 +1,97 @@
+from io import BytesIO
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+import gzip
+import os
+import struct
+
+from compression import (BGZF_BLOCK_SIZE, BGZF_EOF, PrefetchReader,
+    is_compressed, open_input, open_output)
+from sharding import rename_sharded
+
+class TestCompression(TestCase):
+
+    def setUp(self):
+        self.tempDir = TemporaryDirectory()
+        self.testData = b"".join(
+            b">gi|" + str(index).encode() + b"|gb|AB1.1|Leaf curl virus\n"
+            + b"ACGTTGCANN" * (index % 50) + b"\n" for index in range(3000))
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tempDir.name, name)
+
+    def testBgzfRoundTrip(self):
+        path = self.path("test.fasta.gz")
+        writer = open_output(path, threads = 2)
+        for pos in range(0, len(self.testData), 1000):
+            writer.write(self.testData[pos:pos + 1000])
+        writer.close()
+
+        self.assertTrue(is_compressed(path), "Output must be gzip.")
+        with open(path, "rb") as handle:
+            compressed = handle.read()
+        self.assertEqual(gzip.decompress(compressed), self.testData,
+            "Output must decompress to the written data.")
+        self.assertTrue(compressed.endswith(BGZF_EOF),
+            "Output must end with the BGZF EOF marker.")
+
+        pos = 0
+        members = 0
+        while pos < len(compressed):
+            self.assertEqual(compressed[pos + 12:pos + 14], b"BC",
+                "Every member must carry the BC extra field.")
+            pos = pos + struct.unpack("<H",
+                compressed[pos + 16:pos + 18])[0] + 1
+            members = members + 1
+        self.assertEqual(pos, len(compressed),
+            "Member sizes must add up to the file size.")
+        self.assertEqual(members,
+            -(-len(self.testData) // BGZF_BLOCK_SIZE) + 1,
+            "Every full block must be its own member.")
+
+    def testOpenInputDetectsCompression(self):
+        plainPath = self.path("plain.fasta")
+        compressedPath = self.path("compressed.fasta")
+        with open(plainPath, "wb") as handle:
+            handle.write(self.testData)
+        with open(compressedPath, "wb") as handle:
+            handle.write(gzip.compress(self.testData))
+
+        for path in (plainPath, compressedPath):
+            handle = open_input(path, block_size = 4096)
+            self.assertEqual(handle.read(), self.testData,
+                "Input must be read as plain data.")
+            self.assertEqual(handle.raw.tell(), os.path.getsize(path),
+                "Raw position must reach the end of the file.")
+            handle.close()
+
+    def testPrefetchReaderHonorsSize(self):
+        reader = PrefetchReader(BytesIO(b"0123456789"), BytesIO(), 3, 1)
+
+        self.assertEqual(reader.read(4), b"0123", "Read must span blocks.")
+        self.assertEqual(reader.read1(10), b"45", "Read1 must not block.")
+        self.assertEqual(reader.read(), b"6789", "Read must drain.")
+        self.assertEqual(reader.read(), b"", "Reader must be exhausted.")
+        reader.close()
+
+    def testShardedCompressedOutput(self):
+        inputPath = self.path("input.fasta")
+        with open(inputPath, "wb") as handle:
+            handle.write(self.testData)
+        rename_sharded(inputPath, self.path("plain.fasta"), 2)
+        rename_sharded(inputPath, self.path("output.fasta.gz"), 2)
+
+        with open(self.path("plain.fasta"), "rb") as handle:
+            expected = handle.read()
+        with gzip.open(self.path("output.fasta.gz"), "rb") as handle:
+            self.assertEqual(handle.read(), expected,
+                "Compressed output must hold the renamed records.")
+
+        compressedPath = self.path("input.fasta.gz")
+        with open(compressedPath, "wb") as handle:
+            handle.write(gzip.compress(self.testData))
+        self.assertRaises(ValueError, rename_sharded, compressedPath,
+            self.path("other.fasta"), 2)
@@ -0,0 +1,87 @@
+from hashlib import blake2b
+from io import BytesIO
+from unittest import TestCase
+
+from dedup import (BloomFilter, Deduplicator, accession_key,
+    deduplicate_records)
+from streaming import StreamingRenamer
+
+class TestDedup(TestCase):
+
+    testInput = b">gi|1|gb|AB123.1|Tomato leaf curl virus\nACGT\nAC\n" \
+        + b">gi|2|gb|AB123.2|Tomato leaf curl virus\nTTTT\n" \
+        + b">gi|3|gb|CD456.1|Bean golden mosaic virus\nACG\nTAC\n" \
+        + b">gi|4|gb|EF789.1|Maize streak virus\nGGGG\n"
+    dedupOutput = b">AB123.Tomato_leaf_curl_virus\nACGT\nAC\n" \
+        + b">EF789.Maize_streak_virus\nGGGG\n"
+
+    def rename(self, deduplicator, blockSize = 4096):
+        renamer = StreamingRenamer(block_size = blockSize,
+            deduplicator = deduplicator)
+        output = BytesIO()
+        renamer.rename(BytesIO(self.testInput), output)
+        return renamer, output.getvalue()
+
+    def testAccessionKey(self):
+        self.assertEqual(accession_key(b">gi|1|gb|AB123.1|Some virus\n"),
+            b"AB123", "Accession must lose its version.")
+        self.assertEqual(accession_key(b">AB123 Some virus"), b"AB123",
+            "Accession must fall back to the first word.")
+
+    def testStreamingRenamerDropsDuplicates(self):
+        for blockSize in (1, 7, 4096):
+            deduplicator = Deduplicator()
+            renamer, output = self.rename(deduplicator, blockSize)
+            self.assertEqual(output, self.dedupOutput,
+                "Duplicates must be dropped with block size " +
+                "{0}.".format(blockSize))
+            self.assertEqual(renamer.ctr, 2,
+                "Dropped records must not be counted.")
+            self.assertEqual([key for description, key
+                in deduplicator.duplicates], ["accession", "sequence"],
+                "Both duplicates must be listed.")
+
+    def testDuplicateSampleIsBounded(self):
+        deduplicator = Deduplicator(sample_size = 1)
+        self.rename(deduplicator)
+
+        self.assertEqual(deduplicator.duplicate_count, 2,
+            "Every duplicate must be counted.")
+        self.assertEqual(len(deduplicator.duplicates), 1,
+            "Only a sample of the duplicates must be kept.")
+
+    def testStreamingRenamerReportsDuplicates(self):
+        renamer, output = self.rename(Deduplicator(drop = False))
+        plainRenamer, plainOutput = self.rename(None)
+
+        self.assertEqual(output, plainOutput,
+            "Reported duplicates must be kept.")
+        self.assertEqual(renamer.ctr, 4, "Every record must be counted.")
+
+    def testBloomFilter(self):
+        bloom = BloomFilter(1000, 0.01)
+        digests = [blake2b(index.to_bytes(4, "little"),
+            digest_size = 16).digest() for index in range(1000)]
+        falsePositives = sum(bloom.add(digest) for digest in digests)
+
+        self.assertLess(falsePositives, 30,
+            "False positives must stay near the error rate.")
+        self.assertTrue(all(bloom.add(digest) for digest in digests),
+            "Added digests must always be found.")
+        renamer, output = self.rename(Deduplicator(capacity = 100))
+        self.assertEqual(output, self.dedupOutput,
+            "Bloom filters must find the duplicates.")
+
+    def testDeduplicateRecords(self):
+        records = [("gi|1|gb|AB1.1|A virus", "ACGT"),
+            ("gi|2|gb|AB1.2|A virus", "TTTT"),
+            ("gi|3|gb|CD2.1|B virus", "ACGT"),
+            ("gi|4|gb|EF3.1|C virus", "ACGT")]
+
+        self.assertEqual(list(deduplicate_records(records,
+            Deduplicator(["accession"]))), records[:1] + records[2:],
+            "Only the accession must be compared.")
+        self.assertEqual(list(deduplicate_records(records,
+            Deduplicator(["sequence"]))), records[:2],
+            "Only the sequence must be compared.")
+        self.assertRaises(ValueError, Deduplicator, ["name"])
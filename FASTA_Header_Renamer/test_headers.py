@@ -0,0 +1,53 @@
+from unittest import TestCase
+import random
+import re
+
+from headers import NAME_PATTERN, HeaderParser
+
+class TestHeaderParser(TestCase):
+
+    def testStandardHeader(self):
+        parser = HeaderParser()
+        line = b">gi|1|gb|AB123.1|Tomato leaf curl virus segment A, " \
+            + b"a Virus like virus-like isolate\n"
+
+        self.assertEqual(parser.parse(line), (b"AB123.",
+            b"Tomato leaf curl virus segment A, a Virus like virus"),
+            "Name must run to the last virus and keep the pattern's " +
+            "accession.")
+        self.assertEqual(HeaderParser(NAME_PATTERN.decode()).parse(
+            line.decode()), ("AB123.",
+            "Tomato leaf curl virus segment A, a Virus like virus"),
+            "Str headers must be parsed the same way.")
+
+    def testInvalidHeaders(self):
+        parser = HeaderParser()
+        for line in (b">gi|1|gb|AB123.1|Tomato leaf curl\n",
+            b">gi|1|gb|ABC|Some virus\n", b">gi||gb|AB1.1|Some virus\n",
+            b"gi|1|gb|AB1.1|Some virus\n", b">gi|1|gb|1|Some virus"):
+            self.assertIsNone(parser.parse(line),
+                "{0} must not parse.".format(line))
+
+    def testFallsBackToPattern(self):
+        parser = HeaderParser(rb"^>(\w+) (.*virus)", fast_path = True)
+
+        self.assertEqual(parser.parse(b">gi|1|gb|AB1.1|Some virus\n"),
+            (b"AB1.", b"Some virus"), "Standard header must be split.")
+        self.assertEqual(parser.parse(b">AB1 Some virus\n"),
+            (b"AB1", b"Some virus"), "Other headers must use the pattern.")
+        self.assertFalse(HeaderParser(rb"^>(\w+) (.*virus)").fast_path,
+            "Custom patterns must not be split by default.")
+
+    def testMatchesPattern(self):
+        name_prog = re.compile(NAME_PATTERN)
+        parser = HeaderParser()
+        generator = random.Random(0)
+        atoms = [b".", b"1", b"a", b" ", b"virus", b"Virus", b"\r", b">"]
+        for index in range(5000):
+            line = b">" + b"|".join(b"".join(generator.choice(atoms)
+                for atom in range(generator.randint(0, 3)))
+                for field in range(generator.choice((4, 5, 5, 6)))) + b"\n"
+            nameMatch = name_prog.match(line)
+            self.assertEqual(parser.parse(line),
+                nameMatch.group(1, 2) if nameMatch else None,
+                "{0} must parse like the pattern.".format(line))
@@ -0,0 +1,61 @@
+from io import BytesIO, StringIO
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+import os
+
+from indexing import FastaIndex, IndexingWriter
+
+class TestIndexing(TestCase):
+
+    testFasta = b">AB1.Leaf_curl_virus\nACGTA\nCGTAC\nGT\n" \
+        + b">CD2.Mosaic_Virus\n" \
+        + b">EF3.Stunt_virus\nAAAA\nCC\n"
+    testIndex = "AB1.Leaf_curl_virus\t12\t21\t5\t6\n" \
+        + "CD2.Mosaic_Virus\t0\t54\t0\t1\n" \
+        + "EF3.Stunt_virus\t6\t71\t4\t5\n"
+
+    def setUp(self):
+        self.tempDir = TemporaryDirectory()
+        self.fastaPath = os.path.join(self.tempDir.name, "test.fasta")
+        with open(self.fastaPath, "wb") as handle:
+            handle.write(self.testFasta)
+        with open(self.fastaPath + ".fai", "w") as handle:
+            handle.write(self.testIndex)
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def testIndexingWriterIgnoresWriteBoundaries(self):
+        for step in (1, 2, 7, len(self.testFasta)):
+            output = BytesIO()
+            index = StringIO()
+            writer = IndexingWriter(output, index)
+            for pos in range(0, len(self.testFasta), step):
+                writer.write(self.testFasta[pos:pos + step])
+            writer.finish()
+
+            self.assertEqual(output.getvalue(), self.testFasta,
+                "Output must be written unchanged.")
+            self.assertEqual(index.getvalue(), self.testIndex,
+                "Index must not depend on write size {0}.".format(step))
+
+    def testFetchReturnsWholeRecord(self):
+        with FastaIndex(self.fastaPath) as index:
+            self.assertEqual(len(index), 3, "All records must be indexed.")
+            self.assertEqual(index.fetch("AB1.Leaf_curl_virus"),
+                b">AB1.Leaf_curl_virus\nACGTA\nCGTAC\nGT\n",
+                "First record must be fetched.")
+            self.assertEqual(index.fetch("CD2.Mosaic_Virus"),
+                b">CD2.Mosaic_Virus\n",
+                "Record without a sequence must be fetched.")
+            self.assertEqual(index.fetch("EF3.Stunt_virus"),
+                b">EF3.Stunt_virus\nAAAA\nCC\n",
+                "Last record must be fetched.")
+            self.assertRaises(KeyError, index.fetch, "Missing")
+
+    def testFetchSequence(self):
+        with FastaIndex(self.fastaPath) as index:
+            self.assertEqual(index.fetch_sequence("AB1.Leaf_curl_virus"),
+                b"ACGTACGTACGT", "Sequence must not contain newlines.")
+            self.assertEqual(index.fetch_sequence("CD2.Mosaic_Virus"),
+                b"", "Empty sequence must be empty.")
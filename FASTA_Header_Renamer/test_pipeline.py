@@ -0,0 +1,87 @@
+from io import BytesIO
+from unittest import TestCase
+import threading
+
+from pipeline import WriteBehind, read_ahead, read_records_ahead, \
+    rename_pipelined
+from streaming import StreamingRenamer
+
+class FailingWriter:
+
+    def write(self, data):
+        raise OSError("disk full")
+
+class TestPipeline(TestCase):
+
+    testInput = b">gi|1|gb|AB123.1|Tomato leaf curl virus\nACGT\nxx\n" \
+        + b">no pipes here\nACGT\n" \
+        + b">gi|2|gb|CD456.2|Bean golden mosaic Virus\nTTTT\nACGT\n"
+
+    def testMatchesSerialRename(self):
+        for blockSize in (1, 5, 4096):
+            expected = BytesIO()
+            serial = StreamingRenamer(block_size = blockSize)
+            serial.rename(BytesIO(self.testInput), expected)
+
+            output = BytesIO()
+            renamer = StreamingRenamer(block_size = blockSize)
+            rename_pipelined(renamer, BytesIO(self.testInput), output,
+                queue_size = 2)
+
+            self.assertEqual(output.getvalue(), expected.getvalue(),
+                "Pipelined output must match with block size " +
+                "{0}.".format(blockSize))
+            self.assertEqual((renamer.ctr, renamer.err,
+                renamer.virus_errors), (serial.ctr, serial.err,
+                serial.virus_errors), "Counts must match.")
+            self.assertFalse(output.closed,
+                "The output handle must be left open.")
+
+    def testReadAheadRaisesReaderErrors(self):
+        def produce():
+            yield 1
+            raise ValueError("bad block")
+
+        items = []
+        with self.assertRaises(ValueError,
+            msg = "Reader errors must reach the consumer."):
+            for item in read_ahead(produce()):
+                items.append(item)
+        self.assertEqual(items, [1],
+            "Items read before the error must be passed on.")
+
+    def testReadAheadStopsReader(self):
+        started = threading.active_count()
+        batches = read_ahead(iter(range(1000)), queue_size = 1)
+        self.assertEqual(next(batches), 0, "Items must keep their order.")
+        batches.close()
+
+        self.assertEqual(threading.active_count(), started,
+            "The reader thread must stop once the consumer does.")
+
+    def testReadRecordsAheadKeepsRecords(self):
+        records = [(str(index), "ACGT") for index in range(25)]
+
+        self.assertEqual(list(read_records_ahead(iter(records),
+            batch_size = 7)), records, "Every record must be passed on "
+            "in order.")
+
+    def testWriteBehindWritesEverything(self):
+        output = BytesIO()
+        writer = WriteBehind(output, queue_size = 1, write_size = 3)
+        for index in range(100):
+            writer.write(b"%d\n" % index)
+        handle = writer.detach()
+
+        self.assertIs(handle, output, "The handle must be returned.")
+        self.assertEqual(output.getvalue(), b"".join(b"%d\n" % index
+            for index in range(100)), "Every write must reach the handle "
+            "in order.")
+
+    def testWriteBehindRaisesWriterErrors(self):
+        writer = WriteBehind(FailingWriter(), queue_size = 1, write_size = 1)
+        with self.assertRaises(OSError,
+            msg = "Writer errors must reach the caller."):
+            for index in range(100):
+                writer.write(b"ACGT\n")
+            writer.detach()
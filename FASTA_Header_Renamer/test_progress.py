@@ -0,0 +1,65 @@
+from io import BytesIO, StringIO
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+import json
+import os
+
+from progress import ProgressMeter
+from streaming import StreamingRenamer
+
+class TestProgressMeter(TestCase):
+
+    testInput = b">gi|1|gb|AB1.1|Leaf curl virus\nACGT\n" \
+        + b">broken\nACGT\n" \
+        + b">gi|2|gb|CD2.1|Mosaic virus\nACGT\n"
+
+    def testRenamerIncrementsCounters(self):
+        meter = ProgressMeter(len(self.testInput), stream = None)
+        meter.start()
+        StreamingRenamer(block_size = 8).rename(BytesIO(self.testInput),
+            BytesIO(), meter)
+        meter.stop()
+
+        self.assertEqual(meter.records, 2, "Records must be counted.")
+        self.assertEqual(meter.errors, 1, "Errors must be counted.")
+        self.assertEqual(meter.bytes, len(self.testInput),
+            "Every byte read must be counted.")
+
+    def testStopWritesFinalLine(self):
+        stream = StringIO()
+        meter = ProgressMeter(stream = stream, interval = 60)
+        meter.start()
+        meter.records = meter.records + 3
+        meter.stop()
+
+        self.assertTrue(stream.getvalue().startswith(
+            "Number of Viruses Processed: 3, Number of Errors: 0"),
+            "Final progress line must show the counts.")
+
+    def testSummaryUsesPosition(self):
+        meter = ProgressMeter(100, stream = None, position = lambda: 40)
+        meter.start()
+        meter.stop()
+        summary = meter.summary()
+
+        self.assertEqual(summary["bytes"], 40,
+            "Bytes must be sampled from the position callable.")
+        self.assertEqual(summary["total_bytes"], 100,
+            "Total bytes must be reported.")
+
+    def testWriteSummary(self):
+        meter = ProgressMeter(stream = None)
+        meter.start()
+        meter.records = meter.records + 5
+        meter.stop()
+        with TemporaryDirectory() as tempDir:
+            path = os.path.join(tempDir, "summary.json")
+            meter.write_summary(path)
+            with open(path) as handle:
+                summary = json.load(handle)
+
+        self.assertEqual(summary["records"], 5,
+            "Summary must hold the record count.")
+        for key in ("errors", "bytes", "elapsed_seconds",
+            "records_per_second", "bytes_per_second", "eta_seconds"):
+            self.assertIn(key, summary, "Summary must hold " + key + ".")
@@ -0,0 +1,88 @@
+from io import BytesIO
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+import os
+
+from rejects import ErrorSink
+from sharding import rename_sharded
+from streaming import StreamingRenamer
+
+class TestErrorSink(TestCase):
+
+    testInput = b">gi|1|gb|AB123.1|Tomato leaf curl virus\nACGT\nxx\n" \
+        + b">no pipes here\nACGT\n" \
+        + b">gi|2|gb|CD456.2|Bean golden mosaic Virus\nTTTT\nAC\tGT\n"
+
+    def setUp(self):
+        self.tempDir = TemporaryDirectory()
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def readRows(self, path):
+        with open(path) as handle:
+            return [row.rstrip("\n").split("\t") for row in handle]
+
+    def testKeepsBoundedSample(self):
+        path = os.path.join(self.tempDir.name, "errors.tsv")
+        sink = ErrorSink(path, 2)
+        for index in range(5):
+            sink.add("line {0}".format(index), index + 1, index * 10,
+                "invalid header" if index % 2 else "invalid sequence")
+        sink.close()
+
+        self.assertEqual(sink.sample, ["line 0", "line 1"],
+            "Only the sample must be kept in memory.")
+        self.assertEqual(sink.count, 5, "Every line must be counted.")
+        self.assertEqual(sink.reasons, {"invalid header": 2,
+            "invalid sequence": 3}, "Lines must be counted per reason.")
+        self.assertEqual(len(self.readRows(path)), 6,
+            "Every line must be written after the column names.")
+
+    def testStreamingRenamerLocatesErrors(self):
+        expected = [["line", "offset", "reason", "text"],
+            ["3", "45", "invalid sequence", "xx"],
+            ["4", "48", "invalid header", ">no pipes here"],
+            ["8", "115", "invalid sequence", "AC GT"]]
+        for blockSize in (1, 5, 4096):
+            path = os.path.join(self.tempDir.name,
+                "errors{0}.tsv".format(blockSize))
+            sink = ErrorSink(path, 1)
+            renamer = StreamingRenamer(block_size = blockSize,
+                error_sink = sink)
+            renamer.rename(BytesIO(self.testInput), BytesIO())
+            sink.close()
+
+            self.assertEqual(self.readRows(path), expected,
+                "Errors must be located with block size " +
+                "{0}.".format(blockSize))
+            self.assertEqual(renamer.virus_errors, ["xx"],
+                "Only the sample must be kept.")
+            self.assertEqual(renamer.err, 3, "Every error must be counted.")
+
+    def testShardedErrorsMatchSerial(self):
+        inputPath = os.path.join(self.tempDir.name, "input.fasta")
+        with open(inputPath, "wb") as handle:
+            handle.write(self.testInput * 50)
+        serialPath = os.path.join(self.tempDir.name, "serial.tsv")
+        shardedPath = os.path.join(self.tempDir.name, "sharded.tsv")
+
+        serialSink = ErrorSink(serialPath, 10)
+        with open(inputPath, "rb") as handle:
+            StreamingRenamer(error_sink = serialSink).rename(handle,
+                BytesIO())
+        serialSink.close()
+        shardedSink = ErrorSink(shardedPath, 10)
+        ctr, err, virus_errors = rename_sharded(inputPath,
+            os.path.join(self.tempDir.name, "output.fasta"), 2,
+            shard_count = 4, error_sink = shardedSink)
+        shardedSink.close()
+
+        self.assertEqual(self.readRows(shardedPath),
+            self.readRows(serialPath),
+            "Sharded errors must match serial errors.")
+        self.assertEqual(virus_errors, serialSink.sample,
+            "Sharded sample must match serial sample.")
+        self.assertEqual(os.listdir(self.tempDir.name).count(
+            "output.fasta.part0.errors"), 0,
+            "Shard error files must be removed.")
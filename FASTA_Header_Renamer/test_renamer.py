@@ -0,0 +1,144 @@
+from io import BytesIO, StringIO
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+import os
+
+from renamer import (main, read_records, rename_file, rename_records,
+    write_records)
+
+class TestRenamer(TestCase):
+
+    testInput = b">gi|1|gb|AB123.1|Tomato leaf curl virus segment A\n" \
+        + b"ACGT\nNN-A\n" \
+        + b">no pipes here\nACGT\n" \
+        + b">gi|2|gb|CD456.2|Bean golden mosaic Virus\r\n" \
+        + b"TTTT\r\nxx\r\n"
+
+    def testReadRecords(self):
+        records = list(read_records(BytesIO(b"AC\n" + self.testInput)))
+
+        self.assertEqual(records, [
+            ("gi|1|gb|AB123.1|Tomato leaf curl virus segment A", "ACGTNN-A"),
+            ("no pipes here", "ACGT"),
+            ("gi|2|gb|CD456.2|Bean golden mosaic Virus", "TTTTxx")],
+            "Sequence lines must be joined and leading lines skipped.")
+
+    def testRenameRecords(self):
+        errors = []
+        renamed = list(rename_records(read_records(BytesIO(self.testInput)),
+            errors = errors))
+
+        self.assertEqual(renamed,
+            [("AB123.Tomato_leaf_curl_virus", "ACGTNN-A")],
+            "Only the valid record must be renamed.")
+        self.assertEqual(errors, ["no pipes here",
+            "gi|2|gb|CD456.2|Bean golden mosaic Virus"],
+            "Invalid header and invalid sequence must be reported.")
+
+    def testRenameRecordsBioPythonBackend(self):
+        errors = []
+        records = [("gi|1|gb|AB123.1|Tomato leaf curl virus", "acgt"),
+            ("no pipes here virus", "ACGT")]
+        renamed = list(rename_records(records, "biopython", errors = errors))
+
+        self.assertEqual(renamed, [("AB123Tomato_leaf_curl_virus", "acgt")],
+            "Accession must come from the record id and sequences must " +
+            "not be validated.")
+        self.assertEqual(errors, ["no pipes here virus"],
+            "Header without an accession field must be reported.")
+
+    def testRenameRecordsIsLazy(self):
+        records = iter([("gi|1|gb|AB123.1|Tomato leaf curl virus", "ACGT")])
+        renamed = rename_records(records)
+
+        self.assertEqual(next(renamed)[0], "AB123.Tomato_leaf_curl_virus",
+            "Records must be renamed as they are consumed.")
+        self.assertRaises(StopIteration, next, renamed)
+        self.assertRaises(ValueError, rename_records, [], "perl")
+
+    def testWriteRecords(self):
+        output = StringIO()
+        count = write_records([("a", "ACGTACG"), ("b", "")], output, 3)
+
+        self.assertEqual(count, 2, "Both records must be counted.")
+        self.assertEqual(output.getvalue(), ">a\nACG\nTAC\nG\n>b\n\n",
+            "Sequences must be wrapped to the line width.")
+
+    def testRenameFileMatchesStreamingEngine(self):
+        with TemporaryDirectory() as tempDir:
+            inputPath = os.path.join(tempDir, "input.fasta")
+            outputPath = os.path.join(tempDir, "output.fasta")
+            with open(inputPath, "wb") as handle:
+                handle.write(self.testInput)
+            ctr, err, virus_errors = rename_file(inputPath, outputPath)
+            with open(outputPath, "rb") as handle:
+                output = handle.read()
+
+        self.assertEqual(output, b">AB123.Tomato_leaf_curl_virus\n"
+            + b"ACGT\nNN-A\n>CD456.Bean_golden_mosaic_Virus\nTTTT\n",
+            "Whole files must be renamed line by line.")
+        self.assertEqual((ctr, err), (2, 2), "Counts must be returned.")
+        self.assertEqual(virus_errors, [">no pipes here", "xx"],
+            "Error lines must be returned.")
+
+    def testFailedRenameKeepsPreviousOutput(self):
+        def failingShard(input_handle, output_handle, options, meter):
+            output_handle.write(b">partial")
+            raise RuntimeError("rename failed")
+
+        with TemporaryDirectory() as tempDir:
+            inputPath = os.path.join(tempDir, "input.fasta")
+            outputPath = os.path.join(tempDir, "output.fasta")
+            indexPath = os.path.join(tempDir, "output.fai")
+            for path in (inputPath, outputPath):
+                with open(path, "wb") as handle:
+                    handle.write(self.testInput)
+            with patch("renamer.rename_streaming_shard", failingShard), \
+                self.assertRaises(RuntimeError):
+                rename_file(inputPath, outputPath, index_path = indexPath)
+
+            self.assertEqual(sorted(os.listdir(tempDir)),
+                ["input.fasta", "output.fasta"],
+                "Temporary output and index files must be removed.")
+            with open(outputPath, "rb") as handle:
+                self.assertEqual(handle.read(), self.testInput,
+                    "A failed rename must not replace the output.")
+
+    def testIndexRejectsCompressedOutput(self):
+        with TemporaryDirectory() as tempDir:
+            inputPath = os.path.join(tempDir, "input.fasta")
+            outputPath = os.path.join(tempDir, "output.fasta.gz")
+            indexPath = os.path.join(tempDir, "output.fai")
+            with open(inputPath, "wb") as handle:
+                handle.write(self.testInput)
+            for processes in (1, 2):
+                with self.assertRaises(ValueError):
+                    rename_file(inputPath, outputPath, processes = processes,
+                        index_path = indexPath)
+            with self.assertRaises(SystemExit):
+                main([inputPath, outputPath, "--index", indexPath])
+
+            self.assertEqual(os.listdir(tempDir), ["input.fasta"],
+                "No output or index must be written.")
+
+    def testCommandLine(self):
+        with TemporaryDirectory() as tempDir:
+            inputPath = os.path.join(tempDir, "input.fasta")
+            outputPath = os.path.join(tempDir, "output.fasta")
+            summaryPath = os.path.join(tempDir, "summary.json")
+            with open(inputPath, "wb") as handle:
+                handle.write(self.testInput)
+            status = main([inputPath, outputPath, "--summary", summaryPath,
+                "--alphabet", "dna", "--progress-interval", "60"])
+
+            self.assertEqual(status, 0, "Renaming must succeed.")
+            self.assertTrue(os.path.exists(summaryPath),
+                "Summary must be written.")
+            with open(outputPath, "rb") as handle:
+                self.assertTrue(handle.read().startswith(
+                    b">AB123.Tomato_leaf_curl_virus\n"),
+                    "Output must be renamed.")
+            with self.assertRaises(SystemExit):
+                main([inputPath, outputPath, "--backend", "biopython",
+                    "--index", os.path.join(tempDir, "output.fai")])
@@ -0,0 +1,64 @@
+from io import BytesIO
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+import os
+
+from sharding import ShardReader, find_shard_ranges, rename_sharded
+from streaming import StreamingRenamer
+
+class TestSharding(TestCase):
+
+    def setUp(self):
+        self.tempDir = TemporaryDirectory()
+        self.inputPath = os.path.join(self.tempDir.name, "input.fasta")
+        self.outputPath = os.path.join(self.tempDir.name, "output.fasta")
+        records = []
+        for index in range(50):
+            if index % 7 == 3:
+                records.append(">broken header {0}\nACGT\n".format(index))
+            else:
+                records.append(">gi|{0}|gb|AB{0}.1|Leaf curl virus {0}\n"
+                    .format(index) + "ACGTN-\n" * (index % 5))
+        self.testInput = "".join(records).encode()
+        with open(self.inputPath, "wb") as handle:
+            handle.write(self.testInput)
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def testShardRangesStartOnRecords(self):
+        ranges = find_shard_ranges(self.inputPath, 8)
+
+        self.assertEqual(ranges[0][0], 0, "First shard must start at 0.")
+        self.assertEqual(ranges[-1][1], len(self.testInput),
+            "Last shard must end at the end of the file.")
+        for (start, end), (nextStart, nextEnd) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, nextStart, "Shards must be contiguous.")
+            self.assertEqual(self.testInput[nextStart:nextStart + 1], b">",
+                "Shards must start on a record.")
+
+    def testShardReaderStopsAtEnd(self):
+        reader = ShardReader(BytesIO(b"0123456789"), 2, 6)
+
+        self.assertEqual(reader.read(3), b"234", "Read must start at 2.")
+        self.assertEqual(reader.read(), b"5", "Read must stop at 6.")
+        self.assertEqual(reader.read(), b"", "Shard must be exhausted.")
+
+    def testRenameShardedMatchesSerial(self):
+        renamer = StreamingRenamer()
+        serialOutput = BytesIO()
+        renamer.rename(BytesIO(self.testInput), serialOutput)
+
+        ctr, err, virus_errors = rename_sharded(self.inputPath,
+            self.outputPath, 2, shard_count = 5)
+        with open(self.outputPath, "rb") as handle:
+            shardedOutput = handle.read()
+
+        self.assertEqual(shardedOutput, serialOutput.getvalue(),
+            "Sharded output must be identical to the serial output.")
+        self.assertEqual(virus_errors, renamer.virus_errors,
+            "Errors must be reported in the same order.")
+        self.assertEqual((ctr, err), (renamer.ctr, renamer.err),
+            "Counts must be the same as the serial counts.")
+        self.assertEqual(sorted(os.listdir(self.tempDir.name)),
+            ["input.fasta", "output.fasta"], "Part files must be removed.")
@@ -0,0 +1,85 @@
+from io import BytesIO
+from unittest import TestCase
+from streaming import StreamingRenamer, read_chunks
+
+class TestReadChunks(TestCase):
+
+    def testChunksEndOnCompleteLines(self):
+        testInput = b">a|b|c|D1.1|Some virus\nACGT\nAC"
+        chunks = list(read_chunks(BytesIO(testInput), 5))
+
+        self.assertEqual(b"".join(chunks), testInput,
+            "Chunks must reassemble into the original input.")
+        for chunk in chunks[:-1]:
+            self.assertTrue(chunk.endswith(b"\n"),
+                "Every chunk but the last must end on a newline.")
+
+    def testNormalizesLineEndings(self):
+        testInput = b"AC\r\nGT\rNN\r"
+        for blockSize in range(1, len(testInput) + 1):
+            chunks = list(read_chunks(BytesIO(testInput), blockSize))
+            self.assertEqual(b"".join(chunks), b"AC\nGT\nNN\n",
+                "Line endings must be normalized with block size " +
+                "{0}.".format(blockSize))
+
+class TestStreamingRenamer(TestCase):
+
+    validInput = b">gi|1|gb|AB123.1|Tomato leaf curl virus segment A\n" \
+        + b"ACGT\nNN-A\n" \
+        + b">gi|2|gb|CD456.2|Bean golden mosaic Virus\n" \
+        + b"TTTT\n"
+    validOutput = b">AB123.Tomato_leaf_curl_virus\nACGT\nNN-A\n" \
+        + b">CD456.Bean_golden_mosaic_Virus\nTTTT\n"
+
+    def rename(self, testInput, blockSize = 4096):
+        renamer = StreamingRenamer(block_size = blockSize)
+        output = BytesIO()
+        renamer.rename(BytesIO(testInput), output)
+        return renamer, output.getvalue()
+
+    def testRenameValidRecords(self):
+        renamer, output = self.rename(self.validInput)
+
+        self.assertEqual(output, self.validOutput,
+            "Headers must be rewritten and sequences copied.")
+        self.assertEqual(renamer.ctr, 2, "Both records must be counted.")
+        self.assertEqual(renamer.err, 0, "There must be no errors.")
+
+    def testRenameIsIndependentOfBlockSize(self):
+        for blockSize in (1, 3, 17, 64):
+            renamer, output = self.rename(self.validInput, blockSize)
+            self.assertEqual(output, self.validOutput,
+                "Output must not depend on block size " +
+                "{0}.".format(blockSize))
+
+    def testInvalidHeaderDropsRecord(self):
+        testInput = b">no pipes here\nACGT\n" + self.validInput
+        renamer, output = self.rename(testInput)
+
+        self.assertEqual(output, self.validOutput,
+            "Sequence of an invalid header must be dropped.")
+        self.assertEqual(renamer.virus_errors, [">no pipes here"],
+            "Invalid header must be reported.")
+
+    def testInvalidSequenceLineDropsRestOfRecord(self):
+        testInput = b">gi|1|gb|AB123.1|Tomato leaf curl virus\n" \
+            + b"ACGT\nacgt\nACGT\nxx\n"
+        renamer, output = self.rename(testInput)
+
+        self.assertEqual(output, b">AB123.Tomato_leaf_curl_virus\nACGT\n",
+            "Lines after an invalid line must be dropped.")
+        self.assertEqual(renamer.virus_errors, ["acgt", "xx"],
+            "Every invalid line must be reported.")
+        self.assertEqual(renamer.err, 2, "Both errors must be counted.")
+
+    def testIupacAlphabetKeepsSoftMaskedBases(self):
+        testInput = b">gi|1|gb|AB123.1|Tomato leaf curl virus\n" \
+            + b"ACGT\nacgtRY\n"
+        renamer = StreamingRenamer(alphabet = "dna")
+        output = BytesIO()
+        renamer.rename(BytesIO(testInput), output)
+
+        self.assertEqual(output.getvalue(),
+            b">AB123.Tomato_leaf_curl_virus\nACGT\nacgtRY\n",
+            "IUPAC and lower case bases must be kept.")
+        self.assertEqual(renamer.err, 0, "There must be no errors.")
@@ -0,0 +1,45 @@
+from unittest import TestCase
+import re
+
+from validation import ALPHABETS, SequenceValidator
+
+class TestSequenceValidator(TestCase):
+
+    def testStrictMatchesAlphaRegex(self):
+        alphaProg = re.compile(rb"^[NATCG\-\n]+$")
+        validator = SequenceValidator("strict")
+        for testLine in (b"ACGT\n", b"NN--\n", b"\n", b"ACGT", b"acgt\n",
+            b"ACGR\n", b"AC GT\n", b">ACGT\n", b"ACGU\n"):
+            self.assertEqual(validator.is_valid(testLine),
+                bool(alphaProg.match(testLine)),
+                "Strict alphabet must agree with the alpha regex on " +
+                "{0}.".format(testLine))
+        self.assertFalse(validator.is_valid(b""),
+            "Empty input must not be valid.")
+
+    def testIupacAcceptsAmbiguityCodesAndLowerCase(self):
+        validator = SequenceValidator("dna")
+
+        self.assertTrue(validator.is_valid(b"ACGTRYKMSWBDHVN-\nacgtrykm\n"),
+            "IUPAC DNA codes must be valid in either case.")
+        self.assertFalse(validator.is_valid(b"ACGU\n"),
+            "U must not be valid DNA.")
+        self.assertTrue(SequenceValidator("rna").is_valid(b"ACGUacgu\n"),
+            "U must be valid RNA.")
+        self.assertTrue(SequenceValidator("protein").is_valid(b"MKLV*\n"),
+            "Amino acids must be valid protein.")
+
+    def testFindInvalidReportsOffset(self):
+        validator = SequenceValidator()
+        testBlock = b"ACGT\nACxT\nACGT\nyy\n"
+
+        self.assertEqual(validator.find_invalid(testBlock), 7,
+            "First offending byte must be found.")
+        self.assertEqual(validator.find_invalid(testBlock, 8), 15,
+            "Search must start at the given offset.")
+        self.assertEqual(validator.find_invalid(b"ACGT\n"), -1,
+            "Valid block must have no offending byte.")
+
+    def testUnknownAlphabet(self):
+        self.assertRaises(ValueError, SequenceValidator, "klingon")
+        self.assertIn("strict", ALPHABETS, "Strict alphabet must exist.")
@@ -0,0 +1,34 @@
+from io import StringIO
+from unittest import TestCase
+import textwrap
+
+from wrapping import FastaRecordWriter, wrap_sequence
+
+class TestWrapping(TestCase):
+
+    def testWrapSequenceMatchesTextwrapWithoutGaps(self):
+        for length in (0, 1, 79, 80, 81, 160, 161, 1000):
+            testSequence = ("ACGTN" * 200)[:length]
+            self.assertEqual(wrap_sequence(testSequence, 80),
+                textwrap.fill(testSequence, 80),
+                "Wrapping must match textwrap for length " +
+                "{0}.".format(length))
+
+    def testWrapSequenceIgnoresGaps(self):
+        self.assertEqual(wrap_sequence("ACGT-ACGT", 6), "ACGT-A\nCGT",
+            "Gaps must not break lines early.")
+        self.assertEqual(wrap_sequence(b"ACGTACGT", 3), b"ACG\nTAC\nGT",
+            "Bytes must be wrapped as well.")
+        self.assertEqual(wrap_sequence("ACGTACGT", None), "ACGTACGT",
+            "No line width must keep the sequence on one line.")
+
+    def testWriteRecords(self):
+        handle = StringIO()
+        writer = FastaRecordWriter(handle, 4)
+        count = writer.write_records([("AB1.Leaf_curl_virus", "ACGTACGTA"),
+            ("CD2.Mosaic_virus", "")])
+
+        self.assertEqual(count, 2, "Both records must be counted.")
+        self.assertEqual(handle.getvalue(),
+            ">AB1.Leaf_curl_virus\nACGT\nACGT\nA\n>CD2.Mosaic_virus\n\n",
+            "Records must be written with wrapped sequences.")
@@ -0,0 +1,63 @@
+'''Linear-Time Fixed-Width FASTA Record Writing
+
+The BioPython renamer used textwrap.fill to wrap each sequence to 80
+characters.  textwrap is built for prose: it looks for whitespace and hyphens
+to break on and rescans the text as it goes, which made wrapping the slowest
+part of renaming long genomes.
+
+Sequences have no words to break between, so they are wrapped by slicing them
+into chunks of exactly line_width characters and joining the chunks with a
+single join.  Each record is then written with a single write call.
+
+Unlike textwrap, gaps ('-') never cause a line to be broken early, so every
+line but the last holds exactly line_width characters.
+'''
+
+def wrap_sequence(sequence, line_width = 80):
+    """Wraps a sequence into lines of line_width characters.
+
+    :param sequence:   Sequence as str or bytes.
+    :param line_width: Number of characters per line.  None or 0 keeps
+                       the whole sequence on one line.
+    :returns:          Sequence with newlines between the lines and no
+                       trailing newline.
+    """
+    if not line_width or len(sequence) <= line_width:
+        return sequence
+    newline = "\n" if isinstance(sequence, str) else b"\n"
+    return newline.join([sequence[start:start + line_width]
+        for start in range(0, len(sequence), line_width)])
+
+class FastaRecordWriter:
+
+    """Writes FASTA records with fixed-width sequence lines."""
+
+    def __init__(self, handle, line_width = 80):
+        """Writes to the given handle.
+
+        :param handle:     File object opened in text mode.
+        :param line_width: Number of sequence characters per line.  None
+                           or 0 writes each sequence on one line.
+        """
+        self.handle = handle
+        self.line_width = line_width
+
+    def write_record(self, header, sequence):
+        """Writes a single record.
+
+        :param header:   Header line without the leading '>'.
+        :param sequence: Sequence of the record.
+        """
+        self.handle.write(">" + header + "\n"
+            + wrap_sequence(sequence, self.line_width) + "\n")
+
+    def write_records(self, records):
+        """Writes every (header, sequence) pair of an iterable.
+
+        :returns: Number of records written.
+        """
+        count = 0
+        for header, sequence in records:
+            self.write_record(header, sequence)
+            count = count + 1
+        return count
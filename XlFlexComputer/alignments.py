@@ -0,0 +1,208 @@
+'''Observed Substitution Counts from Aligned FASTA
+
+Counts the substitutions between aligned sequences into a SubstitutionMatrix,
+so the observed matrices no longer have to be computed by an external tool:
+
+    counter = SubstitutionCounter()
+    with open("alignment.fasta", "rb") as handle:
+        counter.countAgainstReference(readAlignment(handle))
+    observedMatrix = counter.getMatrix()
+
+Sequences are compared column by column: each sequence is encoded into an
+array of base indices with a lookup table and compared with its partner in one
+array operation, so no Python code runs per character.  Columns where either
+sequence has a gap, an ambiguity code or any other non-base character are
+skipped, and so are columns where both bases are the same.
+
+Records are read and counted one at a time, so an alignment of any number of
+sequences is counted in the memory of the reference and the current sequence.
+A reference that is not the first record is found in a first pass:
+
+    with open("alignment.fasta", "rb") as handle:
+        reference = findSequence(readAlignment(handle), b"reference")
+    with open("alignment.fasta", "rb") as handle:
+        counter.countAgainstReference(readAlignment(handle), b"reference",
+            reference)
+'''
+
+import numpy
+
+from structures import DNA, SubstitutionMatrix, getNucleobaseLength
+
+class NucleobaseEncoder:
+
+    """Encodes sequences as arrays of nucleobase indices."""
+
+    def __init__(self, nucleobaseType = DNA):
+        """Builds the lookup table of the nucleobase type.
+
+        Bases are matched by their enum names in either case; every other
+        byte is encoded as -1.
+
+        :param nucleobaseType: Enum of type DNA/RNA.
+        """
+        self.nucleobaseType = nucleobaseType
+        self.table = numpy.full(256, -1, dtype = numpy.int8)
+        for base in nucleobaseType:
+            for name in (base.name.upper(), base.name.lower()):
+                self.table[ord(name)] = base
+
+    def encode(self, sequence):
+        """Returns the base indices of a sequence.
+
+        :param sequence: Sequence as bytes or an ASCII string.
+        :returns:        int8 array with one entry per character.
+        """
+        if isinstance(sequence, str):
+            sequence = sequence.encode("ascii")
+        return self.table[numpy.frombuffer(sequence, dtype = numpy.uint8)]
+
+class SubstitutionCounter:
+
+    """Accumulates substitution counts over aligned sequence pairs."""
+
+    def __init__(self, nucleobaseType = DNA):
+        """Starts with no substitutions counted.
+
+        :param nucleobaseType: Enum of type DNA/RNA.
+        """
+        self.nucleobaseType = nucleobaseType
+        self.nucleobaseLength = getNucleobaseLength(nucleobaseType)
+        self.encoder = NucleobaseEncoder(nucleobaseType)
+        self.counts = numpy.zeros((self.nucleobaseLength,
+            self.nucleobaseLength), dtype = numpy.int64)
+        self.pairs = 0
+
+    def countPair(self, source, destination):
+        """Counts the substitutions from one aligned sequence to another.
+
+        :param source:      Aligned sequence the substitutions start from,
+                            e.g. the reference.
+        :param destination: Aligned sequence of the same length.
+        :raises ValueError: If the sequences differ in length.
+        """
+        if len(source) != len(destination):
+            raise ValueError("Aligned sequences must have the same "
+                "length: {0} != {1}".format(len(source), len(destination)))
+        self._countCodes(self.encoder.encode(source),
+            self.encoder.encode(destination))
+
+    def countAgainstReference(self, records, referenceName = None,
+        reference = None):
+        """Counts the substitutions from a reference to every other
+        sequence of an alignment.
+
+        A named reference that is not the first record is not searched
+        for, since that would mean holding every record before it; find
+        its sequence with findSequence in a first pass and pass it as
+        reference instead.
+
+        :param records:       Iterable of (name, sequence) pairs, e.g.
+                              from readAlignment.  It is consumed one
+                              record at a time.
+        :param referenceName: Name of the reference record, which is not
+                              counted.  Without a reference sequence it
+                              must be the first record.
+        :param reference:     Sequence of the reference.  Defaults to the
+                              sequence of the first record.
+        :raises ValueError:   If there is no reference, the first record
+                              is not the named reference or a sequence
+                              differs in length from the reference.
+        """
+        if reference is not None:
+            reference = self.encoder.encode(reference)
+        for name, sequence in records:
+            if reference is None:
+                if referenceName is not None and name != referenceName:
+                    raise ValueError("Reference sequence {0} must be the "
+                        "first record; found {1}.".format(referenceName,
+                        name))
+                reference = self.encoder.encode(sequence)
+            elif referenceName is None or name != referenceName:
+                self._countEncoded(reference, sequence)
+        if reference is None:
+            raise ValueError("Reference sequence {0} not found.".format(
+                referenceName))
+
+    def countPairs(self, records):
+        """Counts the substitutions within consecutive pairs of records,
+        from the first record of each pair to the second.
+
+        :param records:     Iterable of (name, sequence) pairs.
+        :raises ValueError: If there is an odd number of records or the
+                            sequences of a pair differ in length.
+        """
+        source = None
+        for name, sequence in records:
+            if source is None:
+                source = sequence
+            else:
+                self.countPair(source, sequence)
+                source = None
+        if source is not None:
+            raise ValueError("Records must come in pairs.")
+
+    def getMatrix(self, matrixType = SubstitutionMatrix):
+        """Returns the substitutions counted so far.
+
+        :param matrixType: Class of the returned matrix.
+        :returns:          Substitution matrix of the counts.
+        """
+        matrix = matrixType(self.nucleobaseType)
+        for source in self.nucleobaseType:
+            for dest in self.nucleobaseType:
+                matrix.incrementSubstitution(source, dest,
+                    float(self.counts[source, dest]))
+        return matrix
+
+    def _countEncoded(self, reference, sequence):
+        codes = self.encoder.encode(sequence)
+        if len(codes) != len(reference):
+            raise ValueError("Aligned sequences must have the same "
+                "length: {0} != {1}".format(len(reference), len(codes)))
+        self._countCodes(reference, codes)
+
+    def _countCodes(self, source, destination):
+        """Adds the substitutions between two encoded sequences."""
+        length = self.nucleobaseLength
+        substituted = (source >= 0) & (destination >= 0) \
+            & (source != destination)
+        pairIndices = source[substituted].astype(numpy.intp) * length \
+            + destination[substituted]
+        self.counts += numpy.bincount(pairIndices,
+            minlength = length * length).reshape(length, length)
+        self.pairs = self.pairs + 1
+
+def readAlignment(handle):
+    """Yields the records of a FASTA file one at a time.
+
+    :param handle: File object opened in binary mode.
+    :returns:      Generator of (name, sequence) pairs as bytes, the name
+                   without its '>' and the sequence without line breaks.
+    """
+    name = None
+    lines = []
+    for line in handle:
+        if line.startswith(b">"):
+            if name is not None:
+                yield name, b"".join(lines)
+            name = line[1:].strip()
+            lines = []
+        elif name is not None:
+            lines.append(line.strip())
+    if name is not None:
+        yield name, b"".join(lines)
+
+def findSequence(records, name):
+    """Returns the sequence of a named record, e.g. the reference for
+    SubstitutionCounter.countAgainstReference.
+
+    :param records:     Iterable of (name, sequence) pairs; only the
+                        current record is held.
+    :param name:        Name of the record.
+    :raises ValueError: If no record has the name.
+    """
+    for recordName, sequence in records:
+        if recordName == name:
+            return sequence
+    raise ValueError("Sequence {0} not found.".format(name))
@@ -0,0 +1,247 @@
+'''Persistent Content-Addressed Result Cache
+
+Nightly reruns over the same workbooks used to re-parse and recompute every
+sheet even though only a few of them change.  A ResultCache keeps the results
+on disk, keyed by what they were computed from, so unchanged sheets are
+served from the cache and a rerun costs in proportion to what changed:
+
+    cache = ResultCache("~/.cache/xlflexcomputer")
+    XlManager().readResultsFromWorkbook(path, reader, readOnly = True,
+        cache = cache)
+    bias = cache.calculate(formula, stack.observed, stack.expected)
+
+Keys are BLAKE2b digests of:
+ * for extracted matrices, the sheet's XML part in the xlsx file, the shared
+   strings its cells refer to, and the reader's layout, i.e. its class,
+   matrix positions, nucleobase type and matrix type;
+ * for formula outputs, the input arrays and the formula's class, version
+   and parameters.
+
+Entries are pickle files in the cache directory.  Reading an entry marks it
+as recently used, and once the files exceed max_bytes the least recently used
+ones are removed.  Sizes and recency are tracked in memory, so the directory
+is only scanned when a cache is opened.
+'''
+
+from collections import OrderedDict
+from hashlib import blake2b
+from xml.etree import ElementTree
+import os
+import pickle
+import posixpath
+import tempfile
+import zipfile
+
+import numpy
+
+MAX_BYTES = 256 * 1024 * 1024
+SUFFIX = ".pickle"
+
+_MAIN_NAMESPACE = \
+    "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_RELATIONSHIP_ID = "{http://schemas.openxmlformats.org/officeDocument/" \
+    "2006/relationships}id"
+_PACKAGE_RELATIONSHIP = \
+    "{http://schemas.openxmlformats.org/package/2006/relationships}" \
+    "Relationship"
+
+class ResultCache:
+
+    """Size-bounded on-disk cache of pickled results."""
+
+    def __init__(self, directory, max_bytes = MAX_BYTES):
+        """Opens or creates the cache directory.
+
+        :param directory: Directory the entries are kept in.
+        :param max_bytes: Total size of the entries above which the least
+                          recently used ones are evicted.
+        """
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok = True)
+        # Sizes of the entries from least to most recently used, and their
+        # total; the directory is only scanned here.
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(SUFFIX):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+        self.sizes = OrderedDict((path, size) for mtime, path, size
+            in sorted(entries))
+        self.total = sum(self.sizes.values())
+
+    @staticmethod
+    def makeKey(*parts):
+        """Returns the hex digest identifying a result.
+
+        :param parts: bytes, strings or reprs of what the result was
+                      computed from.
+        """
+        digest = blake2b(digest_size = 20)
+        for part in parts:
+            if not isinstance(part, bytes):
+                part = repr(part).encode("utf-8")
+            digest.update(len(part).to_bytes(8, "little"))
+            digest.update(part)
+        return digest.hexdigest()
+
+    def get(self, key, default = None):
+        """Returns the result stored under key, or default on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as handle:
+                result = pickle.load(handle)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses = self.misses + 1
+            return default
+        os.utime(path)
+        if path in self.sizes:
+            self.sizes.move_to_end(path)
+        self.hits = self.hits + 1
+        return result
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def put(self, key, result):
+        """Stores a result under key, evicting old entries if needed."""
+        path = self._path(key)
+        descriptor, temporaryPath = tempfile.mkstemp(dir = self.directory,
+            suffix = ".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as handle:
+                pickle.dump(result, handle, pickle.HIGHEST_PROTOCOL)
+            os.replace(temporaryPath, path)
+        except BaseException:
+            os.remove(temporaryPath)
+            raise
+        self.total = self.total - self.sizes.pop(path, 0)
+        self.sizes[path] = os.path.getsize(path)
+        self.total = self.total + self.sizes[path]
+        self._evict(keep = path)
+
+    def getOrCompute(self, key, compute):
+        """Returns the result under key, computing and storing it on a
+        miss.
+
+        :param compute: Function without arguments returning the result.
+        """
+        missing = object()
+        result = self.get(key, missing)
+        if result is missing:
+            result = compute()
+            self.put(key, result)
+        return result
+
+    def calculate(self, formula, observed, expected, **options):
+        """Runs Formula.calculateArray, serving repeated inputs from the
+        cache.
+
+        :param formula: Formula whose class identifies the calculation.
+        :param options: Further keyword arguments of calculateArray.
+        """
+        observed = numpy.ascontiguousarray(observed, dtype = numpy.float64)
+        expected = numpy.ascontiguousarray(expected, dtype = numpy.float64)
+        key = self.makeKey("formula", formulaIdentity(formula),
+            observed.shape, observed.tobytes(), expected.shape,
+            expected.tobytes(), sorted((name, repr(value)) for name, value
+            in options.items()))
+        return self.getOrCompute(key, lambda: formula.calculateArray(
+            observed, expected, **options))
+
+    def clear(self):
+        """Removes every entry."""
+        for path in list(self.sizes):
+            self._remove(path)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def _evict(self, keep = None):
+        """Removes the least recently used entries until the cache fits."""
+        for path in list(self.sizes):
+            if self.total <= self.max_bytes:
+                break
+            if path != keep:
+                self._remove(path)
+
+    def _remove(self, path):
+        self.total = self.total - self.sizes.pop(path, 0)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def formulaIdentity(formula):
+    """Returns what identifies a formula's calculation; see
+    :func: `Formula.cacheIdentity`."""
+    return formula.cacheIdentity()
+
+def worksheetDigests(inputFilepath):
+    """Returns a digest of the content of every worksheet of an xlsx file.
+
+    Hashes each worksheet's XML part together with the shared strings its
+    cells refer to, so a sheet's digest changes whenever any value shown
+    in it may have changed, but not when strings are added for other
+    sheets.  The workbook is not loaded.
+
+    :param inputFilepath: Path to the xlsx workbook.
+    :returns:             Dictionary of worksheet names to hex digests.
+    """
+    with zipfile.ZipFile(inputFilepath) as archive:
+        names = set(archive.namelist())
+        sharedStrings = []
+        if "xl/sharedStrings.xml" in names:
+            table = ElementTree.fromstring(
+                archive.read("xl/sharedStrings.xml"))
+            sharedStrings = [ElementTree.tostring(item) for item
+                in table.iter(_MAIN_NAMESPACE + "si")]
+        targets = dict()
+        relationships = ElementTree.fromstring(
+            archive.read("xl/_rels/workbook.xml.rels"))
+        for relationship in relationships.iter(_PACKAGE_RELATIONSHIP):
+            target = relationship.get("Target")
+            if target.startswith("/"):
+                target = target[1:]
+            else:
+                target = posixpath.normpath(posixpath.join("xl", target))
+            targets[relationship.get("Id")] = target
+
+        digests = dict()
+        workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+        for sheet in workbook.iter(_MAIN_NAMESPACE + "sheet"):
+            part = targets.get(sheet.get(_RELATIONSHIP_ID))
+            if part not in names:
+                continue
+            digests[sheet.get("name")] = _worksheetDigest(archive, part,
+                sharedStrings)
+    return digests
+
+def _worksheetDigest(archive, part, sharedStrings):
+    """Hashes a worksheet part and the shared strings it refers to."""
+    digest = blake2b(digest_size = 20)
+    parser = ElementTree.XMLPullParser(("end",))
+    indices = set()
+    with archive.open(part) as handle:
+        for block in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(block)
+            parser.feed(block)
+            for event, element in parser.read_events():
+                if element.tag != _MAIN_NAMESPACE + "c":
+                    continue
+                value = element.find(_MAIN_NAMESPACE + "v")
+                if element.get("t") == "s" and value is not None:
+                    indices.add(value.text)
+                element.clear()
+    parser.close()
+    for index in sorted(indices):
+        try:
+            string = sharedStrings[int(index)]
+        except (ValueError, IndexError):
+            string = b""
+        digest.update(index.encode("utf-8") + b"\0")
+        digest.update(len(string).to_bytes(8, "little"))
+        digest.update(string)
+    return digest.hexdigest()
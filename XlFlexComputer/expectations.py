@@ -0,0 +1,204 @@
+'''Expected Substitution Matrices from Base Composition
+
+Estimates the expected matrices at column 7 of each worksheet from the base
+composition of the sequences instead of computing them outside the toolkit:
+
+    counter = CompositionCounter()
+    with open("genomes.fasta", "rb") as handle:
+        counter.countRecords(readAlignment(handle))
+    # Spread as many substitutions as were observed, e.g. in the matrix
+    # of a SubstitutionCounter; see the alignments module.
+    total = observedMatrix.getView().sum()
+    estimator = ExpectedMatrixEstimator(NULL_MODELS["equal-input"]())
+    expectedMatrix = estimator.estimate(counter.getFrequencies(), total)
+
+Bases are counted with one lookup-table pass and one bincount per sequence,
+and sequences are read one at a time, so thousands of genomes are counted in
+the memory of the longest one.
+
+A null model gives the relative rate of each substitution from the base
+frequencies pi:
+ * uniform:     every substitution equally likely (Jukes-Cantor).
+ * equal-input: rate of i -> j proportional to pi_j (Tajima-Nei, F81).
+ * composition: rate of i -> j proportional to pi_i * pi_j, i.e. to how often
+                base i is present to change and base j is the outcome.
+
+The expected matrix spreads a total number of substitutions, usually the
+total of the observed matrix, over the off-diagonal entries by these rates.
+'''
+
+from abc import ABCMeta, abstractmethod
+
+import numpy
+
+from alignments import NucleobaseEncoder
+from structures import DNA, SubstitutionMatrix, getNucleobaseLength
+
+class CompositionCounter:
+
+    """Accumulates nucleotide counts over streamed sequences."""
+
+    def __init__(self, nucleobaseType = DNA):
+        """Starts with no bases counted.
+
+        :param nucleobaseType: Enum of type DNA/RNA.
+        """
+        self.nucleobaseType = nucleobaseType
+        self.nucleobaseLength = getNucleobaseLength(nucleobaseType)
+        self.encoder = NucleobaseEncoder(nucleobaseType)
+        self.counts = numpy.zeros(self.nucleobaseLength, dtype = numpy.int64)
+        self.sequences = 0
+
+    def countSequence(self, sequence):
+        """Counts the bases of a sequence; other characters are skipped.
+
+        :param sequence: Sequence as bytes or an ASCII string.
+        :returns:        Array of this sequence's counts per base.
+        """
+        codes = self.encoder.encode(sequence)
+        counts = numpy.bincount(codes[codes >= 0],
+            minlength = self.nucleobaseLength)
+        self.counts += counts
+        self.sequences = self.sequences + 1
+        return counts
+
+    def countRecords(self, records):
+        """Counts the bases of every record.
+
+        :param records: Iterable of (name, sequence) pairs, e.g. from
+                        readAlignment.  It is consumed one record at a
+                        time.
+        """
+        for name, sequence in records:
+            self.countSequence(sequence)
+
+    def getFrequencies(self, counts = None):
+        """Returns base frequencies summing to 1.
+
+        :param counts:      Counts per base; defaults to everything
+                            counted so far.
+        :raises ValueError: If no base was counted.
+        """
+        counts = self.counts if counts is None else counts
+        total = counts.sum()
+        if total == 0:
+            raise ValueError("No bases were counted.")
+        return counts / float(total)
+
+class NullModel:
+
+    """Provides the relative substitution rates of a null hypothesis.
+
+    Strategy for ExpectedMatrixEstimator, like Formula is for the bias
+    calculations.
+    """
+
+    __metaclass__ = ABCMeta
+
+    def rates(self, frequencies):
+        """Returns relative rates for every substitution.
+
+        :param frequencies: Array of base frequencies summing to 1.
+        :returns:           Array of shape (bases, bases) with a zero
+                            diagonal.
+        """
+        frequencies = numpy.asarray(frequencies, dtype = numpy.float64)
+        rates = numpy.array(self._rates(frequencies), dtype = numpy.float64)
+        numpy.fill_diagonal(rates, 0.0)
+        return rates
+
+    @abstractmethod
+    def _rates(self, frequencies):
+        """See :func: `rates`; the diagonal is ignored."""
+        pass
+
+class UniformNullModel(NullModel):
+
+    """Every substitution is equally likely."""
+
+    def _rates(self, frequencies):
+        return numpy.ones((len(frequencies), len(frequencies)))
+
+class EqualInputNullModel(NullModel):
+
+    """Substitutions to a base are proportional to its frequency."""
+
+    def _rates(self, frequencies):
+        return numpy.tile(frequencies, (len(frequencies), 1))
+
+class CompositionNullModel(NullModel):
+
+    """Substitutions are proportional to the frequencies of both bases."""
+
+    def _rates(self, frequencies):
+        return numpy.outer(frequencies, frequencies)
+
+NULL_MODELS = {
+    "uniform": UniformNullModel,
+    "equal-input": EqualInputNullModel,
+    "composition": CompositionNullModel,
+}
+
+class ExpectedMatrixEstimator:
+
+    """Builds expected substitution matrices under a null model."""
+
+    def __init__(self, nullModel = None, nucleobaseType = DNA,
+        matrixType = SubstitutionMatrix):
+        """Sets the null model.
+
+        :param nullModel:      NullModel instance; defaults to the equal
+                               input model.
+        :param nucleobaseType: Enum of type DNA/RNA.
+        :param matrixType:     Class of the returned matrices.
+        """
+        self.nullModel = nullModel if nullModel is not None \
+            else EqualInputNullModel()
+        self.nucleobaseType = nucleobaseType
+        self.matrixType = matrixType
+        self.invalidRecords = []
+
+    def estimate(self, frequencies, total = 1.0):
+        """Returns the expected matrix of a base composition.
+
+        :param frequencies: Array of base frequencies summing to 1.
+        :param total:       Number of substitutions spread over the
+                            matrix, e.g. the observed matrix's total.
+                            Defaults to 1, giving the expected share of
+                            each substitution.
+        :returns:           Substitution matrix whose entries sum to
+                            total.
+        """
+        rates = self.nullModel.rates(frequencies)
+        rateSum = rates.sum()
+        expected = rates * (total / rateSum) if rateSum > 0 else rates
+        matrix = self.matrixType(self.nucleobaseType)
+        for source in self.nucleobaseType:
+            for dest in self.nucleobaseType:
+                matrix.incrementSubstitution(source, dest,
+                    float(expected[source, dest]))
+        return matrix
+
+    def estimateRecords(self, records, totals = None):
+        """Yields one expected matrix per record, reading them one at a
+        time.
+
+        Records without a single base, e.g. only gaps or Ns, have no base
+        composition; they are skipped and their names listed in
+        invalidRecords, like the invalidSheets of a reader.
+
+        :param records: Iterable of (name, sequence) pairs.
+        :param totals:  Optional dictionary of record names to the number
+                        of substitutions of each; missing records get 1.
+        :returns:       Generator of (name, matrix) pairs.
+        """
+        self.invalidRecords = []
+        counter = CompositionCounter(self.nucleobaseType)
+        for name, sequence in records:
+            counts = counter.countSequence(sequence)
+            if not counts.any():
+                self.invalidRecords.append(name)
+                continue
+            frequencies = counter.getFrequencies(counts)
+            total = 1.0 if totals is None else totals.get(name, 1.0)
+            yield name, self.estimate(frequencies, total)
@@ -0,0 +1,161 @@
+'''Readers of Substitution Matrices Stored Outside Excel
+
+Upstream tools can write substitution counts as delimited text or arrays, and
+converting those to xlsx just to parse them again is slow.  The readers here
+produce the same observed/expected matrix pairs as
+ObservedExpectedMatricesReader, into the same matricesDictionary and
+invalidSheets.  Their readFile method reads one of these files, while read
+still reads a worksheet like that of any XlReader:
+
+ * CSV/TSV files laid out like a worksheet, e.g. a sheet exported as CSV:
+   DelimitedMatricesReader reads one file per subject and validates the
+   blocks exactly as the worksheet reader does.
+ * NPZ files holding a whole stack of subjects as arrays:
+       names     (N,)       subject names
+       observed  (N, 4, 4)  observed matrices
+       expected  (N, 4, 4)  expected matrices
+   writeNpz writes a SubstitutionMatrixStack in this layout.
+ * Parquet files with one row per subject: a name column and one
+   observed_<source>_<destination> and expected_<source>_<destination> column
+   per substitution, e.g. observed_A_C.  Diagonal columns such as
+   observed_A_A may be left out.  Reading them requires pyarrow, which is
+   only imported when a Parquet file is read.
+
+Array subjects are valid if every substitution is a finite number and every
+diagonal entry is 0 or NaN, checked for all subjects at once.
+'''
+
+import csv
+import os
+
+import numpy
+
+from readers import ObservedExpectedMatricesReader, WorksheetValues
+
+class DelimitedMatricesReader(ObservedExpectedMatricesReader):
+
+    """Reads the matrix blocks of CSV or TSV files."""
+
+    def readFile(self, source, title = None, delimiter = None):
+        """Validates and extracts a file's observed/expected matrices.
+
+        :param source:    Path of the CSV or TSV file.
+        :param title:     Name of the subject; defaults to the file name
+                          without its extension.
+        :param delimiter: Field delimiter; defaults to a tab for .tsv and
+                          .tab files and to a comma otherwise.
+        """
+        base, extension = os.path.splitext(os.path.basename(source))
+        if delimiter is None:
+            delimiter = "\t" if extension.lower() in (".tsv", ".tab") \
+                else ","
+        with open(source, newline = "") as handle:
+            rows = [[value if value != "" else None for value in row]
+                for row in csv.reader(handle, delimiter = delimiter)]
+        self.read(WorksheetValues.fromRows(
+            base if title is None else title, rows))
+
+class ArrayMatricesReader(ObservedExpectedMatricesReader):
+
+    """Reads stacks of matrices from NPZ or Parquet files."""
+
+    def readFile(self, source):
+        """Extracts every subject's observed/expected matrices.
+
+        :param source:      Path of an .npz or .parquet file.
+        :raises ValueError: If the file's arrays do not have the expected
+                            shapes or a Parquet column is missing.
+        """
+        if source.lower().endswith((".parquet", ".pq")):
+            names, observed, expected = self._readParquet(source)
+        else:
+            with numpy.load(source, allow_pickle = False) as arrays:
+                names = [str(name) for name in arrays["names"]]
+                observed = arrays["observed"]
+                expected = arrays["expected"]
+        self.readArrays(names, observed, expected)
+
+    def readArrays(self, names, observed, expected):
+        """Validates and extracts matrices held in arrays.
+
+        :param names:       Subject names.
+        :param observed:    Array of shape (subjects, bases, bases).
+        :param expected:    Array of the same shape.
+        :raises ValueError: If the shapes do not match the names and the
+                            nucleobase type.
+        """
+        bases = list(self.nucleobaseType)
+        shape = (len(names), len(bases), len(bases))
+        observed = numpy.asarray(observed, dtype = numpy.float64)
+        expected = numpy.asarray(expected, dtype = numpy.float64)
+        if observed.shape != shape or expected.shape != shape:
+            raise ValueError("Matrices must have the shape {0}.".format(
+                shape))
+        valid = self._validateArrays(observed) \
+            & self._validateArrays(expected)
+        for index, name in enumerate(names):
+            if valid[index]:
+                self.matricesDictionary[name] = (
+                    self._createMatrix(observed[index]),
+                    self._createMatrix(expected[index]))
+            else:
+                self.invalidSheets.append(name)
+
+    def _validateArrays(self, matrices):
+        """Returns a mask of the subjects whose matrices are valid."""
+        offDiagonal = ~numpy.eye(matrices.shape[1], dtype = bool)
+        diagonal = numpy.diagonal(matrices, axis1 = 1, axis2 = 2)
+        return numpy.isfinite(matrices[:, offDiagonal]).all(axis = 1) \
+            & ((diagonal == 0) | numpy.isnan(diagonal)).all(axis = 1)
+
+    def _createMatrix(self, values):
+        matrix = self.matrixType(self.nucleobaseType)
+        for source in self.nucleobaseType:
+            for dest in self.nucleobaseType:
+                matrix.incrementSubstitution(source, dest,
+                    float(values[source, dest]))
+        return matrix
+
+    def _readParquet(self, path):
+        """Reads the name and substitution columns of a Parquet file.
+
+        Diagonal columns are optional and read as 0 when absent.
+
+        :raises ValueError: If the name or an off-diagonal column is
+                            missing.
+        """
+        import pyarrow.parquet
+
+        bases = list(self.nucleobaseType)
+        columns = dict()
+        for prefix in ("observed", "expected"):
+            for source in bases:
+                for dest in bases:
+                    columns[prefix, source, dest] = "{0}_{1}_{2}".format(
+                        prefix, source.name, dest.name)
+        present = set(pyarrow.parquet.read_schema(path).names)
+        required = ["name"] + [column for (prefix, source, dest), column
+            in columns.items() if source != dest]
+        missing = [column for column in required if column not in present]
+        if missing:
+            raise ValueError("Parquet file is missing the columns: "
+                + ", ".join(missing))
+
+        table = pyarrow.parquet.read_table(path, columns = ["name"]
+            + [column for column in columns.values() if column in present])
+        names = [str(name) for name in table.column("name").to_pylist()]
+        arrays = dict()
+        for prefix in ("observed", "expected"):
+            arrays[prefix] = numpy.zeros((len(names), len(bases),
+                len(bases)))
+        for (prefix, source, dest), column in columns.items():
+            if column in present:
+                arrays[prefix][:, source, dest] = table.column(column) \
+                    .to_numpy(zero_copy_only = False)
+        return names, arrays["observed"], arrays["expected"]
+
+def writeNpz(path, stack):
+    """Writes a SubstitutionMatrixStack in the layout ArrayMatricesReader
+    reads.  Invalid subjects are written with their NaN matrices."""
+    numpy.savez(path, names = numpy.array(stack.names, dtype = str),
+        observed = stack.observed, expected = stack.expected)
@@ -0,0 +1,107 @@
+'''Memory Footprint of Substitution Matrices
+
+Measures the bytes each substitution matrix representation takes when many of
+them are held at once:
+
+    python footprints.py --count 100000
+
+ * list:    Nested lists of Python floats with a per-instance __dict__, the
+            way SubstitutionMatrix used to store its entries.
+ * numpy:   SubstitutionMatrix, backed by a NumPy array.
+ * compact: CompactSubstitutionMatrix, a __slots__ instance holding only
+            the off-diagonal entries as C doubles in a bytearray.
+ * stack:   One row of a SubstitutionMatrixStack's observed array.
+
+Allocations are traced with tracemalloc, so the figures include every object
+and buffer a matrix owns but not the shared enum or class objects.
+'''
+
+from argparse import ArgumentParser
+import tracemalloc
+
+import numpy
+
+from structures import DNA, CompactSubstitutionMatrix, SubstitutionMatrix
+
+REPRESENTATIONS = ("list", "numpy", "compact", "stack")
+
+class ListSubstitutionMatrix:
+
+    """Nested list representation the footprints are compared against."""
+
+    def __init__(self, nucleobaseType):
+        self.nucleobaseType = nucleobaseType
+        self.nucleobaseLength = len(list(nucleobaseType))
+        self.substitutionMatrix = \
+            [[0 for x in range(self.nucleobaseLength)] \
+            for x in range(self.nucleobaseLength)]
+
+    def incrementSubstitution(self, sourceBase, destinationBase, amount):
+        if sourceBase != destinationBase:
+            self.substitutionMatrix[sourceBase][destinationBase] = amount
+
+def createMatrices(representation, count, nucleobaseType = DNA):
+    """Creates count filled matrices of a representation.
+
+    Every substitution gets a distinct float so that no value is shared
+    between matrices.
+    """
+    if representation == "stack":
+        length = len(list(nucleobaseType))
+        stack = numpy.zeros((count, length, length))
+        for index in range(count):
+            for source in nucleobaseType:
+                for dest in nucleobaseType:
+                    if source != dest:
+                        stack[index, source, dest] = index + 0.5
+        return stack
+    matrixType = {"list": ListSubstitutionMatrix,
+        "numpy": SubstitutionMatrix,
+        "compact": CompactSubstitutionMatrix}[representation]
+    matrices = []
+    for index in range(count):
+        matrix = matrixType(nucleobaseType)
+        for source in nucleobaseType:
+            for dest in nucleobaseType:
+                matrix.incrementSubstitution(source, dest,
+                    float(index) + 0.5)
+        matrices.append(matrix)
+    return matrices
+
+def measureFootprint(representation, count = 10000):
+    """Returns the bytes allocated per matrix of a representation."""
+    # Warm up caches such as the nucleobase lengths outside the trace.
+    createMatrices(representation, 1)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        matrices = createMatrices(representation, count)
+        allocated = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del matrices
+    return allocated / count
+
+def main(argv = None):
+    parser = ArgumentParser(description = "Measures the memory per "
+        "substitution matrix of each representation.")
+    parser.add_argument("--count", type = int, default = 10000,
+        help = "Matrices held at once per representation.")
+    parser.add_argument("--representation", choices = REPRESENTATIONS,
+        action = "append", help = "Representation to measure; defaults to "
+        "all of them.")
+    args = parser.parse_args(argv)
+
+    footprints = [(representation, measureFootprint(representation,
+        args.count)) for representation in args.representation
+        or REPRESENTATIONS]
+    baseline = footprints[0][1]
+    print("{0:<10}{1:>16}{2:>10}".format("Matrix", "Bytes/matrix",
+        "Ratio"))
+    for representation, footprint in footprints:
+        print("{0:<10}{1:>16.1f}{2:>10.2f}".format(representation,
+            footprint, footprint / baseline))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,5 +1,6 @@
 from abc import ABCMeta
 from abc import abstractmethod
+import numpy
 
 class Formula:
     
@@ -13,6 +14,19 @@ class Formula:
 
     __metaclass__ = ABCMeta
 
+    # Bumped whenever a formula's calculation changes, so results cached
+    # for the old calculation are not served; see the caches module.
+    version = 1
+
+    def cacheIdentity(self):
+        """Returns what determines the formula's results: its qualified
+        class name, version and parameters, i.e. its instance
+        attributes."""
+        formulaType = type(self)
+        return (formulaType.__module__ + "." + formulaType.__qualname__,
+            self.version, sorted((name, repr(value)) for name, value
+            in vars(self).items()))
+
     def __validate(self, input):
         """Validates the input is not None and can be converted to long.
 
@@ -64,9 +78,65 @@ class Formula:
                 float(expected))
         return result
 
+    def __toFloatArray(self, values):
+        """Converts values to a float array, invalid values becoming NaN.
+
+        Numeric input is converted in a single pass; only input holding
+        strings or None is converted value by value.
+
+        :param values: Array-like of numbers, numeric strings, None or
+                       other values.
+        :returns:      float64 array of the same shape.
+        """
+        try:
+            return numpy.asarray(values, dtype = numpy.float64)
+        except (TypeError, ValueError):
+            pass
+        values = numpy.asarray(values, dtype = object)
+        result = numpy.full(values.shape, numpy.nan)
+        for index, value in numpy.ndenumerate(values):
+            if self.__validate(value):
+                result[index] = float(value)
+        return result
+
+    def calculateArray(self, observed, expected, where = None,
+        invalid = numpy.nan):
+        """Applies the formula to whole arrays of values at once.
+
+        Performs the same validation as :func: `calculate` as masks:
+        cells whose observed or expected value is missing or not a number,
+        or whose expected value is 0, are set to the invalid value instead
+        of being calculated.
+
+        :param observed: Array-like of observed nucleotide substitutions,
+                         e.g. the observed array of a
+                         SubstitutionMatrixStack.
+        :param expected: Array-like of expected nucleotide substitutions
+                         broadcastable against observed.
+        :param where:    Optional boolean array broadcastable against
+                         observed; cells where it is False are invalid,
+                         e.g. the diagonal or masked out subjects.
+        :param invalid:  Value of the invalid cells.
+        :returns:        float64 array of the results.
+        """
+        observed, expected = numpy.broadcast_arrays(
+            self.__toFloatArray(observed), self.__toFloatArray(expected))
+        valid = ~numpy.isnan(observed) & ~numpy.isnan(expected) \
+            & (expected != 0)
+        if where is not None:
+            valid = valid & numpy.broadcast_to(where, valid.shape)
+        result = numpy.full(valid.shape, invalid, dtype = numpy.float64)
+        result[valid] = self._calculation(observed[valid],
+            expected[valid])
+        return result
+
     @abstractmethod
     def _calculation(self, observed, expected):
-        """See :func: `calculate`"""
+        """See :func: `calculate`
+
+        Must work elementwise on floats as well as on float arrays, as
+        :func: `calculateArray` passes the valid cells as arrays.
+        """
         pass
 
 class NormalizedSubstitutionBiasFormula(Formula):
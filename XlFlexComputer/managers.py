@@ -1,6 +1,10 @@
+from multiprocessing import Pool
 from openpyxl import load_workbook, Workbook
+from caches import ResultCache, worksheetDigests
 from structures import SubstitutionMatrix, DNA
-from readers import ObservedExpectedMatricesReader
+from readers import ObservedExpectedMatricesReader, WorksheetValues
+
+_MISSING = object()
 
 class XlManager:
     """Manages all conversions of Excel data to necessary structures.
@@ -9,7 +13,12 @@ class XlManager:
     a dictionary of values to an Excel sheet.
     """
 
-    def readResultsFromWorkbook(self, inputFilepath, reader):
+    # Batches of worksheets per process, to even out uneven sheets.
+    batchesPerProcess = 4
+
+    def readResultsFromWorkbook(self, inputFilepath, reader,
+        readOnly = False, valuesOnly = False, dataOnly = False,
+        processes = 1, cache = None):
         """Retrieves a dictionary of valid observed/expected matrices.
 
         Uses the name of the worksheet as the key, if the sheet has both
@@ -21,13 +30,127 @@ class XlManager:
         Retrieve the results of this process via the reader's instance
         variables.  An agent is normally using this class so the agent
         will know which field to call on when this is done processing.
+
+        By default the whole workbook is loaded with every cell of every
+        sheet.  For large workbooks, readOnly streams each sheet from the
+        file as it is read instead, so memory stays about that of one
+        sheet.
+
+        :param readOnly:   Loads the workbook in read-only mode.
+        :param valuesOnly: Hands the reader a WorksheetValues grid of the
+                           values in its window instead of the worksheet,
+                           so a read-only sheet is streamed once rather
+                           than scanned for every cell.  The reader must
+                           implement getWindow.
+        :param dataOnly:   Reads the cached results of formulas instead
+                           of the formulas.
+        :param processes:  Processes reading worksheets in parallel.  Each
+                           opens the workbook read-only and reads a batch
+                           of consecutive worksheets with its own copy of
+                           the reader; the copies are merged back in
+                           worksheet order, so the results are the same as
+                           a serial read.  The reader must implement
+                           copyEmpty and merge.
+        :param cache:      Optional ResultCache.  Worksheets whose content
+                           was read before with the same reader layout are
+                           served from it instead of being read; combine
+                           with readOnly so they are not loaded either.
+                           The reader must implement cacheIdentity,
+                           getResult and restoreResult.
+        """
+        if inputFilepath != None and processes > 1:
+            self._readInParallel(inputFilepath, reader, valuesOnly,
+                dataOnly, processes, cache)
+        elif inputFilepath != None:
+            keys = self._worksheetKeys(inputFilepath, reader, dataOnly,
+                cache)
+            options = dict()
+            if readOnly:
+                options["read_only"] = True
+            if dataOnly:
+                options["data_only"] = True
+            workbook = load_workbook(inputFilepath, **options)
+            try:
+                for name in workbook.sheetnames:
+                    result = _MISSING
+                    if name in keys:
+                        result = cache.get(keys[name], _MISSING)
+                    if result is not _MISSING:
+                        reader.restoreResult(name, result)
+                        continue
+                    worksheet = workbook[name]
+                    if valuesOnly:
+                        worksheet = WorksheetValues(worksheet,
+                            *reader.getWindow())
+                    reader.read(worksheet)
+                    if name in keys:
+                        cache.put(keys[name], reader.getResult(name))
+            finally:
+                if readOnly:
+                    workbook.close()
+
+    def _readInParallel(self, inputFilepath, reader, valuesOnly, dataOnly,
+        processes, cache):
+        """Reads batches of worksheets in a process pool and merges them
+        into the reader in worksheet order.
+
+        With a cache, only the worksheets missing from it are read, and
+        the results are restored one worksheet at a time so cached and
+        newly read worksheets keep their order.
         """
-        if inputFilepath != None:
-            workbook = load_workbook(inputFilepath)
-            wsNames = workbook.get_sheet_names()
-            for name in wsNames:
-                worksheet = workbook.get_sheet_by_name(name)
-                reader.read(worksheet)
+        workbook = load_workbook(inputFilepath, read_only = True)
+        try:
+            wsNames = workbook.sheetnames
+        finally:
+            workbook.close()
+        keys = self._worksheetKeys(inputFilepath, reader, dataOnly, cache)
+        cached = dict()
+        for name, key in keys.items():
+            result = cache.get(key, _MISSING)
+            if result is not _MISSING:
+                cached[name] = result
+        missingNames = [name for name in wsNames if name not in cached]
+
+        tasks = []
+        batchReaders = []
+        if missingNames:
+            batchCount = max(1, min(len(missingNames),
+                processes * self.batchesPerProcess))
+            batchSize = -(-len(missingNames) // batchCount)
+            tasks = [(inputFilepath, missingNames[start:start + batchSize],
+                reader.copyEmpty(), valuesOnly, dataOnly)
+                for start in range(0, len(missingNames), batchSize)]
+            with Pool(processes) as pool:
+                for batchReader in pool.imap(_readWorksheets, tasks):
+                    if cache is None:
+                        reader.merge(batchReader)
+                    else:
+                        batchReaders.append(batchReader)
+        if cache is None:
+            return
+
+        owners = dict()
+        for task, batchReader in zip(tasks, batchReaders):
+            for name in task[1]:
+                owners[name] = batchReader
+        for name in wsNames:
+            if name in cached:
+                reader.restoreResult(name, cached[name])
+            else:
+                result = owners[name].getResult(name)
+                reader.restoreResult(name, result)
+                if name in keys:
+                    cache.put(keys[name], result)
+
+    def _worksheetKeys(self, inputFilepath, reader, dataOnly, cache):
+        """Returns the cache key of every worksheet; empty without a
+        cache."""
+        if cache is None:
+            return dict()
+        identity = (reader.cacheIdentity(), dataOnly)
+        return dict((name, ResultCache.makeKey("worksheet", digest,
+            identity)) for name, digest
+            in worksheetDigests(inputFilepath).items())
 
     def writeResultsToWorkbook(self, outputFilepath, writer):
         """Creates a workbook to write results to.
@@ -41,3 +164,23 @@ class XlManager:
         """
         workbook = Workbook()
         writer.write(workbook)
+
+def _readWorksheets(task):
+    """Reads a batch of worksheets in a worker process.
+
+    :param task: Tuple of the workbook path, the worksheet names, the
+                 empty reader and the valuesOnly and dataOnly options.
+    :returns:    The reader holding the batch's results.
+    """
+    inputFilepath, wsNames, reader, valuesOnly, dataOnly = task
+    workbook = load_workbook(inputFilepath, read_only = True,
+        data_only = dataOnly)
+    try:
+        for name in wsNames:
+            worksheet = workbook[name]
+            if valuesOnly:
+                worksheet = WorksheetValues(worksheet, *reader.getWindow())
+            reader.read(worksheet)
+    finally:
+        workbook.close()
+    return reader
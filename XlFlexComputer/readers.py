@@ -1,5 +1,7 @@
 from abc import ABCMeta, abstractmethod
-from structures import SubstitutionMatrix, DNA
+import copy
+from structures import SubstitutionMatrix, SubstitutionMatrixStack, DNA, \
+    getNucleobaseLength
 
 class XlReader:
     """Behaves as a custom targeter of raw data in the Excel sheet.
@@ -20,6 +22,176 @@ class XlReader:
         """
         pass
 
+    def copyEmpty(self):
+        """Returns a reader of the same configuration without results.
+
+        Needed to read worksheets in parallel; each worker reads with
+        its own copy.
+        """
+        raise NotImplementedError("{0} cannot read in parallel.".format(
+            type(self).__name__))
+
+    def merge(self, other):
+        """Appends the results of a copy from copyEmpty to this reader.
+
+        Needed to read worksheets in parallel.
+        """
+        raise NotImplementedError("{0} cannot read in parallel.".format(
+            type(self).__name__))
+
+    def cacheIdentity(self):
+        """Returns what, besides the worksheet's content, determines the
+        results, e.g. where the reader looks in the worksheet.
+
+        Needed to cache results; see the caches module.
+        """
+        raise NotImplementedError("{0} cannot be cached.".format(
+            type(self).__name__))
+
+    def getResult(self, name):
+        """Returns the picklable result read from a worksheet.
+
+        Needed to cache results.
+        """
+        raise NotImplementedError("{0} cannot be cached.".format(
+            type(self).__name__))
+
+    def restoreResult(self, name, result):
+        """Records a result from getResult as if the worksheet had been
+        read.
+
+        Needed to cache results.
+        """
+        raise NotImplementedError("{0} cannot be cached.".format(
+            type(self).__name__))
+
+    def getWindow(self):
+        """Returns the first and last row and the first and last column,
+        counted from 1, of the rectangle read from every worksheet.
+
+        Needed to read values only; see WorksheetValues.
+        """
+        raise NotImplementedError("{0} cannot read values only.".format(
+            type(self).__name__))
+
+class WorksheetCell:
+
+    """Cell of a WorksheetValues grid; holds only its value."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+class WorksheetValues:
+
+    """Values of the rectangle of a worksheet a reader reads, read in a
+    single pass.
+
+    Offers the title, cell and iter_rows parts of the worksheet interface
+    that readers use, without a cell object per entry.  Only the
+    reader's window is held, so memory does not grow with the sheet.
+    """
+
+    def __init__(self, worksheet, minRow, maxRow, minCol, maxCol):
+        """Reads the values of a rectangle of the worksheet, e.g. the
+        window of XlReader.getWindow.
+
+        :param worksheet: Worksheet, possibly a read-only one.
+        :param minRow:    First row of the rectangle, counted from 1.
+        :param maxRow:    Last row of the rectangle.
+        :param minCol:    First column of the rectangle, counted from 1.
+        :param maxCol:    Last column of the rectangle.
+        """
+        self._setRows(worksheet.title, worksheet.iter_rows(
+            min_row = minRow, max_row = maxRow, min_col = minCol,
+            max_col = maxCol, values_only = True), minRow, minCol)
+
+    @classmethod
+    def fromRows(cls, title, rows):
+        """Wraps rows of values that were not read from a worksheet,
+        e.g. the rows of a CSV file.
+
+        :param title: Title the grid is known by, like a worksheet's.
+        :param rows:  Iterable of sequences of values starting at the
+                      first row and column; blanks are None.
+        """
+        grid = cls.__new__(cls)
+        grid._setRows(title, rows, 1, 1)
+        return grid
+
+    def cell(self, row, column):
+        """Returns the cell at 1-based row and column indices."""
+        return WorksheetCell(self._value(row, column))
+
+    def iter_rows(self, min_row = 1, max_row = None, min_col = 1,
+        max_col = None, values_only = False):
+        """Yields rows of the rectangle like Worksheet.iter_rows does.
+
+        Entries outside the values read are None.
+        """
+        max_row = self.max_row if max_row is None else max_row
+        max_col = self.max_column if max_col is None else max_col
+        for row in range(min_row, max_row + 1):
+            values = tuple(self._value(row, column)
+                for column in range(min_col, max_col + 1))
+            yield values if values_only \
+                else tuple(WorksheetCell(value) for value in values)
+
+    def _setRows(self, title, rows, minRow, minCol):
+        self.title = title
+        self.minRow = minRow
+        self.minCol = minCol
+        self.rows = [tuple(row) for row in rows]
+        self.max_row = minRow + len(self.rows) - 1
+        self.max_column = minCol - 1 \
+            + max([len(row) for row in self.rows] or [0])
+
+    def _value(self, row, column):
+        ri = row - self.minRow
+        ci = column - self.minCol
+        if ri < 0 or ci < 0 or ri >= len(self.rows):
+            return None
+        values = self.rows[ri]
+        return values[ci] if ci < len(values) else None
+
+class WorksheetBlock:
+
+    """Values of a rectangle of a worksheet, read in a single call.
+
+    Readers validate and extract from the block instead of looking up
+    each cell in the worksheet, which for read-only worksheets means
+    scanning the sheet again for every cell.
+    """
+
+    def __init__(self, worksheet, minRow, maxRow, minCol, maxCol):
+        """Reads the rectangle's values with one iter_rows call.
+
+        :param worksheet: Worksheet, read-only worksheet or
+                          WorksheetValues to read from.
+        :param minRow:    First row of the rectangle, counted from 1.
+        :param maxRow:    Last row of the rectangle.
+        :param minCol:    First column of the rectangle, counted from 1.
+        :param maxCol:    Last column of the rectangle.
+        """
+        self.minRow = minRow
+        self.minCol = minCol
+        self.rows = [tuple(row) for row in worksheet.iter_rows(
+            min_row = minRow, max_row = maxRow, min_col = minCol,
+            max_col = maxCol, values_only = True)]
+
+    def cell(self, row, column):
+        """Returns the value at worksheet row and column indices.
+
+        Values outside the rectangle are None.
+        """
+        ri = row - self.minRow
+        ci = column - self.minCol
+        if ri < 0 or ci < 0 or ri >= len(self.rows) \
+            or ci >= len(self.rows[ri]):
+            return None
+        return self.rows[ri][ci]
+
 class ObservedExpectedMatricesReader(XlReader):
 
     """Extracts pair of observed & expected substitution matrices."""
@@ -28,7 +200,14 @@ class ObservedExpectedMatricesReader(XlReader):
         omStartingRi = 18,
         omStartingCi = 1, # Worksheets start from 1.
         emStartingRi = 18,
-        emStartingCi = 7):
+        emStartingCi = 7,
+        matrixType = SubstitutionMatrix):
+        """Sets where the matrices start in each worksheet.
+
+        :param matrixType: Class the matrices are read into, e.g.
+                           CompactSubstitutionMatrix to hold very many
+                           of them.
+        """
         self.matricesDictionary = dict()
         self.invalidSheets = []
         self.nucleobaseType = nucleobaseType
@@ -36,6 +215,7 @@ class ObservedExpectedMatricesReader(XlReader):
         self.omStartingCi = omStartingCi
         self.emStartingRi = emStartingRi
         self.emStartingCi = emStartingCi
+        self.matrixType = matrixType
 
     def read(self, worksheet):
         """Validates and extracts worksheet's observed/expected matrices.
@@ -60,6 +240,10 @@ class ObservedExpectedMatricesReader(XlReader):
          * Hyphens indicate '-', characters, or blanks.
          * N indicates numeral, numeric strings, or blanks.
 
+        The rectangle covering both matrices is read into a
+        WorksheetBlock in one pass and everything is validated and
+        extracted from it.
+
         :param worksheet: Active worksheet object.
         :returns:         If worksheet contains valid observed and
                           expected matrices, then it will return a tuple
@@ -71,13 +255,78 @@ class ObservedExpectedMatricesReader(XlReader):
         omStartingCi = self.omStartingCi
         emStartingRi = self.emStartingRi
         emStartingCi = self.emStartingCi
-        if self._validateHeaders(omStartingRi, omStartingCi, worksheet) \
-            and self._validateHeaders(self.emStartingRi,
-            self.emStartingCi, worksheet):
-            result = self._readAndValidateSubstitutionValues(worksheet)
+        block = self._readBlock(worksheet)
+        if self._validateHeaders(omStartingRi, omStartingCi, block) \
+            and self._validateHeaders(emStartingRi, emStartingCi, block):
+            result = self._readAndValidateWorksheet(block)
 
         if result is not None:
             self.matricesDictionary[worksheet.title] = result
+        else:
+            self.invalidSheets.append(worksheet.title)
+
+    def copyEmpty(self):
+        """See :func: `XlReader.copyEmpty`"""
+        reader = copy.copy(self)
+        reader.matricesDictionary = dict()
+        reader.invalidSheets = []
+        return reader
+
+    def merge(self, other):
+        """See :func: `XlReader.merge`"""
+        self.matricesDictionary.update(other.matricesDictionary)
+        self.invalidSheets.extend(other.invalidSheets)
+
+    def cacheIdentity(self):
+        """See :func: `XlReader.cacheIdentity`"""
+        return (type(self).__qualname__, self.nucleobaseType.__name__,
+            tuple(self.nucleobaseType.__members__), self.omStartingRi,
+            self.omStartingCi, self.emStartingRi, self.emStartingCi,
+            self.matrixType.__qualname__)
+
+    def getResult(self, name):
+        """See :func: `XlReader.getResult`
+
+        :returns: Tuple of the observed and expected matrices, or None
+                  if the worksheet was invalid.
+        """
+        return self.matricesDictionary.get(name)
+
+    def restoreResult(self, name, result):
+        """See :func: `XlReader.restoreResult`"""
+        if result is not None:
+            self.matricesDictionary[name] = result
+        else:
+            self.invalidSheets.append(name)
+
+    def getStack(self):
+        """Stacks every matrix pair read so far.
+
+        :returns: SubstitutionMatrixStack of the valid worksheets'
+                  matrices, with the invalid worksheets masked out.
+        """
+        return SubstitutionMatrixStack.fromMatrices(
+            self.matricesDictionary, self.invalidSheets,
+            self.nucleobaseType)
+
+    def getWindow(self):
+        """See :func: `XlReader.getWindow`
+
+        :returns: Bounds of the rectangle covering both matrices and
+                  their headers.
+        """
+        length = getNucleobaseLength(self.nucleobaseType)
+        return (min(self.omStartingRi, self.emStartingRi),
+            max(self.omStartingRi, self.emStartingRi) + length,
+            min(self.omStartingCi, self.emStartingCi),
+            max(self.omStartingCi, self.emStartingCi) + length)
+
+    def _readBlock(self, worksheet):
+        """Reads the rectangle covering both matrices and their headers.
+
+        :returns: WorksheetBlock of the rectangle.
+        """
+        return WorksheetBlock(worksheet, *self.getWindow())
 
     def _validateHeaders(self, startRowIndex, startColIndex, worksheet):
         """Validates the row and column headers.
@@ -94,6 +343,9 @@ class ObservedExpectedMatricesReader(XlReader):
                 column = startColIndex)
             currColValue = worksheet.cell(row = startRowIndex,
                 column = startColIndex + index)
+            # Blank cells read as None.
+            currRowValue = " " if currRowValue is None else currRowValue
+            currColValue = " " if currColValue is None else currColValue
 
             if currRowValue == currColValue \
                 and currRowValue in headerValues:
@@ -142,33 +394,38 @@ class ObservedExpectedMatricesReader(XlReader):
         """
 
         nucleobaseType = self.nucleobaseType
-        result = SubstitutionMatrix(nucleobaseType)
+        result = self.matrixType(nucleobaseType)
         for ri, source in enumerate(nucleobaseType):
             for ci, dest in enumerate(nucleobaseType):
                 amount = worksheet.cell(row = startingRowIndex + ri + 1,
                     column = startingColIndex + ci + 1)
                 try:
-                    if ri == ci and \
-                        self._convertToFloat(amount) != 0.0:
-                        result = None
-                        break
-                    result.incrementSubstitution(source, dest,
-                        self._convertToFloat(amount))
+                    amount = self._convertToFloat(amount)
                 except ValueError:
-                    result = None
-                    break
+                    if ri == ci:
+                        # Hyphens or other characters on the diagonal.
+                        continue
+                    return None
+                if ri == ci and amount != 0.0:
+                    return None
+                result.incrementSubstitution(source, dest, amount)
 
         return result
 
     def _convertToFloat(self, target):
         """Tries to convert the target to a float.
 
-        Failure to convert it will result in a 0.0 value.
+        Blank cells result in a 0.0 value.
+
+        :raises ValueError: If the target is not blank and cannot be
+                            converted.
         """
         result = 0.0
+        if target is None or target == "":
+            return result
         try:
             result = float(target)
-        except ValueError:
+        except (TypeError, ValueError):
             raise ValueError()
 
         return result
@@ -1,5 +1,7 @@
 from enum import IntEnum
 from enum import unique
+from struct import pack_into
+import numpy
 
 @unique
 class DNA(IntEnum):
@@ -11,24 +13,43 @@ class DNA(IntEnum):
     G = 2
     T = 3
 
+_nucleobaseLengths = dict()
+
+def getNucleobaseLength(nucleobaseType):
+    """Returns the number of bases of a nucleobase type.
+
+    Counted once per type and cached, instead of once per matrix.
+
+    :param nucleobaseType: Enum of type DNA/RNA.
+    """
+    length = _nucleobaseLengths.get(nucleobaseType)
+    if length is None:
+        length = len(list(nucleobaseType))
+        _nucleobaseLengths[nucleobaseType] = length
+    return length
+
 class SubstitutionMatrix:
 
     """Represents a nucleotide substitution matrix for DNA or RNA bases. 
     
     Primarily imposes the following rule that a nucleotide cannot
     have a substitution rate higher than 0 with itself.  
+
+    Entries are stored in a contiguous float64 array so that readers can
+    be handed read-only views of it instead of copies.
     """
 
+    __slots__ = ("nucleobaseType", "nucleobaseLength", "substitutionMatrix")
+
     def __init__(self, nucleobaseType):
         """Specifies the nucleotide bases the matrix represents: DNA/RNA.
 
         :param nucleobase: Enum of type DNA/RNA.
         """
         self.nucleobaseType = nucleobaseType
-        self.nucleobaseLength = len(list(nucleobaseType))
-        self.substitutionMatrix = \
-            [[0 for x in range(self.nucleobaseLength)] \
-            for x in range(self.nucleobaseLength)]
+        self.nucleobaseLength = getNucleobaseLength(nucleobaseType)
+        self.substitutionMatrix = numpy.zeros((self.nucleobaseLength,
+            self.nucleobaseLength), dtype = numpy.float64)
 
     def incrementSubstitution(self, sourceBase, destinationBase, amount):
         """Increments the entry at position source and destination by
@@ -43,18 +64,199 @@ class SubstitutionMatrix:
         :param amount:          Amount to increment the entry by.
         """
         if sourceBase != destinationBase:
-            self.substitutionMatrix[sourceBase] \
-                [destinationBase] = amount
+            self.substitutionMatrix[sourceBase, destinationBase] = amount
+
+    def getView(self):
+        """Returns a read-only view of the substitution matrix.
+
+        The view shares memory with the matrix, so later substitutions
+        show through it, but it cannot be written to.
+
+        :returns: Read-only float64 array of shape (bases, bases).
+        """
+        view = self.substitutionMatrix.view()
+        view.flags.writeable = False
+        return view
 
     def getCopy(self):
         """Returns a defensive copy of the substitution matrix.
         
-        :returns: Defensive copy of the substitution matrix.
-        """
-        defensiveCopy = []
-        for source in self.substitutionMatrix:
-            defensiveSource = []
-            for destination in source:
-                defensiveSource.append(destination)
-            defensiveCopy.append(defensiveSource)
-        return defensiveCopy
+        :returns: Defensive copy of the substitution matrix as a list of
+                  rows.
+        """
+        return self.substitutionMatrix.tolist()
+
+class CompactSubstitutionMatrix:
+
+    """Substitution matrix with the smallest memory footprint.
+
+    Meant for holding very many matrices at once.  Since the diagonal is
+    always 0, only the off-diagonal entries are kept, as C doubles in a
+    bytearray, and instances have no __dict__: a DNA matrix costs a small
+    object and a 96-byte buffer instead of the NumPy array of 16 entries
+    SubstitutionMatrix holds.  It has the same interface as
+    SubstitutionMatrix, except that views are read-only copies.
+    """
+
+    __slots__ = ("nucleobaseType", "values")
+
+    def __init__(self, nucleobaseType):
+        """Specifies the nucleotide bases the matrix represents: DNA/RNA.
+
+        :param nucleobase: Enum of type DNA/RNA.
+        """
+        length = getNucleobaseLength(nucleobaseType)
+        self.nucleobaseType = nucleobaseType
+        self.values = bytearray(8 * length * (length - 1))
+
+    @property
+    def nucleobaseLength(self):
+        return getNucleobaseLength(self.nucleobaseType)
+
+    def incrementSubstitution(self, sourceBase, destinationBase, amount):
+        """See :func: `SubstitutionMatrix.incrementSubstitution`"""
+        if sourceBase != destinationBase:
+            # Entries are stored row by row without the diagonal.
+            index = sourceBase * (self.nucleobaseLength - 1) \
+                + destinationBase - (destinationBase > sourceBase)
+            pack_into("d", self.values, 8 * index, amount)
+
+    def getView(self):
+        """Returns a read-only copy of the substitution matrix.
+
+        Unlike the view of a SubstitutionMatrix it does not share memory
+        with the matrix, which holds no diagonal.
+
+        :returns: Read-only float64 array of shape (bases, bases).
+        """
+        length = self.nucleobaseLength
+        view = numpy.zeros((length, length))
+        view[~numpy.eye(length, dtype = bool)] = numpy.frombuffer(
+            self.values, dtype = numpy.float64)
+        view.flags.writeable = False
+        return view
+
+    def getCopy(self):
+        """Returns a defensive copy of the substitution matrix.
+
+        :returns: Defensive copy of the substitution matrix as a list of
+                  rows.
+        """
+        return self.getView().tolist()
+
+class SubstitutionMatrixStack:
+
+    """Holds the observed and expected matrices of many subjects.
+
+    The matrices are stacked into two float64 arrays of shape
+    (subjects, bases, bases) so that computations over every subject run
+    as single array operations.  Subjects are indexed by name, e.g. the
+    title of the worksheet they were read from, and a validity mask marks
+    the subjects whose matrices could be read.  The matrices of invalid
+    subjects are filled with NaN.
+    """
+
+    def __init__(self, names, observed, expected, valid = None,
+        nucleobaseType = DNA):
+        """Wraps already stacked matrices.
+
+        :param names:          Subject names, one per matrix.
+        :param observed:       Array of shape (subjects, bases, bases) of
+                               observed substitutions.
+        :param expected:       Array of the same shape of expected
+                               substitutions.
+        :param valid:          Optional boolean array with one entry per
+                               subject.  Defaults to every subject valid.
+        :param nucleobaseType: Enum of type DNA/RNA.
+        :raises ValueError:    If the names, arrays and mask do not agree
+                               in size or a name is repeated.
+        """
+        self.nucleobaseType = nucleobaseType
+        self.nucleobaseLength = getNucleobaseLength(nucleobaseType)
+        self.names = list(names)
+        self.nameIndex = dict((name, index) for index, name
+            in enumerate(self.names))
+        shape = (len(self.names), self.nucleobaseLength,
+            self.nucleobaseLength)
+        self.observed = numpy.ascontiguousarray(observed,
+            dtype = numpy.float64)
+        self.expected = numpy.ascontiguousarray(expected,
+            dtype = numpy.float64)
+        if valid is None:
+            valid = numpy.ones(len(self.names), dtype = bool)
+        self.valid = numpy.asarray(valid, dtype = bool)
+        if len(self.nameIndex) != len(self.names):
+            raise ValueError("Subject names must be unique.")
+        if self.observed.shape != shape or self.expected.shape != shape \
+            or self.valid.shape != shape[:1]:
+            raise ValueError("Matrices must have the shape {0} and the "
+                "mask one entry per subject.".format(shape))
+
+    @classmethod
+    def fromMatrices(cls, matricesDictionary, invalidNames = (),
+        nucleobaseType = DNA):
+        """Stacks the matrix pairs collected by a reader.
+
+        :param matricesDictionary: Dictionary of subject names to tuples
+                                   of the observed and expected
+                                   SubstitutionMatrix, e.g. the
+                                   matricesDictionary of an
+                                   ObservedExpectedMatricesReader.
+        :param invalidNames:       Names of subjects without valid
+                                   matrices; they are stacked as NaN and
+                                   masked as invalid.
+        :param nucleobaseType:     Enum of type DNA/RNA.
+        :returns:                  SubstitutionMatrixStack of the valid
+                                   subjects followed by the invalid ones.
+        """
+        invalidNames = [name for name in invalidNames
+            if name not in matricesDictionary]
+        names = list(matricesDictionary.keys()) + invalidNames
+        length = getNucleobaseLength(nucleobaseType)
+        shape = (len(names), length, length)
+        observed = numpy.full(shape, numpy.nan)
+        expected = numpy.full(shape, numpy.nan)
+        valid = numpy.zeros(len(names), dtype = bool)
+        for index, name in enumerate(matricesDictionary.keys()):
+            observedMatrix, expectedMatrix = matricesDictionary[name]
+            observed[index] = observedMatrix.getView()
+            expected[index] = expectedMatrix.getView()
+            valid[index] = True
+        return cls(names, observed, expected, valid, nucleobaseType)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.nameIndex
+
+    def indexOf(self, name):
+        """Returns the position of a subject in the stack.
+
+        :raises KeyError: If there is no subject of that name.
+        """
+        return self.nameIndex[name]
+
+    def getViews(self, name):
+        """Returns read-only views of a subject's matrices.
+
+        :param name: Name of the subject.
+        :returns:    Tuple of the observed and expected matrices as
+                     read-only arrays of shape (bases, bases).
+        """
+        index = self.nameIndex[name]
+        observedView = self.observed[index]
+        expectedView = self.expected[index]
+        observedView.flags.writeable = False
+        expectedView.flags.writeable = False
+        return observedView, expectedView
+
+    def getValidNames(self):
+        """Returns the names of the valid subjects in stack order."""
+        return [name for name, valid in zip(self.names, self.valid)
+            if valid]
+
+    def offDiagonalMask(self):
+        """Returns a boolean (bases, bases) mask of the substitutions,
+        i.e. of every entry off the diagonal."""
+        return ~numpy.eye(self.nucleobaseLength, dtype = bool)
@@ -0,0 +1,76 @@
+from io import BytesIO
+from unittest import TestCase
+
+from alignments import SubstitutionCounter, findSequence, readAlignment
+from structures import DNA, CompactSubstitutionMatrix
+
+class TestSubstitutionCounter(TestCase):
+
+    testAlignment = b">reference\nACGT\nACGT\n" \
+        + b">first\nACGA\nAC-T\n" \
+        + b">second\r\nCCGTnCGT\r\n"
+
+    def countNaively(self, source, destination):
+        counts = {}
+        for sourceBase, destBase in zip(source.upper(), destination.upper()):
+            if sourceBase != destBase and sourceBase in "ACGT" \
+                and destBase in "ACGT":
+                key = (DNA[sourceBase], DNA[destBase])
+                counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def assertCounts(self, matrix, counts):
+        for source in DNA:
+            for dest in DNA:
+                self.assertEqual(matrix[source][dest],
+                    counts.get((source, dest), 0),
+                    "Entry({0}, {1}) must count the substitutions."
+                    .format(source.name, dest.name))
+
+    def testCountPairMatchesNaiveCount(self):
+        source = "ACGTACGTTTGACa-NNGTC"
+        destination = "TCGAACCTTAGAcA-GNGTA"
+        counter = SubstitutionCounter()
+        counter.countPair(source, destination)
+
+        self.assertCounts(counter.getMatrix().getCopy(),
+            self.countNaively(source, destination))
+
+    def testCountAgainstReference(self):
+        counter = SubstitutionCounter()
+        counter.countAgainstReference(readAlignment(
+            BytesIO(self.testAlignment)))
+
+        self.assertEqual(counter.pairs, 2,
+            "Every other sequence must be compared to the reference.")
+        self.assertCounts(counter.getMatrix(CompactSubstitutionMatrix)
+            .getCopy(), {(DNA.T, DNA.A): 1, (DNA.A, DNA.C): 1})
+
+    def testNamedReference(self):
+        reference = findSequence(readAlignment(BytesIO(self.testAlignment)),
+            b"second")
+        counter = SubstitutionCounter()
+        counter.countAgainstReference(readAlignment(
+            BytesIO(self.testAlignment)), b"second", reference)
+
+        self.assertEqual(reference, b"CCGTnCGT",
+            "The named sequence must be found.")
+        self.assertEqual(counter.pairs, 2,
+            "Sequences before the reference must be counted too.")
+        with self.assertRaises(ValueError,
+            msg = "A named reference must come first without its "
+            "sequence."):
+            SubstitutionCounter().countAgainstReference(readAlignment(
+                BytesIO(self.testAlignment)), b"second")
+        with self.assertRaises(ValueError,
+            msg = "A missing reference must be reported."):
+            findSequence(readAlignment(BytesIO(self.testAlignment)),
+                b"missing")
+
+    def testRejectsUnequalLengths(self):
+        with self.assertRaises(ValueError,
+            msg = "Aligned sequences must have the same length."):
+            SubstitutionCounter().countPair("ACGT", "ACG")
+        with self.assertRaises(ValueError,
+            msg = "Records must come in pairs."):
+            SubstitutionCounter().countPairs([(b"1", b"ACGT")])
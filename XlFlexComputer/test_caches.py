@@ -0,0 +1,168 @@
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+import os
+import zipfile
+
+import numpy
+
+from caches import ResultCache, worksheetDigests
+from formulas import NormalizedSubstitutionBiasFormula
+from managers import XlManager
+from readers import ObservedExpectedMatricesReader
+
+class TestResultCache(TestCase):
+
+    inputFilepath = os.path.join(os.path.dirname(os.path.abspath(
+        __file__)), "data", "2SubstitutionAnlysML_INPUT.xlsx")
+
+    def setUp(self):
+        self.tempDir = TemporaryDirectory()
+        self.cacheDirectory = os.path.join(self.tempDir.name, "cache")
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def readWorkbook(self, path, cache, processes = 1):
+        reader = ObservedExpectedMatricesReader()
+        XlManager().readResultsFromWorkbook(path, reader, readOnly = True,
+            dataOnly = True, processes = processes, cache = cache)
+        return reader
+
+    def assertSameResults(self, reader, expectedReader):
+        self.assertEqual(list(reader.matricesDictionary.keys()),
+            list(expectedReader.matricesDictionary.keys()),
+            "Worksheets must keep their order.")
+        self.assertEqual(reader.invalidSheets, expectedReader.invalidSheets,
+            "Invalid worksheets must keep their order.")
+        for name, matrices in expectedReader.matricesDictionary.items():
+            self.assertEqual([matrix.getCopy() for matrix
+                in reader.matricesDictionary[name]], [matrix.getCopy()
+                for matrix in matrices], "Matrices of {0} must match."
+                .format(name))
+
+    def testServesUnchangedWorksheets(self):
+        uncached = self.readWorkbook(self.inputFilepath, None)
+        cache = ResultCache(self.cacheDirectory)
+        first = self.readWorkbook(self.inputFilepath, cache)
+        sheetCount = len(first.matricesDictionary) \
+            + len(first.invalidSheets)
+
+        self.assertEqual((cache.hits, cache.misses), (0, sheetCount),
+            "Every worksheet must be read on the first run.")
+        second = self.readWorkbook(self.inputFilepath, cache)
+        self.assertEqual(cache.hits, sheetCount,
+            "Every worksheet must be served on the second run.")
+        parallel = self.readWorkbook(self.inputFilepath, cache, 2)
+        self.assertSameResults(first, uncached)
+        self.assertSameResults(second, uncached)
+        self.assertSameResults(parallel, uncached)
+
+    def testChangedWorksheetIsRead(self):
+        changedPath = os.path.join(self.tempDir.name, "changed.xlsx")
+        changedPart = "xl/worksheets/sheet13.xml"
+        with zipfile.ZipFile(self.inputFilepath) as source, \
+            zipfile.ZipFile(changedPath, "w", zipfile.ZIP_DEFLATED) \
+            as destination:
+            for item in source.infolist():
+                data = source.read(item.filename)
+                if item.filename == changedPart:
+                    data = data.replace(b'<c r="C19" s="7"><v>28</v>',
+                        b'<c r="C19" s="7"><v>29</v>')
+                destination.writestr(item, data)
+        before = worksheetDigests(self.inputFilepath)
+        after = worksheetDigests(changedPath)
+        changedNames = [name for name in after
+            if after[name] != before[name]]
+
+        self.assertEqual(len(changedNames), 1,
+            "Only the changed worksheet's digest must change.")
+        cache = ResultCache(self.cacheDirectory)
+        self.readWorkbook(self.inputFilepath, cache)
+        cache.misses = 0
+        reader = self.readWorkbook(changedPath, cache)
+        self.assertEqual(cache.misses, 1,
+            "Only the changed worksheet must be read again.")
+        self.assertSameResults(reader, self.readWorkbook(changedPath, None))
+        self.assertEqual(reader.matricesDictionary[changedNames[0]][0]
+            .getCopy()[0][1], 29, "The changed value must be read.")
+
+    def testNewSharedStringChangesOneWorksheet(self):
+        changedPath = os.path.join(self.tempDir.name, "changed.xlsx")
+        changedPart = "xl/worksheets/sheet13.xml"
+        with zipfile.ZipFile(self.inputFilepath) as source, \
+            zipfile.ZipFile(changedPath, "w", zipfile.ZIP_DEFLATED) \
+            as destination:
+            for item in source.infolist():
+                data = source.read(item.filename)
+                if item.filename == "xl/sharedStrings.xml":
+                    data = data.replace(b'uniqueCount="365"',
+                        b'uniqueCount="366"').replace(b"</sst>",
+                        b"<si><t>New title</t></si></sst>")
+                elif item.filename == changedPart:
+                    data = data.replace(b'<c r="A1" s="5" t="s"><v>75</v>',
+                        b'<c r="A1" s="5" t="s"><v>365</v>')
+                destination.writestr(item, data)
+        before = worksheetDigests(self.inputFilepath)
+        after = worksheetDigests(changedPath)
+
+        self.assertEqual(len([name for name in after
+            if after[name] != before[name]]), 1, "A string added for one "
+            "worksheet must not change the other worksheets' digests.")
+
+    def testParallelReadSkipsWorksheetsWithoutDigest(self):
+        digests = worksheetDigests(self.inputFilepath)
+        digests.pop(next(iter(digests)))
+        cache = ResultCache(self.cacheDirectory)
+        with patch("managers.worksheetDigests", return_value = digests):
+            reader = self.readWorkbook(self.inputFilepath, cache, 2)
+
+        self.assertSameResults(reader,
+            self.readWorkbook(self.inputFilepath, None))
+        self.assertEqual(len(cache.sizes), len(digests),
+            "Only worksheets with a digest must be cached.")
+
+    def testEvictsLeastRecentlyUsed(self):
+        cache = ResultCache(self.cacheDirectory, max_bytes = 2500)
+        for index in range(3):
+            cache.put(str(index), bytes(1000))
+            os.utime(cache._path(str(index)), (index, index))
+        cache.get("1")
+        cache.put("3", bytes(1000))
+
+        self.assertEqual([key in cache for key in "0123"],
+            [False, True, False, True], "Least recently used entries must "
+            "be evicted first.")
+        self.assertEqual(cache.total, 2 * os.path.getsize(cache._path("3")),
+            "The total must follow puts and evictions.")
+        reopened = ResultCache(self.cacheDirectory, max_bytes = 2500)
+        self.assertEqual((reopened.total, list(reopened.sizes)),
+            (cache.total, list(cache.sizes)), "Opening a cache must find "
+            "its entries in the order they were used.")
+        with patch("caches.os.scandir") as scandir:
+            reopened.put("4", bytes(1000))
+        scandir.assert_not_called()
+        self.assertEqual([key in reopened for key in "134"],
+            [False, True, True], "Entries found when opening must be "
+            "evicted by recency too.")
+
+    def testCalculateCachesFormulaOutputs(self):
+        cache = ResultCache(self.cacheDirectory)
+        formula = NormalizedSubstitutionBiasFormula()
+        observed = numpy.array([[0.0, 3.0], [4.0, 0.0]])
+        expected = numpy.array([[0.0, 2.0], [2.0, 0.0]])
+
+        first = cache.calculate(formula, observed, expected)
+        second = cache.calculate(formula, observed, expected)
+
+        self.assertEqual(cache.hits, 1,
+            "Repeated inputs must be served from the cache.")
+        numpy.testing.assert_array_equal(first, second)
+        self.assertEqual(first[0][1], 0.5, "Outputs must be calculated.")
+
+        with patch.object(NormalizedSubstitutionBiasFormula, "version", 2):
+            cache.calculate(formula, observed, expected)
+        formula.scale = 2
+        cache.calculate(formula, observed, expected)
+        self.assertEqual(cache.misses, 3, "Outputs must not be served "
+            "across formula versions or parameters.")
@@ -0,0 +1,67 @@
+from io import BytesIO
+from unittest import TestCase
+
+from alignments import readAlignment
+from expectations import NULL_MODELS, CompositionCounter, \
+    ExpectedMatrixEstimator
+from structures import DNA
+
+class TestExpectedMatrixEstimator(TestCase):
+
+    testGenomes = b">first\nAACG\nT-N\n>second\naaaa\n"
+
+    def testCountsComposition(self):
+        counter = CompositionCounter()
+        counter.countRecords(readAlignment(BytesIO(self.testGenomes)))
+
+        self.assertEqual(counter.counts.tolist(), [6, 1, 1, 1],
+            "Bases must be counted in either case, skipping others.")
+        self.assertEqual(counter.sequences, 2,
+            "Every sequence must be counted.")
+        self.assertAlmostEqual(counter.getFrequencies().sum(), 1.0,
+            msg = "Frequencies must sum to 1.")
+
+    def testNullModels(self):
+        frequencies = [0.4, 0.1, 0.2, 0.3]
+        for name, nullModel in NULL_MODELS.items():
+            matrix = ExpectedMatrixEstimator(nullModel()).estimate(
+                frequencies, 12).getCopy()
+            total = sum(sum(row) for row in matrix)
+
+            self.assertAlmostEqual(total, 12, msg = "Expected matrix of "
+                "the {0} model must sum to the total.".format(name))
+            for base in DNA:
+                self.assertEqual(matrix[base][base], 0,
+                    "Diagonal of the {0} model must be 0.".format(name))
+
+        uniform = ExpectedMatrixEstimator(NULL_MODELS["uniform"]()) \
+            .estimate(frequencies, 12).getCopy()
+        self.assertEqual(uniform[DNA.A][DNA.C], 1,
+            "Uniform model must spread substitutions evenly.")
+        equalInput = ExpectedMatrixEstimator().estimate(frequencies) \
+            .getCopy()
+        self.assertAlmostEqual(equalInput[DNA.C][DNA.A]
+            / equalInput[DNA.C][DNA.G], 2, msg = "Equal input model must "
+            "be proportional to the destination frequency.")
+
+    def testEstimateRecords(self):
+        estimator = ExpectedMatrixEstimator(NULL_MODELS["composition"]())
+        matrices = list(estimator.estimateRecords(readAlignment(
+            BytesIO(self.testGenomes)), {b"first": 5}))
+
+        self.assertEqual([name for name, matrix in matrices],
+            [b"first", b"second"], "Every record must get a matrix.")
+        self.assertAlmostEqual(sum(sum(row) for row
+            in matrices[0][1].getCopy()), 5, msg = "Totals must be used "
+            "per record.")
+
+    def testEstimateRecordsSkipsRecordsWithoutBases(self):
+        estimator = ExpectedMatrixEstimator()
+        matrices = list(estimator.estimateRecords(readAlignment(BytesIO(
+            b">empty\nNNNN\n>gaps\n----\n" + self.testGenomes))))
+
+        self.assertEqual([name for name, matrix in matrices],
+            [b"first", b"second"], "Records after one without bases must "
+            "still be estimated.")
+        self.assertEqual(estimator.invalidRecords, [b"empty", b"gaps"],
+            "Records without bases must be listed as invalid.")
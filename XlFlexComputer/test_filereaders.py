@@ -0,0 +1,140 @@
+from tempfile import TemporaryDirectory
+from unittest import TestCase, skipUnless
+import csv
+import importlib.util
+import os
+
+from openpyxl import load_workbook
+import numpy
+
+from filereaders import ArrayMatricesReader, DelimitedMatricesReader, \
+    writeNpz
+from managers import XlManager
+from readers import ObservedExpectedMatricesReader
+from structures import DNA
+
+class TestFileReaders(TestCase):
+
+    inputFilepath = os.path.join(os.path.dirname(os.path.abspath(
+        __file__)), "data", "2SubstitutionAnlysML_INPUT.xlsx")
+
+    def setUp(self):
+        self.tempDir = TemporaryDirectory()
+        self.workbookReader = ObservedExpectedMatricesReader()
+        XlManager().readResultsFromWorkbook(self.inputFilepath,
+            self.workbookReader, readOnly = True, dataOnly = True)
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def assertSameMatrices(self, reader, names):
+        for name in names:
+            self.assertEqual([matrix.getCopy() for matrix
+                in reader.matricesDictionary[name]], [matrix.getCopy()
+                for matrix in self.workbookReader.matricesDictionary[name]],
+                "Matrices of {0} must match the workbook's.".format(name))
+
+    def testDelimitedMatchesWorkbook(self):
+        workbook = load_workbook(self.inputFilepath, read_only = True,
+            data_only = True)
+        names = list(self.workbookReader.matricesDictionary)[:3]
+        reader = DelimitedMatricesReader()
+        for index, name in enumerate(names):
+            extension = ".tsv" if index % 2 else ".csv"
+            path = os.path.join(self.tempDir.name, str(index) + extension)
+            with open(path, "w", newline = "") as handle:
+                writer = csv.writer(handle, delimiter = "\t"
+                    if index % 2 else ",")
+                for row in workbook[name].iter_rows(values_only = True):
+                    writer.writerow(["" if value is None else value
+                        for value in row])
+            reader.readFile(path, title = name)
+        workbook.close()
+
+        self.assertEqual(list(reader.matricesDictionary), names,
+            "Every file must be read.")
+        self.assertSameMatrices(reader, names)
+
+    def testNpzRoundTrip(self):
+        path = os.path.join(self.tempDir.name, "stack.npz")
+        writeNpz(path, self.workbookReader.getStack())
+
+        reader = ArrayMatricesReader()
+        reader.readFile(path)
+
+        self.assertEqual(list(reader.matricesDictionary),
+            list(self.workbookReader.matricesDictionary),
+            "Valid subjects must keep their order.")
+        self.assertEqual(reader.invalidSheets,
+            self.workbookReader.invalidSheets,
+            "NaN subjects must be invalid.")
+        self.assertSameMatrices(reader, reader.matricesDictionary)
+
+    def testInvalidArrays(self):
+        observed = numpy.ones((3, 4, 4))
+        numpy.einsum("nii->ni", observed)[:] = 0
+        expected = observed.copy()
+        observed[1, 0, 1] = numpy.nan
+        expected[2, 2, 2] = 5
+
+        reader = ArrayMatricesReader()
+        reader.readArrays(["a", "b", "c"], observed, expected)
+
+        self.assertEqual(list(reader.matricesDictionary), ["a"],
+            "Only subjects with valid matrices must be read.")
+        self.assertEqual(reader.invalidSheets, ["b", "c"],
+            "Missing values and non-zero diagonals must be invalid.")
+        with self.assertRaises(ValueError,
+            msg = "Shapes must match the names."):
+            reader.readArrays(["a"], observed, expected)
+
+    @skipUnless(importlib.util.find_spec("pyarrow"), "requires pyarrow")
+    def testParquetMatchesWorkbook(self):
+        import pyarrow
+        import pyarrow.parquet
+
+        stack = self.workbookReader.getStack()
+        names = stack.getValidNames()
+        columns = {"name": names}
+        for prefix, matrices in (("observed", stack.observed),
+            ("expected", stack.expected)):
+            for source in DNA:
+                for dest in DNA:
+                    if source != dest:
+                        columns["{0}_{1}_{2}".format(prefix, source.name,
+                            dest.name)] = [matrices[stack.indexOf(name),
+                            source, dest] for name in names]
+        path = os.path.join(self.tempDir.name, "stack.parquet")
+        pyarrow.parquet.write_table(pyarrow.table(columns), path)
+
+        reader = ArrayMatricesReader()
+        reader.readFile(path)
+
+        self.assertEqual(list(reader.matricesDictionary), names,
+            "Every row must be read.")
+        self.assertSameMatrices(reader, names)
+
+    @skipUnless(importlib.util.find_spec("pyarrow"), "requires pyarrow")
+    def testParquetColumns(self):
+        import pyarrow
+        import pyarrow.parquet
+
+        columns = {"name": ["a", "b"], "observed_A_A": [0.0, 1.0]}
+        for prefix in ("observed", "expected"):
+            for source in DNA:
+                for dest in DNA:
+                    if source != dest:
+                        columns["{0}_{1}_{2}".format(prefix, source.name,
+                            dest.name)] = [1.0, 1.0]
+        path = os.path.join(self.tempDir.name, "stack.parquet")
+        pyarrow.parquet.write_table(pyarrow.table(columns), path)
+
+        reader = ArrayMatricesReader()
+        reader.readFile(path)
+        self.assertEqual(reader.invalidSheets, ["b"],
+            "Diagonal columns must be read and validated.")
+
+        del columns["expected_G_T"]
+        pyarrow.parquet.write_table(pyarrow.table(columns), path)
+        with self.assertRaisesRegex(ValueError, "expected_G_T"):
+            reader.readFile(path)
@@ -0,0 +1,18 @@
+from unittest import TestCase
+
+from footprints import REPRESENTATIONS, measureFootprint
+
+class TestFootprints(TestCase):
+
+    def testCompactIsSmallerThanList(self):
+        footprints = dict((representation, measureFootprint(representation,
+            1000)) for representation in REPRESENTATIONS)
+
+        self.assertLess(footprints["compact"], footprints["list"] / 2,
+            "Compact matrices must take less than half the memory of "
+            "nested lists.  Footprints were: {0}".format(footprints))
+        self.assertLess(footprints["compact"], footprints["numpy"] * 0.75,
+            "Compact matrices must take much less memory than NumPy "
+            "backed ones.  Footprints were: {0}".format(footprints))
+        self.assertLess(footprints["stack"], footprints["compact"],
+            "Stacked matrices must take the least memory.")
@@ -1,5 +1,6 @@
 from formulas import NormalizedSubstitutionBiasFormula
 from unittest import TestCase
+import numpy
 
 class TestNormalizedSubstitutionBiasFormula(TestCase):
     __testNormalizedSubstitutionBiasFormula = None
@@ -78,5 +79,37 @@ class TestNormalizedSubstitutionBiasFormula(TestCase):
         '-'. Results for observed and expected, respectively: {0}, {1} \
         """.format(observed, expected))
 
+    def test_CalculateArrayMatchesCalculate(self):
+        testFormula = self.__testNormalizedSubstitutionBiasFormula
+        observed = [2, 0, -1, 1, "-", 1, None, "3"]
+        expected = [1, 1, -2, 0, 1, "-", 1, "2"]
+
+        result = testFormula.calculateArray(observed, expected)
+
+        for index, pair in enumerate(zip(observed, expected)):
+            scalar = testFormula.calculate(*pair)
+            if scalar is None:
+                self.assertTrue(numpy.isnan(result[index]),
+                    "Invalid cell {0} must be NaN.".format(index))
+            else:
+                self.assertEqual(result[index], scalar,
+                    "Cell {0} must match calculate.".format(index))
+
+    def test_CalculateArrayWithMask(self):
+        testFormula = self.__testNormalizedSubstitutionBiasFormula
+        observed = numpy.full((2, 4, 4), 3.0)
+        expected = numpy.full((2, 4, 4), 2.0)
+        where = ~numpy.eye(4, dtype = bool)
+
+        result = testFormula.calculateArray(observed, expected, where,
+            invalid = -9)
+
+        self.assertEqual(result.shape, (2, 4, 4),
+            "Result must keep the shape of the input.")
+        self.assertTrue((result[:, where] == 0.5).all(),
+            "Cells inside the mask must be calculated.")
+        self.assertTrue((result[:, ~where] == -9).all(),
+            "Cells outside the mask must hold the invalid value.")
+
 if __name__ == "__main__":
     unittest.main()
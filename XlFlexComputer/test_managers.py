@@ -1,9 +1,18 @@
 from unittest import TestCase
+from tempfile import TemporaryDirectory
 from unittest.mock import Mock, MagicMock, patch
+from openpyxl import Workbook, load_workbook
+import os
 from managers import XlManager
-from readers import XlReader
+from readers import ObservedExpectedMatricesReader, WorksheetValues, \
+    XlReader
+
+class TestXlManager(TestCase):
+
+    inputFilepath = os.path.join(os.path.dirname(os.path.abspath(
+        __file__)), "data", "2SubstitutionAnlysML_INPUT.xlsx")
+
 
-class TestXlManager(XlManager):
     @patch("readers.XlReader")
     @patch("openpyxl.worksheet.worksheet.Worksheet")
     @patch("openpyxl.Workbook")
@@ -12,17 +21,90 @@ class TestXlManager(XlManager):
         testWorkbook, testWorksheet, testReader):
         testFilePath = "Test Output Path"
         testNames = ["Sheet 1", "Sheet 2"]
-        testWorkbook.get_sheet_by_name.return_value = testWorksheet
+        testWorkbook.__getitem__.return_value = testWorksheet
         testload_workbook.return_value = testWorkbook
-        testWorkbook.get_sheet_names.return_value = testNames
+        testWorkbook.sheetnames = testNames
 
         testManager = XlManager()
         testManager.readResultsFromWorkbook(testFilePath, testReader)
 
         testload_workbook.assert_called_once_with(testFilePath)
-        testWorkbook.get_sheet_names.assert_called_once_with()
 
         for testName in testNames:
-            testWorkbook.get_sheet_by_name \
-                .assert_any_call(testName)
+            testWorkbook.__getitem__.assert_any_call(testName)
             testReader.read.assert_any_call(testWorksheet)
+
+    def testParallelMatchesSerial(self):
+        serialReader = ObservedExpectedMatricesReader()
+        XlManager().readResultsFromWorkbook(self.inputFilepath, serialReader,
+            dataOnly = True)
+        parallelReader = ObservedExpectedMatricesReader()
+        XlManager().readResultsFromWorkbook(self.inputFilepath,
+            parallelReader, dataOnly = True, processes = 2)
+
+        self.assertEqual(list(parallelReader.matricesDictionary.keys()),
+            list(serialReader.matricesDictionary.keys()),
+            "Worksheets must be merged in workbook order.")
+        self.assertEqual(parallelReader.invalidSheets,
+            serialReader.invalidSheets,
+            "Invalid worksheets must be merged in workbook order.")
+        for name, matrices in serialReader.matricesDictionary.items():
+            self.assertEqual([matrix.getCopy() for matrix
+                in parallelReader.matricesDictionary[name]],
+                [matrix.getCopy() for matrix in matrices],
+                "Matrices of {0} must match.".format(name))
+
+class TestReadOnlyLoading(TestCase):
+
+    class RecordingReader:
+
+        def __init__(self):
+            self.sheets = []
+
+        def getWindow(self):
+            return 1, 2, 1, 3
+
+        def read(self, worksheet):
+            self.sheets.append((worksheet.title, worksheet.cell(row = 2,
+                column = 3).value, list(worksheet.iter_rows(min_row = 1,
+                max_row = 2, min_col = 2, max_col = 3, values_only = True))))
+
+    def setUp(self):
+        self.tempDir = TemporaryDirectory()
+        self.path = os.path.join(self.tempDir.name, "input.xlsx")
+        workbook = Workbook()
+        workbook.active.title = "Sheet 1"
+        workbook.active["C2"] = 7
+        workbook.active["B1"] = "=1+1"
+        workbook.create_sheet("Sheet 2")["C2"] = "A"
+        workbook.save(self.path)
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def testReadOnlyMatchesFullLoad(self):
+        expected = self.RecordingReader()
+        XlManager().readResultsFromWorkbook(self.path, expected)
+
+        for valuesOnly in (False, True):
+            reader = self.RecordingReader()
+            XlManager().readResultsFromWorkbook(self.path, reader,
+                readOnly = True, valuesOnly = valuesOnly)
+
+            self.assertEqual(reader.sheets, expected.sheets,
+                "Read-only loading must read the same values with "
+                "valuesOnly {0}.".format(valuesOnly))
+        self.assertEqual(expected.sheets[0][2], [("=1+1", None),
+            (None, 7)], "Rows must hold the sheet's values.")
+
+    def testWorksheetValuesHoldsWindow(self):
+        workbook = load_workbook(self.path, read_only = True)
+        try:
+            values = WorksheetValues(workbook["Sheet 1"], 2, 2, 3, 3)
+        finally:
+            workbook.close()
+
+        self.assertEqual(values.rows, [(7,)],
+            "Only the window must be read.")
+        self.assertEqual((values.cell(2, 3).value, values.cell(1, 2).value),
+            (7, None), "Cells must keep their worksheet indices.")
@@ -3,6 +3,7 @@ from unittest.mock import MagicMock, PropertyMock, Mock, patch, DEFAULT
 
 from structures import DNA, SubstitutionMatrix
 from readers import ObservedExpectedMatricesReader
+from openpyxl import Workbook
 from openpyxl.worksheet.worksheet import Worksheet
 
 class TestObservedExpectedMatricesReader(TestCase):
@@ -27,9 +28,11 @@ class TestObservedExpectedMatricesReader(TestCase):
         type(mockWorksheet).title = mockWorksheetTitle
 
         testResult = (mockObservedMatrix, mockExpectedMatrix)
+        mockBlock = Mock()
         testReader = ObservedExpectedMatricesReader(mockBases)
+        testReader._readBlock = MagicMock(return_value = mockBlock)
         testReader._validateHeaders = MagicMock(return_value = True)
-        testReader._readAndValidateSubstitutionValues = \
+        testReader._readAndValidateWorksheet = \
             MagicMock(return_value = testResult)
 
         testReader.read(mockWorksheet)
@@ -38,14 +41,15 @@ class TestObservedExpectedMatricesReader(TestCase):
             testResult, "Matrices dictionary value must be equal to the"
             + "test result.")
 
+        testReader._readBlock.assert_called_once_with(mockWorksheet)
         testReader._validateHeaders \
-            .assert_any_call(18, 1, mockWorksheet)
+            .assert_any_call(18, 1, mockBlock)
         testReader._validateHeaders \
-            .assert_any_call(18, 7, mockWorksheet)
+            .assert_any_call(18, 7, mockBlock)
         self.assertEquals(testReader._validateHeaders.call_count, 2,
             "Header validation must have been called exactly twice.")
-        testReader._readAndValidateSubstitutionValues \
-            .assert_called_once_with(mockWorksheet)
+        testReader._readAndValidateWorksheet \
+            .assert_called_once_with(mockBlock)
 
         mockWorksheetTitle.assert_called_once_with()
 
@@ -170,6 +174,40 @@ class TestObservedExpectedMatricesReader(TestCase):
             mockSubstitutionMatrix]), testResult, "Results must be " + \
             "the same.")
 
+    def testReadFromWorksheetBlock(self):
+        workbook = Workbook()
+        worksheet = workbook.active
+        worksheet.title = "Virus"
+        for offset in (1, 7):
+            for index, base in enumerate("ACGT"):
+                worksheet.cell(row = 18, column = offset + index + 1,
+                    value = base)
+                worksheet.cell(row = 19 + index, column = offset,
+                    value = base)
+                for ci in range(4):
+                    worksheet.cell(row = 19 + index,
+                        column = offset + ci + 1, value = "-" if ci
+                        == index else str(offset * 10 + index * 4 + ci))
+        worksheet.iter_rows = MagicMock(side_effect = worksheet.iter_rows)
+
+        testReader = ObservedExpectedMatricesReader()
+        testReader.read(worksheet)
+        observed, expected = testReader.matricesDictionary["Virus"]
+
+        worksheet.iter_rows.assert_called_once_with(min_row = 18,
+            max_row = 22, min_col = 1, max_col = 11, values_only = True)
+        self.assertEqual(observed.getCopy()[1][2], 16,
+            "Observed values must be read.")
+        self.assertEqual(expected.getCopy()[3][0], 82,
+            "Expected values must be read.")
+        self.assertEqual(expected.getCopy()[2][2], 0,
+            "Hyphens on the diagonal must read as 0.")
+
+        worksheet.cell(row = 20, column = 4).value = "x"
+        testReader.read(worksheet)
+        self.assertEqual(testReader.invalidSheets, ["Virus"],
+            "Sheets with invalid values must be reported.")
+
     def convertToFloat(self, target):
         result = 0.0
         try:
@@ -1,5 +1,7 @@
-from structures import SubstitutionMatrix, DNA
+from structures import SubstitutionMatrix, SubstitutionMatrixStack, DNA, \
+    CompactSubstitutionMatrix
 from unittest import TestCase
+import numpy
 
 class TestNucleotideSubstitutionMatrix(TestCase):
     testNucleotideSubstitutionMatrix = None
@@ -50,3 +52,115 @@ class TestNucleotideSubstitutionMatrix(TestCase):
                     "Changes in the defensive copy of the " + \
                     "substitution matrix must not change the " + \
                     "original matrix.")
+
+    def testGetView(self):
+        step = 1
+        self.populateSubstitutionMatrix(
+            self.testNucleotideSubstitutionMatrix, DNA, step)
+        view = self.testNucleotideSubstitutionMatrix.getView()
+
+        self.assertEqual(view.shape, (len(DNA), len(DNA)),
+            "View must have one row and column per nucleobase.")
+        with self.assertRaises(ValueError,
+            msg = "View of the substitution matrix must be read-only."):
+            view[DNA.A][DNA.C] = -1
+
+        self.testNucleotideSubstitutionMatrix.incrementSubstitution(
+            DNA.A, DNA.C, 5)
+        self.assertEqual(view[DNA.A][DNA.C], 5,
+            "View must share memory with the substitution matrix.")
+        self.assertEqual(view[DNA.G][DNA.G], 0,
+            "Diagonal entries must remain 0.")
+
+class TestCompactSubstitutionMatrix(TestNucleotideSubstitutionMatrix):
+
+    def setUp(self):
+        self.testNucleotideSubstitutionMatrix = \
+            CompactSubstitutionMatrix(DNA)
+
+    def testIncrementSubstitutionAllEntries(self):
+        step = 1
+        self.populateSubstitutionMatrix(
+            self.testNucleotideSubstitutionMatrix, DNA, step)
+        for ri, row in enumerate(
+            self.testNucleotideSubstitutionMatrix.getCopy()):
+            for ci, amount in enumerate(row):
+                self.assertEqual(amount, 0 if ri == ci else step,
+                    "Entry({0}, {1}) was {2}.".format(ri, ci, amount))
+
+    def testGetCopy(self):
+        copy = self.testNucleotideSubstitutionMatrix.getCopy()
+        copy[0][1] = -1
+
+        self.assertEqual(self.testNucleotideSubstitutionMatrix
+            .getView()[0][1], 0, "Changes in the defensive copy must not "
+            "change the original matrix.")
+
+    def testGetView(self):
+        step = 1
+        self.populateSubstitutionMatrix(
+            self.testNucleotideSubstitutionMatrix, DNA, step)
+        view = self.testNucleotideSubstitutionMatrix.getView()
+
+        self.assertEqual(view.tolist(),
+            self.testNucleotideSubstitutionMatrix.getCopy(),
+            "View must hold every entry.")
+        with self.assertRaises(ValueError,
+            msg = "View of the substitution matrix must be read-only."):
+            view[DNA.A][DNA.C] = -1
+
+        self.testNucleotideSubstitutionMatrix.incrementSubstitution(
+            DNA.C, DNA.A, 5)
+        self.assertEqual(self.testNucleotideSubstitutionMatrix.getView()
+            [DNA.C][DNA.A], 5, "Entries below the diagonal must be set.")
+        self.assertEqual(len(self.testNucleotideSubstitutionMatrix.values),
+            8 * 12, "Only the off-diagonal entries must be stored.")
+
+    def testHasNoInstanceDictionary(self):
+        self.assertFalse(hasattr(self.testNucleotideSubstitutionMatrix,
+            "__dict__"), "Compact matrices must not carry a __dict__.")
+
+class TestSubstitutionMatrixStack(TestCase):
+
+    def createMatrix(self, amount):
+        matrix = SubstitutionMatrix(DNA)
+        for sourceBase in DNA:
+            for destinationBase in DNA:
+                matrix.incrementSubstitution(sourceBase, destinationBase,
+                    amount)
+        return matrix
+
+    def testFromMatrices(self):
+        matricesDictionary = {
+            "Sheet 1": (self.createMatrix(1), self.createMatrix(2)),
+            "Sheet 2": (self.createMatrix(3), self.createMatrix(4))}
+        stack = SubstitutionMatrixStack.fromMatrices(matricesDictionary,
+            ["Sheet 3"])
+
+        self.assertEqual(stack.observed.shape, (3, len(DNA), len(DNA)),
+            "Observed matrices must be stacked into one array.")
+        self.assertEqual(stack.valid.tolist(), [True, True, False],
+            "Invalid sheets must be masked out.")
+        self.assertEqual(stack.getValidNames(), ["Sheet 1", "Sheet 2"],
+            "Valid names must keep their order.")
+        self.assertTrue(numpy.isnan(stack.observed[2]).all(),
+            "Matrices of invalid sheets must be NaN.")
+
+        observed, expected = stack.getViews("Sheet 2")
+        self.assertEqual(observed.tolist(),
+            self.createMatrix(3).getCopy(),
+            "Observed view must hold the sheet's observed matrix.")
+        self.assertEqual(expected.tolist(),
+            self.createMatrix(4).getCopy(),
+            "Expected view must hold the sheet's expected matrix.")
+        self.assertFalse(observed.flags.writeable,
+            "Views must be read-only.")
+        self.assertEqual(stack.indexOf("Sheet 3"), 2,
+            "Names must be indexed by their position.")
+
+    def testRejectsMismatchedShapes(self):
+        with self.assertRaises(ValueError,
+            msg = "Names and matrices must agree in size."):
+            SubstitutionMatrixStack(["Sheet 1"],
+                numpy.zeros((2, len(DNA), len(DNA))),
+                numpy.zeros((2, len(DNA), len(DNA))))
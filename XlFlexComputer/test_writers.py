@@ -73,7 +73,7 @@ class TestNormalizedBiasDataWriter(TestCase):
         testSubjectName = "Test Subject Name"
         mockBase = MagicMock()
         mockBase.__iter__.return_value = [0, 1]
-        mockSubstitutionMatrix.getCopy.return_value = [[1, 2], [3, 4]]
+        mockSubstitutionMatrix.getView.return_value = [[1, 2], [3, 4]]
         pValueMock = PropertyMock()
         type(mockWorksheet.cell(row = ANY, column = ANY)).value \
             = pValueMock
@@ -89,7 +89,7 @@ class SubstitutionMatrixDataWriter(XlWriter):
         "param worksheet:              Name of the worksheet the data is
                                        to be written to.
         """
-        biasValueMatrix = biasSubstitutionMatrix.getCopy()
+        biasValueMatrix = biasSubstitutionMatrix.getView()
         nucleobaseType = self.nucleobaseType
         headerColIndex = self.headerColIndex
         currRowIndex = self.currRowIndex
@@ -101,7 +101,7 @@ class SubstitutionMatrixDataWriter(XlWriter):
         for source in nucleobaseType:
             for dest in nucleobaseType:
                 if source != dest:
-                    amount = biasValueMatrix[source][dest]
+                    amount = float(biasValueMatrix[source][dest])
                     worksheet.cell(row = currRowIndex, column =
                         colIndex).value = amount
                     colIndex = colIndex + 1